@@ -5,7 +5,8 @@ MVP Version für automatisierte LaTeX-Protokollerstellung
 """
 
 import os
-from flask import Flask, request, jsonify, send_file
+import ipaddress
+from flask import Flask, request, jsonify, send_file, redirect
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
@@ -13,6 +14,7 @@ from dotenv import load_dotenv
 import logging
 import re
 from datetime import datetime
+from pathlib import Path
 from werkzeug.utils import secure_filename
 
 # Laden der Umgebungsvariablen
@@ -28,6 +30,7 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:/
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['GENERATED_FOLDER'] = 'generated'
+app.config['THUMBNAIL_FOLDER'] = 'thumbnails'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
 # Datenbank-Initialisierung
@@ -44,17 +47,86 @@ os.makedirs(app.config['GENERATED_FOLDER'], exist_ok=True)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Services importieren
-from services.llm_service import LLMService
+# Services importieren (LLM- und OCR-Service laden ollama bzw. pytesseract/numpy erst bei Bedarf)
+from services.lazy import LazyService, warm_up
 from services.file_service import FileService
 from services.latex_service import LaTeXService
-from services.ocr_service import OCRService
+from services.extraction_service import TextExtractionService
+from services.preview_service import PreviewService
+from services.thumbnail_service import ThumbnailService
+from services.artifact_service import ArtifactService
+from services.storage import create_storage, storage_key
+from services.client_connection import GenerationCancelled, client_disconnected
+from services.batch_service import BatchService
+from services.generation_pipeline import GenerationPipeline, PipelineBusy
+from services.section_prompts import build_section_prompt, section_request, likely_next_sections
+from services.structured_output import build_sections_content, sections_to_text
 
-# Services initialisieren
-llm_service = LLMService()
-file_service = FileService(app.config['UPLOAD_FOLDER'])
-latex_service = LaTeXService(app.config['GENERATED_FOLDER'])
-ocr_service = OCRService()
+def _create_llm_service():
+    from services.async_llm_service import AsyncLLMService
+    # Vorab-Generierungen teilen sich alle gunicorn-Worker über eine SQLite-Datei
+    return AsyncLLMService(speculation_db=str(Path(app.config['GENERATED_FOLDER']) / '.index' / 'speculation.db'))
+
+def _create_ocr_service():
+    from services.ocr_service import OCRService
+    return OCRService()
+
+def _create_latex_service():
+    service = LaTeXService(app.config['GENERATED_FOLDER'], storage)
+    # Zuerst veröffentlichen: Thumbnails und Artefakt-Index lesen aus dem Speicher-Backend
+    service.add_pdf_listener(lambda protocol_id, pdf_path: publish_artifacts(protocol_id))
+    service.add_pdf_listener(thumbnail_service.on_pdf_created)
+    service.add_pdf_listener(artifact_service.on_pdf_created)
+    service.add_build_listener(artifact_service.on_build_finished)
+    artifact_service.add_compaction_task('latex', service.cleanup_old_files)
+    return service
+
+def _create_artifact_service():
+    service = ArtifactService(app.config['GENERATED_FOLDER'], storage=storage)
+    service.start_compaction()
+    return service
+
+def _create_batch_service():
+    return BatchService(
+        app, db, {'Protocol': Protocol, 'BatchJob': BatchJob, 'BatchJobItem': BatchJobItem},
+        extraction_service, llm_service, latex_service, app.config['UPLOAD_FOLDER']
+    )
+
+def _create_tables():
+    with app.app_context():
+        db.create_all()
+    logger.info("🗄️ Datenbank-Tabellen erfolgreich erstellt/aktualisiert")
+    return True
+
+# Services werden beim ersten Zugriff bzw. im Hintergrund-Warm-up erstellt
+llm_service = LazyService('llm', _create_llm_service)
+storage = LazyService('storage', create_storage)
+file_service = LazyService('file', lambda: FileService(app.config['UPLOAD_FOLDER'], storage))
+latex_service = LazyService('latex', _create_latex_service)
+ocr_service = LazyService('ocr', _create_ocr_service)
+extraction_service = LazyService('extraction', lambda: TextExtractionService(file_service, ocr_service))
+preview_service = LazyService('preview', lambda: PreviewService(
+    latex_service, os.path.join(app.config['GENERATED_FOLDER'], 'preview')
+))
+thumbnail_service = LazyService('thumbnail', lambda: ThumbnailService(app.config['THUMBNAIL_FOLDER'], storage))
+artifact_service = LazyService('artifact', _create_artifact_service)
+database_schema = LazyService('database', _create_tables)
+batch_service = LazyService('batch', _create_batch_service)
+generation_pipeline = LazyService('generation_pipeline', lambda: GenerationPipeline(
+    app, db, Protocol, llm_service, latex_service
+))
+
+# Reihenfolge des Warm-ups: Schema zuerst, LLM (Modell-Download möglich) zuletzt
+WARMUP_ORDER = [
+    database_schema, storage, file_service, artifact_service, thumbnail_service,
+    latex_service, ocr_service, extraction_service, preview_service, llm_service,
+    generation_pipeline
+]
+
+@app.before_request
+def ensure_database_schema():
+    """Legt fehlende Tabellen vor der ersten Anfrage an (nur einmal pro Prozess)"""
+    database_schema.get()
 
 @app.route('/test-route-early', methods=['GET'])
 def test_route_early():
@@ -193,24 +265,85 @@ class RAGSession(db.Model):
     
     protocol = db.relationship('Protocol', backref='rag_sessions')
 
-# Datenbank-Tabellen erstellen
-with app.app_context():
-    db.create_all()
-    logger.info("🗄️ Datenbank-Tabellen erfolgreich erstellt/aktualisiert")
+class BatchJob(db.Model):
+    """Batch-Generierung vieler Protokolle aus einem Manifest"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(50), default='queued')  # queued, running, completed, completed_with_errors, cancelled, failed
+    options = db.Column(db.JSON)  # z.B. {'pdf': True}
+    
+    # Fortschritt (gebündelt aktualisiert)
+    total = db.Column(db.Integer, default=0)
+    completed_count = db.Column(db.Integer, default=0)
+    failed_count = db.Column(db.Integer, default=0)
+    
+    # Ausführung: Worker-Prozess und Lebenszeichen für die Erkennung unterbrochener Jobs
+    runner = db.Column(db.String(100))
+    heartbeat_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'options': self.options,
+            'total': self.total,
+            'completed': self.completed_count,
+            'failed': self.failed_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class BatchJobItem(db.Model):
+    """Ein Protokoll eines Batch-Jobs mit Checkpoint der letzten abgeschlossenen Stufe"""
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('batch_job.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    protocol_id = db.Column(db.Integer, db.ForeignKey('protocol.id'), nullable=False)
+    stage = db.Column(db.String(20), default='pending')  # pending, extracted, generated, completed, failed
+    files = db.Column(db.JSON)  # Pfade relativ zum Upload-Ordner
+    extracted_files = db.Column(db.JSON)  # Checkpoint nach OCR/Textextraktion
+    error = db.Column(db.Text)
+    
+    job = db.relationship('BatchJob', backref='items')
+
+# Datenbank-Tabellen werden über database_schema erstellt (Warm-up bzw. erste Anfrage)
 
 # Routen beginnen
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Gesundheitscheck für die Anwendung"""
+    """
+    Gesundheitscheck für die Anwendung
+
+    Erzwingt keine Initialisierung: solange der LLM-Service noch aufgewärmt
+    wird (Modellprüfung auf allen Backends), meldet 'llm' 'initializing'.
+    """
+    llm_ready = llm_service.is_ready
     return jsonify({
         'status': 'healthy',
         'services': {
-            'llm': llm_service.is_available(),
+            'llm': llm_service.is_available() if llm_ready else 'initializing',
             'database': True  # Vereinfacht für MVP
-        }
+        },
+        'llm_queue': llm_service.stats if llm_ready else None,
+        'initialized': {service.service_name: service.is_ready for service in WARMUP_ORDER}
     })
 
+@app.route('/llm-stats', methods=['GET'])
+def llm_statistics():
+    """Warteschlangen, Wartezeiten pro Priorität und Zustand der Ollama-Backends"""
+    return jsonify(llm_service.stats)
+
+@app.route('/ocr-stats', methods=['GET'])
+def ocr_statistics():
+    """Eskalations-Statistik der adaptiven OCR"""
+    return jsonify(ocr_service.get_escalation_statistics())
+
 @app.route('/test-new-route', methods=['GET'])
 def test_new_route():
     """Test ob neue Routen registriert werden"""
@@ -232,14 +365,14 @@ def upload_files():
                 
             # Datei speichern und verarbeiten
             file_info = file_service.save_uploaded_file(file)
-            
-            # Wenn es ein Bild ist, OCR durchführen
-            if file_info['type'] == 'image':
-                ocr_text = ocr_service.extract_text(file_info['path'])
-                file_info['extracted_text'] = ocr_text
-            
             uploaded_files.append(file_info)
         
+        # Text-Extraktion (OCR, PDF, Word) parallel für alle Dateien
+        extracted_texts = extraction_service.extract_many([f['path'] for f in uploaded_files])
+        for file_info, extracted_text in zip(uploaded_files, extracted_texts):
+            if extracted_text is not None:
+                file_info['extracted_text'] = extracted_text
+        
         return jsonify({
             'success': True,
             'files': uploaded_files,
@@ -250,47 +383,114 @@ def upload_files():
         logger.error(f"Fehler beim Datei-Upload: {str(e)}")
         return jsonify({'error': 'Fehler beim Datei-Upload'}), 500
 
+def llm_request_timeout(data):
+    """Optionales Timeout aus der Anfrage, begrenzt auf OLLAMA_TIMEOUT"""
+    try:
+        timeout = float(data.get('timeout') or 0)
+    except (TypeError, ValueError):
+        timeout = 0
+    if timeout <= 0:
+        return None
+    return min(timeout, llm_service.timeout)
+
+# Reverse-Proxies, deren X-User-Id/X-Forwarded-For übernommen werden (IPs oder Netze, kommagetrennt)
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(entry.strip(), strict=False)
+    for entry in os.environ.get('TRUSTED_PROXIES', '').split(',') if entry.strip()
+]
+
+def is_trusted_proxy(address):
+    try:
+        ip = ipaddress.ip_address(address)
+    except (TypeError, ValueError):
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+def llm_user():
+    """
+    Nutzerkennung für die faire LLM-Warteschlange
+
+    Header werden nur von vertrauenswürdigen Proxies (TRUSTED_PROXIES)
+    übernommen: X-User-Id (vom Proxy nach der Anmeldung gesetzt), sonst die
+    letzte nicht vertrauenswürdige Adresse aus X-Forwarded-For. Direkte Clients
+    werden über ihre Adresse identifiziert, damit sie sich nicht mit einer
+    neuen Kennung pro Anfrage eine eigene Warteschlange verschaffen.
+    """
+    address = request.remote_addr
+    if is_trusted_proxy(address):
+        user_id = request.headers.get('X-User-Id')
+        if user_id:
+            return f'user:{user_id}'
+        forwarded = [hop.strip() for hop in request.headers.get('X-Forwarded-For', '').split(',') if hop.strip()]
+        for hop in reversed(forwarded):
+            address = hop
+            if not is_trusted_proxy(hop):
+                break
+    return address or 'anonymous'
+
 @app.route('/generate', methods=['POST'])
 def generate_protocol():
-    """Protokoll-Generierung"""
+    """
+    Protokoll-Generierung
+    
+    LLM-Generierung, LaTeX und Speichern laufen als Stufen der Generierungs-Pipeline.
+    Mit "async": true kehrt die Anfrage sofort zurück (202), der Status ist über
+    /protocols/<id> abrufbar.
+    """
     try:
         data = request.get_json()
         
         if not data or 'files' not in data:
             return jsonify({'error': 'Keine Dateien für Generierung angegeben'}), 400
         
+        metadata = data.get('metadata', {})
+        metadata.setdefault('title', data.get('title', 'Untitled Protocol'))
+        
         # Neues Protokoll in DB erstellen
         protocol = Protocol(
             title=data.get('title', 'Untitled Protocol'),
+            status='processing',
             input_files=data['files'],
-            protocol_metadata=data.get('metadata', {})
+            protocol_metadata=metadata
         )
         
         db.session.add(protocol)
         db.session.commit()
         
-        # Protokoll-Inhalt generieren
-        generated_content = llm_service.generate_protocol_content(
-            files=data['files'],
-            protocol_metadata=data.get('metadata', {})
-        )
-        
-        # LaTeX-Dokument erstellen
-        latex_output = latex_service.create_document(
-            content=generated_content,
-            protocol_id=protocol.id
-        )
-        
-        # Protokoll in DB aktualisieren
-        protocol.generated_content = generated_content
-        protocol.status = 'completed'
-        db.session.commit()
+        try:
+            ticket = generation_pipeline.submit(
+                protocol.id,
+                files=data['files'],
+                metadata=metadata,
+                timeout=llm_request_timeout(data),
+                priority='standard',
+                user=llm_user()
+            )
+        except PipelineBusy:
+            protocol.status = 'failed'
+            db.session.commit()
+            return jsonify({'error': 'Server ausgelastet, bitte später erneut versuchen'}), 503
         
+        if data.get('async'):
+            return jsonify({
+                'success': True,
+                'protocol_id': protocol.id,
+                'status': 'processing',
+                'message': 'Protokoll-Generierung gestartet'
+            }), 202
+        
+        # Auf das Ergebnis warten (bricht ab, wenn der Client die Verbindung trennt)
+        try:
+            result = ticket.wait(client_disconnected(request.environ))
+        except GenerationCancelled:
+            return jsonify({'error': 'Generierung abgebrochen'}), 499
+        
+        latex_output = result['latex_output']
         return jsonify({
             'success': True,
             'protocol_id': protocol.id,
-            'latex_file': latex_output['latex_file'],
-            'pdf_file': latex_output['pdf_file'],
+            'latex_file': latex_output.get('latex_file'),
+            'pdf_file': latex_output.get('pdf_file'),
             'message': 'Protokoll erfolgreich generiert'
         })
         
@@ -298,6 +498,14 @@ def generate_protocol():
         logger.error(f"Fehler bei der Protokoll-Generierung: {str(e)}")
         return jsonify({'error': 'Fehler bei der Protokoll-Generierung'}), 500
 
+@app.route('/pipeline-stats', methods=['GET'])
+def pipeline_statistics():
+    """Durchsatz, Auslastung und Queue-Tiefe pro Stufe (Generierung und laufende Batch-Jobs)"""
+    return jsonify({
+        'generation': generation_pipeline.stats() if generation_pipeline.is_ready else None,
+        'batch_jobs': batch_service.pipeline_stats() if batch_service.is_ready else {}
+    })
+
 @app.route('/protocols', methods=['GET'])
 def list_protocols():
     """Liste aller Protokolle"""
@@ -309,10 +517,49 @@ def list_protocols():
             'title': p.title,
             'status': p.status,
             'created_at': p.created_at.isoformat(),
-            'updated_at': p.updated_at.isoformat()
+            'updated_at': p.updated_at.isoformat(),
+            'thumbnail_version': thumbnail_service.current_version(p.id, protocol_pdf_path(p.id))
         } for p in protocols]
     })
 
+@app.route('/protocols/<int:protocol_id>/versions', methods=['GET'])
+def list_protocol_versions(protocol_id):
+    """Versionshistorie der LaTeX-Quellen eines Protokolls"""
+    Protocol.query.get_or_404(protocol_id)
+    return jsonify({'versions': artifact_service.list_versions(protocol_id)})
+
+@app.route('/thumbnail/<int:protocol_id>', methods=['GET'])
+def get_thumbnail(protocol_id):
+    """Vorschaubild der ersten PDF-Seite (ohne PDF-Neugenerierung)"""
+    try:
+        thumbnail = thumbnail_service.get_thumbnail(protocol_id, protocol_pdf_path(protocol_id))
+        if thumbnail is None:
+            return jsonify({'error': 'Kein PDF für dieses Protokoll vorhanden'}), 404
+        
+        thumbnail_path, pdf_hash = thumbnail
+        # Versionierte URLs (?v=<hash>) ändern sich mit dem PDF und dürfen dauerhaft gecacht werden
+        immutable = request.args.get('v') == pdf_hash
+        response = send_file(
+            thumbnail_path,
+            mimetype='image/png',
+            etag=pdf_hash,
+            conditional=True,
+            max_age=31536000 if immutable else 0
+        )
+        if immutable:
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response
+        
+    except Exception as e:
+        logger.error(f"Thumbnail-Fehler für Protokoll {protocol_id}: {str(e)}")
+        return jsonify({'error': 'Thumbnail konnte nicht erstellt werden'}), 500
+
+def protocol_pdf_path(protocol_id):
+    """Pfad zum generierten PDF eines Protokolls"""
+    return latex_service.artifact_path(protocol_id, 'pdf').resolve()
+
 @app.route('/protocols/<int:protocol_id>', methods=['GET'])
 def get_protocol(protocol_id):
     """Einzelnes Protokoll abrufen"""
@@ -326,6 +573,7 @@ def get_protocol(protocol_id):
         'updated_at': protocol.updated_at.isoformat(),
         'input_files': protocol.input_files,
         'generated_content': protocol.generated_content,
+        'sections_content': protocol.sections_content,
         'metadata': protocol.protocol_metadata
     })
 
@@ -335,40 +583,34 @@ def download_protocol_file(protocol_id, file_type):
     try:
         protocol = Protocol.query.get_or_404(protocol_id)
         
-        # Korrekter Pfad zum generated-Ordner
-        generated_folder = os.path.join(os.getcwd(), 'generated')
-        
         if file_type == 'pdf':
-            file_path = os.path.join(generated_folder, f'protocol_{protocol_id}.pdf')
+            file_path = str(latex_service.artifact_path(protocol_id, 'pdf').resolve())
             logger.info(f"Suche PDF: {file_path}")
             
             # Falls PDF nicht existiert, versuche es zu generieren
-            if not os.path.exists(file_path):
+            if not storage.exists(storage_key(file_path)):
                 logger.info(f"PDF nicht gefunden, generiere neu...")
                 try:
-                    latex_output = latex_service.create_document(
-                        content=protocol.generated_content,
-                        protocol_id=protocol.id
-                    )
+                    latex_output = render_protocol(protocol)
                     logger.info(f"PDF-Generierung: {latex_output}")
                 except Exception as gen_error:
                     logger.error(f"PDF-Generierung fehlgeschlagen: {gen_error}")
             
-            if os.path.exists(file_path):
+            if storage.exists(storage_key(file_path)):
                 # Sauberer Dateiname für Download
                 clean_title = re.sub(r'[^\w\s-]', '', protocol.title).strip()
                 clean_title = re.sub(r'[-\s]+', '_', clean_title)
-                return send_file(file_path, as_attachment=True, download_name=f'{clean_title}_protokoll.pdf')
+                return send_artifact(file_path, f'{clean_title}_protokoll.pdf')
                 
         elif file_type == 'latex':
-            file_path = os.path.join(generated_folder, f'protocol_{protocol_id}.tex')
+            file_path = str(latex_service.artifact_path(protocol_id, 'tex').resolve())
             logger.info(f"Suche LaTeX: {file_path}")
             
-            if os.path.exists(file_path):
+            if storage.exists(storage_key(file_path)):
                 # Sauberer Dateiname für Download  
                 clean_title = re.sub(r'[^\w\s-]', '', protocol.title).strip()
                 clean_title = re.sub(r'[-\s]+', '_', clean_title)
-                return send_file(file_path, as_attachment=True, download_name=f'{clean_title}_protokoll.tex')
+                return send_artifact(file_path, f'{clean_title}_protokoll.tex')
         
         logger.error(f"Datei nicht gefunden: {file_type} für Protokoll {protocol_id}")
         return jsonify({'error': f'Datei nicht gefunden: {file_type}'}), 404
@@ -377,6 +619,66 @@ def download_protocol_file(protocol_id, file_type):
         logger.error(f"Fehler beim Download: {str(e)}")
         return jsonify({'error': 'Fehler beim Download'}), 500
 
+def render_protocol(protocol):
+    """Erstellt LaTeX und PDF eines gespeicherten Protokolls, abschnittsweise falls vorhanden"""
+    if protocol.sections_content:
+        return latex_service.create_document_from_sections(
+            sections={key: section['content'] for key, section in protocol.sections_content.items()},
+            protocol_id=protocol.id,
+            title=protocol.title,
+            author=protocol.author
+        )
+    return latex_service.create_document(content=protocol.generated_content, protocol_id=protocol.id)
+
+def send_artifact(file_path, download_name):
+    """
+    Sendet ein generiertes Artefakt mit ETag und Last-Modified
+    
+    Beantwortet If-None-Match/If-Modified-Since mit 304 und Range-Anfragen mit 206.
+    Bei Objektspeichern wird per vorsignierter URL umgeleitet.
+    """
+    presigned_url = storage.presigned_url(storage_key(file_path), download_name)
+    if presigned_url:
+        return redirect(presigned_url, code=302)
+    
+    artifact = artifact_service.get(file_path)
+    if artifact is not None:
+        response = send_file(
+            file_path,
+            as_attachment=True,
+            download_name=download_name,
+            etag=artifact['sha256'],
+            last_modified=artifact['mtime'],
+            conditional=True,
+            max_age=0
+        )
+    else:
+        # Lokal nicht erfassbar (z.B. gerade neu erzeugt oder kompaktiert):
+        # ohne Inhalts-Hash direkt aus dem Speicher-Backend senden
+        key = storage_key(file_path)
+        stat = storage.stat(key)
+        if stat is None:
+            return jsonify({'error': 'Datei nicht gefunden'}), 404
+        response = send_file(
+            storage.open_read(key),
+            as_attachment=True,
+            download_name=download_name,
+            last_modified=stat['mtime'],
+            conditional=True,
+            max_age=0
+        )
+    # Stabile URL: Browser dürfen speichern, müssen aber per ETag revalidieren
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def publish_artifacts(protocol_id):
+    """Überträgt TeX und PDF eines Protokolls in das Speicher-Backend"""
+    for extension, content_type in (('tex', 'application/x-tex'), ('pdf', 'application/pdf')):
+        path = latex_service.artifact_path(protocol_id, extension)
+        if path.exists():
+            storage.save_file(storage_key(path), path, content_type)
+
 @app.route('/test-llm', methods=['POST'])
 def test_llm_generation():
     """Test-Route für LLM-Protokoll-Generierung"""
@@ -407,10 +709,12 @@ Beobachtung: Farbumschlag bei Phenolphthalein
         
         logger.info("Starte Test-LLM-Generierung...")
         
-        # LLM-Generierung testen
-        generated_content = llm_service.generate_protocol_content(
+        # LLM-Generierung testen (nachrangig gegenüber Nutzeranfragen)
+        generated_content, sections = llm_service.generate_structured_protocol(
             files=test_files,
-            protocol_metadata=test_metadata
+            protocol_metadata=test_metadata,
+            priority='batch',
+            user=llm_user()
         )
         
         # In Datenbank speichern
@@ -419,6 +723,7 @@ Beobachtung: Farbumschlag bei Phenolphthalein
             input_files=test_files,
             protocol_metadata=test_metadata,
             generated_content=generated_content,
+            sections_content=build_sections_content(sections) if sections else None,
             status='completed'
         )
         
@@ -432,6 +737,7 @@ Beobachtung: Farbumschlag bei Phenolphthalein
             'protocol_id': protocol.id,
             'generated_content': generated_content[:500] + '...' if len(generated_content) > 500 else generated_content,
             'full_content_length': len(generated_content),
+            'sections': list(sections) if sections else None,
             'message': 'Test-Protokoll erfolgreich generiert!'
         })
         
@@ -453,10 +759,7 @@ def test_pdf_generation(protocol_id):
         logger.info(f"Starte PDF-Generierung für Protokoll {protocol_id}...")
         
         # LaTeX-Dokument erstellen
-        latex_output = latex_service.create_document(
-            content=protocol.generated_content,
-            protocol_id=protocol.id
-        )
+        latex_output = render_protocol(protocol)
         
         logger.info(f"PDF-Generierung abgeschlossen: {latex_output}")
         
@@ -593,26 +896,25 @@ def bulk_download(file_type):
         with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
             for protocol in protocols:
                 file_extension = 'pdf' if file_type == 'pdf' else 'tex'
-                file_path = f"backend/generated/protocol_{protocol.id}.{file_extension}"
+                file_path = str(latex_service.artifact_path(protocol.id, file_extension))
                 
-                if os.path.exists(file_path):
+                if storage.exists(storage_key(file_path)):
                     # Sauberen Dateinamen erstellen
                     clean_title = re.sub(r'[^\w\s-]', '', protocol.title).strip()
                     clean_title = re.sub(r'[-\s]+', '_', clean_title)
                     archive_name = f"{protocol.id}_{clean_title}.{file_extension}"
                     
-                    zipf.write(file_path, archive_name)
+                    write_artifact_to_zip(zipf, file_path, archive_name)
                 else:
                     # Fehlende Dateien regenerieren (nur für PDF)
                     if file_type == 'pdf':
                         try:
-                            latex_service = LaTeXService('backend/generated')
-                            latex_service.create_document(protocol.generated_content, protocol.id)
-                            if os.path.exists(file_path):
+                            render_protocol(protocol)
+                            if storage.exists(storage_key(file_path)):
                                 clean_title = re.sub(r'[^\w\s-]', '', protocol.title).strip()
                                 clean_title = re.sub(r'[-\s]+', '_', clean_title)
                                 archive_name = f"{protocol.id}_{clean_title}.{file_extension}"
-                                zipf.write(file_path, archive_name)
+                                write_artifact_to_zip(zipf, file_path, archive_name)
                         except:
                             pass
         
@@ -623,6 +925,17 @@ def bulk_download(file_type):
         logger.error(f"Bulk-Download Fehler: {str(e)}")
         return jsonify({'error': 'Bulk-Download fehlgeschlagen'}), 500
 
+def write_artifact_to_zip(zipf, file_path, archive_name):
+    """Kopiert ein Artefakt blockweise aus dem Speicher-Backend in ein ZIP-Archiv"""
+    import shutil
+    
+    source = storage.open_read(storage_key(file_path))
+    try:
+        with zipf.open(archive_name, 'w') as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+    finally:
+        source.close()
+
 @app.route('/generate-section', methods=['POST'])
 def generate_section():
     """Generiert einen einzelnen Protokoll-Abschnitt mit LLM"""
@@ -634,86 +947,23 @@ def generate_section():
         existing_sections = data.get('existing_sections', {})
         uploaded_files = data.get('uploaded_files', [])
         
-        # Spezifische Prompts für jeden Abschnitt
-        section_prompts = {
-            'zielsetzung': """
-Erstelle eine präzise Zielsetzung für dieses Laborexperiment.
-Fokussiere auf: Was soll erreicht werden? Welche Fragestellung wird beantwortet?
-Verwende deutsche Sprache und wissenschaftlichen Stil.
-""",
-            'theorie': """
-Erkläre die relevanten theoretischen Grundlagen für dieses Experiment.
-Erwähne wichtige Reaktionsgleichungen, Gesetze oder Prinzipien.
-Halte es prägnant aber vollständig.
-""",
-            'material': """
-Liste alle benötigten Materialien, Chemikalien und Geräte auf.
-Verwende Aufzählungsformat mit korrekten Konzentrationen und Mengen.
-Berücksichtige Sicherheitsaspekte.
-""",
-            'durchfuehrung': """
-Beschreibe die experimentelle Durchführung in logischen Schritten.
-Verwende nummerierte Liste. Sei präzise bei Mengenangaben und Zeiten.
-Erwähne wichtige Beobachtungspunkte.
-""",
-            'ergebnisse': """
-Präsentiere die Messwerte und Beobachtungen systematisch.
-Verwende Tabellen oder Listen für Messdaten.
-Beschreibe qualitative Beobachtungen (Farbe, Temperatur, etc.).
-""",
-            'berechnungen': """
-Zeige alle relevanten Berechnungen mit Formeln und Zahlenwerten.
-Erkläre jeden Rechenschritt. Verwende korrekte Einheiten.
-Berechne Fehler oder Unsicherheiten falls möglich.
-""",
-            'diskussion': """
-Bewerte die Ergebnisse kritisch. Diskutiere Abweichungen, Fehlerquellen.
-Vergleiche mit Literaturwerten falls vorhanden.
-Erwähne Verbesserungsmöglichkeiten.
-""",
-            'schlussfolgerung': """
-Fasse die wichtigsten Erkenntnisse zusammen.
-Beantworte die ursprüngliche Fragestellung.
-Gib einen kurzen Ausblick oder praktische Relevanz.
-"""
-        }
-        
-        # Kontext aus anderen Abschnitten
-        context_text = f"Titel: {title}\nBeschreibung: {description}\n\n"
-        
-        if existing_sections:
-            context_text += "Bereits vorhandene Abschnitte:\n"
-            for key, content in existing_sections.items():
-                if content and key != section:
-                    context_text += f"{key}: {content[:200]}...\n"
-        
-        # Upload-Dateien als Kontext
-        if uploaded_files:
-            context_text += "\nVerfügbare Daten aus hochgeladenen Dateien:\n"
-            for file in uploaded_files:
-                if file.get('extracted_text'):
-                    context_text += f"- {file['name']}: {file['extracted_text'][:300]}...\n"
-        
-        # LLM-Prompt zusammenstellen
-        full_prompt = f"""
-{section_prompts.get(section, 'Erstelle Inhalt für diesen Abschnitt.')}
-
-KONTEXT:
-{context_text}
-
-AUFGABE: Erstelle den Abschnitt '{section}' für dieses Laborprotokoll.
-Verwende nur Informationen aus dem gegebenen Kontext oder allgemein bekannte wissenschaftliche Fakten.
-Erfinde KEINE spezifischen Messwerte oder Details die nicht gegeben sind.
-Antworte nur mit dem Inhalt des Abschnitts, ohne zusätzliche Erklärungen.
-"""
+        full_prompt = build_section_prompt(section, title, description, existing_sections, uploaded_files)
         
         logger.info(f"Generiere Abschnitt '{section}' für '{title}'")
         
-        # LLM-Generierung
-        generated_content = llm_service.generate_protocol_content(
-            files=[{'name': 'context', 'content': full_prompt}],
-            protocol_metadata={'title': title, 'section': section}
-        )
+        # LLM-Generierung (bricht ab, wenn der Client die Verbindung trennt)
+        try:
+            generated_content = llm_service.generate_protocol_content(
+                files=[{'name': 'context', 'content': full_prompt}],
+                protocol_metadata={'title': title, 'section': section},
+                timeout=llm_request_timeout(data),
+                is_disconnected=client_disconnected(request.environ),
+                priority='interactive',
+                user=llm_user(),
+                use_cache=True
+            )
+        except GenerationCancelled:
+            return jsonify({'success': False, 'error': 'Generierung abgebrochen'}), 499
         
         # Bereinigung des generierten Inhalts
         cleaned_content = generated_content.strip()
@@ -737,6 +987,21 @@ Antworte nur mit dem Inhalt des Abschnitts, ohne zusätzliche Erklärungen.
             'message': 'Abschnitts-Generierung fehlgeschlagen'
         }), 500
 
+def speculate_next_sections(protocol_id, title, description, sections, files):
+    """Generiert die wahrscheinlich nächsten leeren Abschnitte eines Entwurfs vorab"""
+    if not llm_service.is_ready:
+        return []  # Kein Kaltstart des LLM-Services nur für Vorab-Generierung
+    try:
+        next_sections = likely_next_sections(sections, int(os.environ.get('SPECULATIVE_SECTIONS', 2)))
+        llm_service.speculate(f'draft:{protocol_id}', [
+            section_request(section, title, build_section_prompt(section, title, description, sections, files))
+            for section in next_sections
+        ])
+        return next_sections
+    except Exception as e:
+        logger.warning(f"Vorab-Generierung für Entwurf {protocol_id} nicht gestartet: {str(e)}")
+        return []
+
 @app.route('/protocols/draft', methods=['POST'])
 def save_protocol_draft():
     """Speichert einen Protokoll-Entwurf"""
@@ -778,9 +1043,14 @@ def save_protocol_draft():
         
         db.session.commit()
         
+        speculating = []
+        if data.get('speculate') and os.environ.get('SPECULATIVE_GENERATION', '1') != '0':
+            speculating = speculate_next_sections(protocol_id, title, description, sections, files)
+        
         return jsonify({
             'success': True,
             'protocol_id': protocol_id,
+            'speculating': speculating,
             'message': 'Entwurf gespeichert'
         })
         
@@ -802,44 +1072,33 @@ def generate_full_protocol():
         files = data.get('files', [])
         
         # LaTeX-Inhalt aus Abschnitten zusammenstellen
-        latex_content = f"# {title}\n\n"
-        
-        if description:
-            latex_content += f"{description}\n\n"
+        latex_content = sections_to_text(title, sections, description)
         
-        # Abschnitte in korrekter Reihenfolge
-        section_order = ['zielsetzung', 'theorie', 'material', 'durchfuehrung', 
-                        'ergebnisse', 'berechnungen', 'diskussion', 'schlussfolgerung']
-        
-        for section_key in section_order:
-            if section_key in sections and sections[section_key]:
-                section_title = {
-                    'zielsetzung': 'Zielsetzung',
-                    'theorie': 'Theoretischer Hintergrund', 
-                    'material': 'Materialien und Geräte',
-                    'durchfuehrung': 'Durchführung',
-                    'ergebnisse': 'Ergebnisse und Beobachtungen',
-                    'berechnungen': 'Berechnungen und Auswertung',
-                    'diskussion': 'Diskussion',
-                    'schlussfolgerung': 'Schlussfolgerung'
-                }.get(section_key, section_key.capitalize())
-                
-                latex_content += f"## {section_title}\n\n{sections[section_key]}\n\n"
+        # Abschnitte mit Inhalts-Hash für die inkrementelle Neugenerierung
+        sections_content = build_sections_content(sections)
         
         # Protokoll in Datenbank speichern/aktualisieren
         existing_protocol = Protocol.query.filter_by(title=title).first()
         
         if existing_protocol:
+            previous = existing_protocol.sections_content or {}
+            changed = [key for key, section in sections_content.items()
+                       if previous.get(key, {}).get('hash') != section['hash']]
+            changed += [key for key in previous if key not in sections_content]
+            
             existing_protocol.generated_content = latex_content
+            existing_protocol.sections_content = sections_content
             existing_protocol.status = 'completed'
             existing_protocol.updated_at = db.func.now()
             protocol_id = existing_protocol.id
+            logger.info(f"Protokoll {protocol_id}: geänderte Abschnitte {changed or 'keine'}")
         else:
             protocol = Protocol(
                 title=title,
                 status='completed',
                 input_files=files,
                 generated_content=latex_content,
+                sections_content=sections_content,
                 protocol_metadata={
                     'description': description,
                     'sections': sections
@@ -851,10 +1110,11 @@ def generate_full_protocol():
         
         db.session.commit()
         
-        # LaTeX-Dokument generieren
-        latex_output = latex_service.create_document(
-            content=latex_content,
-            protocol_id=protocol_id
+        # LaTeX-Dokument generieren (vollständiger Build, entfällt bei unverändertem Quelltext)
+        latex_output = latex_service.create_document_from_sections(
+            sections={key: section['content'] for key, section in sections_content.items()},
+            protocol_id=protocol_id,
+            title=title
         )
         
         return jsonify({
@@ -862,6 +1122,7 @@ def generate_full_protocol():
             'protocol_id': protocol_id,
             'latex_file': latex_output.get('latex_file'),
             'pdf_file': latex_output.get('pdf_file'),
+            'rebuilt_sections': latex_output.get('rebuilt_sections', []),
             'message': 'Vollständiges Protokoll erfolgreich erstellt!'
         })
         
@@ -891,7 +1152,7 @@ def upload_global_files():
             return jsonify({'error': 'Keine Dateien empfangen'}), 400
         
         files = request.files.getlist('files')
-        uploaded_files = []
+        saved_files = []
         
         for file in files:
             if file.filename == '':
@@ -902,24 +1163,20 @@ def upload_global_files():
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             unique_filename = f"{timestamp}_{filename}"
             
-            # Datei speichern
-            upload_path = os.path.join(app.config['UPLOAD_FOLDER'], 'global', unique_filename)
-            os.makedirs(os.path.dirname(upload_path), exist_ok=True)
-            file.save(upload_path)
-            
-            # Dateityp bestimmen
-            file_type = determine_file_type(filename)
-            
-            # OCR/Text-Extraktion
-            extracted_text = None
-            if file_type in ['image', 'document']:
-                extracted_text = extract_text_from_file(upload_path, file_type)
-            
+            # Datei im Shard-Verzeichnis speichern
+            upload_path = str(file_service.save_to_area(file, 'global', unique_filename))
+            saved_files.append((filename, unique_filename, upload_path))
+        
+        # OCR/Text-Extraktion parallel für alle Dateien
+        extracted_texts = extraction_service.extract_many([path for _, _, path in saved_files])
+        
+        uploaded_files = []
+        for (filename, unique_filename, upload_path), extracted_text in zip(saved_files, extracted_texts):
             # In Datenbank speichern
             global_file = GlobalFile(
                 filename=unique_filename,
                 original_filename=filename,
-                file_type=file_type,
+                file_type=determine_file_type(filename),
                 file_size=os.path.getsize(upload_path),
                 file_path=upload_path,
                 extracted_text=extracted_text,
@@ -954,7 +1211,7 @@ def upload_project_files():
             return jsonify({'error': 'Protokoll-ID erforderlich'}), 400
         
         files = request.files.getlist('files')
-        uploaded_files = []
+        saved_files = []
         
         for file in files:
             if file.filename == '':
@@ -965,25 +1222,21 @@ def upload_project_files():
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             unique_filename = f"p{protocol_id}_{timestamp}_{filename}"
             
-            # Datei speichern
-            upload_path = os.path.join(app.config['UPLOAD_FOLDER'], 'projects', unique_filename)
-            os.makedirs(os.path.dirname(upload_path), exist_ok=True)
-            file.save(upload_path)
-            
-            # Dateityp bestimmen
-            file_type = determine_file_type(filename)
-            
-            # OCR/Text-Extraktion
-            extracted_text = None
-            if file_type in ['image', 'document']:
-                extracted_text = extract_text_from_file(upload_path, file_type)
-            
+            # Datei im Shard-Verzeichnis speichern
+            upload_path = str(file_service.save_to_area(file, 'projects', unique_filename))
+            saved_files.append((filename, unique_filename, upload_path))
+        
+        # OCR/Text-Extraktion parallel für alle Dateien
+        extracted_texts = extraction_service.extract_many([path for _, _, path in saved_files])
+        
+        uploaded_files = []
+        for (filename, unique_filename, upload_path), extracted_text in zip(saved_files, extracted_texts):
             # In Datenbank speichern
             project_file = ProjectFile(
                 protocol_id=int(protocol_id),
                 filename=unique_filename,
                 original_filename=filename,
-                file_type=file_type,
+                file_type=determine_file_type(filename),
                 file_size=os.path.getsize(upload_path),
                 file_path=upload_path,
                 extracted_text=extracted_text,
@@ -1013,6 +1266,26 @@ def generate_preview():
         title = data.get('title', 'Protokoll-Entwurf')
         description = data.get('description', '')
         sections = data.get('sections', {})
+        preview_format = data.get('format', 'markdown')
+        
+        # Gerenderte Vorschau (PDF/PNG) mit einem schnellen pdflatex-Lauf
+        if preview_format in PreviewService.FORMATS:
+            draft_key = str(data.get('protocol_id') or title)
+            result = preview_service.render(
+                draft_key, title, sections,
+                output_format=preview_format,
+                page=int(data.get('page', 1))
+            )
+            
+            if result.get('cancelled'):
+                return jsonify({'success': False, 'cancelled': True, 'message': 'Vorschau durch neuere Anfrage ersetzt'}), 409
+            if not result['success']:
+                return jsonify({'success': False, 'error': result.get('error')}), 500
+            
+            mimetype = 'application/pdf' if preview_format == 'pdf' else 'image/png'
+            response = send_file(result['path'], mimetype=mimetype)
+            response.headers['X-Preview-Cached'] = 'true' if result['cached'] else 'false'
+            return response
         
         # LaTeX-Inhalt aus Abschnitten zusammenstellen
         latex_content = f"# {title}\n\n"
@@ -1049,6 +1322,58 @@ def generate_preview():
         logger.error(f"Fehler bei Vorschau-Generierung: {str(e)}")
         return jsonify({'error': 'Vorschau-Generierung fehlgeschlagen'}), 500
 
+@app.route('/batch-jobs', methods=['POST'])
+def create_batch_job():
+    """Legt einen Batch-Job aus einem Manifest an und startet ihn im Hintergrund"""
+    manifest = request.get_json() or {}
+    try:
+        job_id = batch_service.create_job(manifest)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    batch_service.start(job_id)
+    return jsonify({'success': True, 'job': batch_service.progress(job_id)}), 202
+
+@app.route('/batch-jobs', methods=['GET'])
+def list_batch_jobs():
+    """Liste aller Batch-Jobs"""
+    jobs = BatchJob.query.order_by(BatchJob.created_at.desc()).all()
+    return jsonify({'jobs': [
+        dict(job.to_dict(), status=batch_service.job_status(job)) for job in jobs
+    ]})
+
+@app.route('/batch-jobs/<int:job_id>', methods=['GET'])
+def get_batch_job(job_id):
+    """Fortschritt eines Batch-Jobs (Zähler pro Stufe, Durchsatz, Restzeit)"""
+    progress = batch_service.progress(job_id)
+    if progress is None:
+        return jsonify({'error': 'Batch-Job nicht gefunden'}), 404
+    
+    if request.args.get('items'):
+        items = BatchJobItem.query.filter_by(job_id=job_id).order_by(BatchJobItem.position).all()
+        progress['items'] = [{
+            'position': item.position,
+            'protocol_id': item.protocol_id,
+            'stage': item.stage,
+            'error': item.error
+        } for item in items]
+    return jsonify(progress)
+
+@app.route('/batch-jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_batch_job(job_id):
+    """Bricht einen Batch-Job ab; bereits erreichte Checkpoints bleiben erhalten"""
+    if not batch_service.cancel(job_id):
+        return jsonify({'success': False, 'error': 'Batch-Job nicht gefunden oder bereits beendet'}), 409
+    return jsonify({'success': True})
+
+@app.route('/batch-jobs/<int:job_id>/resume', methods=['POST'])
+def resume_batch_job(job_id):
+    """Setzt einen abgebrochenen, unterbrochenen oder teilweise fehlgeschlagenen Job fort"""
+    if not batch_service.resume(job_id):
+        return jsonify({'success': False, 'error': 'Batch-Job nicht gefunden, läuft noch oder ist abgeschlossen'}), 409
+    return jsonify({'success': True, 'job': batch_service.progress(job_id)})
+
 def determine_file_type(filename):
     """Bestimmt den Dateityp basierend auf der Erweiterung"""
     ext = filename.lower().split('.')[-1]
@@ -1077,21 +1402,6 @@ def categorize_file(filename, extracted_text=None):
     else:
         return 'general'
 
-def extract_text_from_file(file_path, file_type):
-    """Extrahiert Text aus Dateien (vereinfacht für MVP)"""
-    try:
-        if file_type == 'document' and file_path.endswith('.txt'):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        elif file_type == 'image':
-            # TODO: OCR-Integration (Tesseract)
-            return f"[Bild-Datei: OCR-Text hier]"
-        else:
-            return f"[{file_type.upper()}-Datei: Text-Extraktion implementiert]"
-    except Exception as e:
-        logger.error(f"Text-Extraktion fehlgeschlagen: {str(e)}")
-        return None
-
 @app.errorhandler(413)
 def too_large(e):
     return jsonify({'error': 'Datei zu groß. Maximum: 16MB'}), 413
@@ -1100,9 +1410,24 @@ def too_large(e):
 def internal_error(e):
     return jsonify({'error': 'Interner Serverfehler'}), 500
 
+def prepare_app():
+    """
+    Bereitet die Modul-App für WSGI-Server vor (siehe wsgi.py, gunicorn.conf.py)
+    
+    Keine Application Factory: Routen und Services hängen an der Modul-App.
+    Blockiert nicht: Tabellen und Services werden im Hintergrund vorbereitet
+    (bzw. spätestens bei der ersten Anfrage). Mit LAZY_SERVICES=0 werden alle
+    Services wie früher sofort erstellt.
+    """
+    if os.environ.get('LAZY_SERVICES', '1') == '0':
+        for service in WARMUP_ORDER:
+            service.get()
+    else:
+        warm_up(WARMUP_ORDER)
+    return app
+
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
+    prepare_app()
     
     app.run(
         host='0.0.0.0',
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Strukturextraktion pro Muster (alt) vs. vorkompilierte Einzel-Alternation
+
+Aufruf (aus dem backend-Ordner):
+    python benchmarks/bench_entity_extraction.py [--pages 50] [--repeat 5]
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.entity_extraction import extract_entities, format_chemical_notations
+
+PAGE_LINES = [
+    "Versuch 3: Titration von HCI mit NaOH (c = 0.1 mol/L)",
+    "Einwaage 0.512 g NaCl in 50 ml H20 geloest, Temperatur 21 °C",
+    "Verbrauch 23.5 ml NaOH nach 5 min, pH = 7.0",
+    "Farbe: rosa nach Zugabe von Phenolphthalein",
+    "Niederschlag: weiss, flockig bei 80 °C",
+    "Geruch: stechend, Reaktion heftig",
+    "Erhitzen auf 373 K fuer 2 h, danach 30 s ruehren",
+    "Beobachtung: Loesung klar, CaCl2 vollstaendig geloest",
+]
+
+
+def build_ocr_text(pages: int) -> str:
+    """Erzeugt mehrseitigen OCR-Text mit Labornotizen"""
+    return "\n\n".join(
+        f"Seite {page + 1}\n" + "\n".join(PAGE_LINES * 5) for page in range(pages)
+    )
+
+
+# Bisherige Implementierung aus OCRService (ein Regex-Durchlauf pro Muster)
+
+def legacy_format(text):
+    chemical_patterns = {
+        r'\bH20\b': 'H2O', r'\bNaCl\b': 'NaCl', r'\bCaCl2\b': 'CaCl2',
+        r'\bHCI\b': 'HCl', r'\bNaOH\b': 'NaOH'
+    }
+    for pattern, replacement in chemical_patterns.items():
+        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    unit_patterns = {
+        r'(\d+)\s*(ml|ML)\b': r'\1 mL', r'(\d+)\s*(mg|MG)\b': r'\1 mg',
+        r'(\d+)\s*(g|G)\b(?!\w)': r'\1 g', r'(\d+)\s*°\s*C\b': r'\1°C',
+        r'(\d+)\s*(mol|MOL)\b': r'\1 mol'
+    }
+    for pattern, replacement in unit_patterns.items():
+        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    return text
+
+
+def legacy_extract(text):
+    measurements = []
+    for pattern in [r'(\d+(?:\.\d+)?)\s*(mg|g|kg|ml|l|mol)', r'(\d+(?:\.\d+)?)\s*°C',
+                    r'(\d+(?:\.\d+)?)\s*(min|h|s)', r'pH\s*[=:]\s*(\d+(?:\.\d+)?)']:
+        for match in re.findall(pattern, text, re.IGNORECASE):
+            if isinstance(match, tuple):
+                measurements.append({'value': float(match[0]), 'unit': match[1], 'type': 'measurement'})
+
+    compounds = []
+    for pattern in [r'\b[A-Z][a-z]?(?:\d+)?(?:[A-Z][a-z]?\d*)*\b',
+                    r'\b(?:NaCl|H2O|HCl|NaOH|CaCl2|KOH|H2SO4|HNO3)\b']:
+        compounds.extend(re.findall(pattern, text))
+    compounds = list(set([c for c in compounds if len(c) > 1 and not c.isdigit()]))
+
+    temperatures = []
+    for pattern in [r'(\d+(?:\.\d+)?)\s*°C', r'(\d+(?:\.\d+)?)\s*°F', r'(\d+(?:\.\d+)?)\s*K']:
+        for match in re.findall(pattern, text):
+            unit = 'C' if '°C' in pattern else ('F' if '°F' in pattern else 'K')
+            temperatures.append({'value': float(match), 'unit': unit, 'type': 'temperature'})
+
+    observations = []
+    for pattern in [r'Farbe?\s*[:\-]?\s*([a-zA-ZäöüÄÖÜß\s]+)', r'Geruch\s*[:\-]?\s*([a-zA-ZäöüÄÖÜß\s]+)',
+                    r'Niederschlag\s*[:\-]?\s*([a-zA-ZäöüÄÖÜß\s]+)', r'Reaktion\s*[:\-]?\s*([a-zA-ZäöüÄÖÜß\s]+)',
+                    r'Beobachtung\s*[:\-]?\s*([a-zA-ZäöüÄÖÜß\s]+)']:
+        observations.extend(m.strip() for m in re.findall(pattern, text, re.IGNORECASE) if m.strip())
+
+    return {'measurements': measurements, 'temperatures': temperatures,
+            'chemical_compounds': compounds, 'observations': list(set(observations))}
+
+
+def run(label, format_func, extract_func, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        entities = extract_func(format_func(text))
+    duration = (time.perf_counter() - start) / repeat
+    counts = ", ".join(f"{key}={len(value)}" for key, value in entities.items())
+    print(f"  {label:<14} {duration * 1000:8.1f} ms  ({counts})")
+    return duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    text = build_ocr_text(args.pages)
+    print(f"📝 {args.pages} Seiten OCR-Text ({len(text) // 1024} KB)")
+
+    legacy = run('pro Muster', legacy_format, legacy_extract, text, args.repeat)
+    engine = run('ein Durchlauf', format_chemical_notations, extract_entities, text, args.repeat)
+    print(f"\n⚡ Speedup: {legacy / engine:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
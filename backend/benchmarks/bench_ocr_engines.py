@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Latenz pro Bild für pytesseract vs. tesserocr (persistente APIs)
+
+Aufruf (aus dem backend-Ordner):
+    python benchmarks/bench_ocr_engines.py [--images 50] [--width 600]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from services.ocr_engines import PytesseractEngine, TesserocrEngine, tesserocr
+
+TESSERACT_CONFIG = '--oem 3 --psm 6 -l deu+eng'
+
+SAMPLE_LINES = [
+    "Verbrauch NaOH: 23.5 mL",
+    "Temperatur: 21 °C, pH = 7.0",
+    "Farbe: rosa nach Zugabe",
+    "Einwaage 0.512 g NaCl",
+]
+
+
+def build_images(count: int, width: int):
+    """Erzeugt kleine Bilder mit kurzen Labornotizen"""
+    images = []
+    for i in range(count):
+        image = Image.new('L', (width, 120), color=255)
+        draw = ImageDraw.Draw(image)
+        for line_no, line in enumerate(SAMPLE_LINES[:2 + i % 3]):
+            draw.text((10, 10 + line_no * 25), line, fill=0)
+        images.append(image)
+    return images
+
+
+def measure(engine, images):
+    # Aufwärmen: Worker-Prozesse starten und Sprachdaten laden
+    engine.image_to_string(images[0], TESSERACT_CONFIG)
+
+    latencies = []
+    for image in images:
+        start = time.perf_counter()
+        engine.image_to_string(image, TESSERACT_CONFIG)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"  {name:<12} mittel {statistics.mean(latencies):7.1f} ms  "
+          f"p50 {statistics.median(latencies):7.1f} ms  p95 {p95:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=50)
+    parser.add_argument('--width', type=int, default=600)
+    args = parser.parse_args()
+
+    images = build_images(args.images, args.width)
+    print(f"🖼️  {len(images)} Bilder à {args.width}px, Konfiguration '{TESSERACT_CONFIG}'")
+
+    engines = [PytesseractEngine()]
+    if tesserocr is not None:
+        engines.append(TesserocrEngine(max_workers=1))
+    else:
+        print("  ⚠️  tesserocr nicht installiert, nur pytesseract wird gemessen")
+
+    for engine in engines:
+        report(engine.name, measure(engine, images))
+        engine.shutdown()
+
+
+if __name__ == '__main__':
+    main()
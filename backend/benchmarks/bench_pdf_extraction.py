@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: PDF-Textextraktion seriell (alt) vs. seitenparallel mit Seiten-Cache
+
+Aufruf (aus dem backend-Ordner):
+    python benchmarks/bench_pdf_extraction.py [--pages 200] [--pdf pfad.pdf]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.pdf_service import PDFService
+
+LOREM = (
+    "Titration von Salzsaeure mit Natronlauge c = 0.1 mol/L. Verbrauch 23.5 mL. "
+    "Farbumschlag bei Phenolphthalein, Temperatur 21 C, pH = 7.0. "
+)
+
+
+def build_reference_pdf(path: str, pages: int, lines_per_page: int = 40):
+    """Schreibt ein einfaches Referenz-PDF mit Textebene auf jeder Seite"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Seitenbaum, wird unten gefüllt
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+
+    for page in range(pages):
+        lines = [f"BT /F1 10 Tf 50 {800 - i * 18} Td (Seite {page + 1} Zeile {i + 1}: {LOREM}) Tj ET"
+                 for i in range(lines_per_page)]
+        stream = "\n".join(lines).encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                        f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>").encode())
+        page_ids.append(len(objects))
+
+    kids = " ".join(f"{i} 0 R" for i in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode()
+
+    with open(path, 'wb') as file:
+        file.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(file.tell())
+            file.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref_offset = file.tell()
+        file.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            file.write(b"%010d 00000 n \n" % offset)
+        file.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                   % (len(objects) + 1, xref_offset))
+
+
+def legacy_extract(path: str) -> str:
+    """Bisherige Implementierung aus FileService.extract_pdf_text"""
+    import PyPDF2
+
+    text = ""
+    with open(path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page in pdf_reader.pages:
+            text += page.extract_text() + "\n"
+    return text.strip()
+
+
+def timed(label: str, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    duration = time.perf_counter() - start
+    print(f"  {label:<32} {duration * 1000:9.1f} ms  ({len(result)} Zeichen)")
+    return duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--pdf', help='Eigenes PDF statt Referenz-PDF verwenden')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = args.pdf
+        if not pdf_path:
+            pdf_path = os.path.join(tmp_dir, 'reference.pdf')
+            build_reference_pdf(pdf_path, args.pages)
+
+        service = PDFService(os.path.join(tmp_dir, 'cache'), max_workers=args.workers)
+        print(f"📄 {pdf_path} ({os.path.getsize(pdf_path) // 1024} KB), {service.max_workers} Worker")
+
+        legacy = timed('seriell (alt)', legacy_extract, pdf_path)
+        cold = timed('parallel, kalter Cache', service.extract_text, pdf_path)
+        warm = timed('parallel, warmer Cache', service.extract_text, pdf_path)
+        service.shutdown()
+
+        print(f"\n⚡ Speedup kalt: {legacy / cold:.1f}x, warm: {legacy / warm:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Startzeit der App bis zur ersten beantworteten Anfrage
+
+Vergleicht eager (LAZY_SERVICES=0, alle Services beim Start wie früher) mit
+lazy (Services beim ersten Zugriff bzw. im Hintergrund-Warm-up). Jede Messung
+läuft in einem frischen Python-Prozess.
+
+Aufruf (aus dem backend-Ordner):
+    python benchmarks/bench_startup.py [--runs 3] [--path /protocols]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD_SCRIPT = r'''
+import json, sys, time
+start = time.perf_counter()
+import app as application
+imported = time.perf_counter()
+application.prepare_app()
+created = time.perf_counter()
+response = application.app.test_client().get(sys.argv[1])
+answered = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'prepare_app': created - imported,
+    'first_request': answered - created,
+    'total': answered - start,
+    'status': response.status_code
+}))
+'''
+
+
+def measure(mode: str, path: str) -> dict:
+    env = dict(os.environ)
+    env['LAZY_SERVICES'] = '0' if mode == 'eager' else '1'
+    # Warm-up-Thread nicht mitmessen, er läuft im Betrieb parallel zu den Anfragen
+    env['LAZY_WARMUP'] = '0'
+
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT, path],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=600
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{mode}: {result.stderr.strip().splitlines()[-1] if result.stderr else 'Fehler'}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--path', default='/protocols')
+    args = parser.parse_args()
+
+    print(f"{'Modus':<7} {'Import s':>9} {'prepare_app s':>13} {'1. Anfrage s':>13} {'Gesamt s':>9}")
+    for mode in ('eager', 'lazy'):
+        try:
+            runs = [measure(mode, args.path) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{mode:<7} fehlgeschlagen: {e}")
+            continue
+        median = {key: statistics.median(run[key] for run in runs) for key in ('import', 'prepare_app', 'first_request', 'total')}
+        print(f"{mode:<7} {median['import']:>9.2f} {median['prepare_app']:>13.2f} "
+              f"{median['first_request']:>13.2f} {median['total']:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
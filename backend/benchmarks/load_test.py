@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Lasttest: Anfragen pro Sekunde und Latenz-Perzentile für zentrale Endpunkte
+
+Vorher/Nachher-Vergleich Entwicklungsserver vs. gunicorn:
+    python app.py                                       # Werkzeug-Entwicklungsserver
+    gunicorn -c gunicorn.conf.py wsgi:application       # Produktivprofil
+
+Aufruf (aus dem backend-Ordner, gegen einen laufenden Server):
+    python benchmarks/load_test.py [--base-url http://localhost:5000] [--duration 30]
+        [--concurrency 32] [--protocol-id 1] [--endpoints protocols,download,generate-section]
+"""
+
+import time
+import argparse
+import threading
+import statistics
+from collections import defaultdict
+
+import requests
+
+SECTION_PAYLOAD = {
+    'section': 'zielsetzung',
+    'title': 'Lasttest Titration',
+    'description': 'Bestimmung der Konzentration einer NaOH-Lösung',
+    'existing_sections': {},
+    'uploaded_files': []
+}
+
+
+def build_requests(base_url: str, protocol_id: int):
+    """Anfrage-Definitionen: Name -> (Methode, URL, JSON-Body)"""
+    return {
+        'protocols': ('GET', f"{base_url}/protocols", None),
+        'download': ('GET', f"{base_url}/download/{protocol_id}/pdf", None),
+        'generate-section': ('POST', f"{base_url}/generate-section", SECTION_PAYLOAD),
+    }
+
+
+def run_endpoint(name, method, url, body, duration, concurrency):
+    """Feuert Anfragen aus mehreren Threads, bis die Dauer abgelaufen ist"""
+    latencies = []
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, json=body, timeout=600)
+                response.content
+                status = response.status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors[status] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - started
+
+    return summarize(name, latencies, errors, wall_time)
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(name, latencies, errors, wall_time):
+    return {
+        'endpoint': name,
+        'requests': len(latencies),
+        'errors': dict(errors),
+        'rps': len(latencies) / wall_time if wall_time else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_ms': statistics.mean(latencies) * 1000 if latencies else float('nan')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--duration', type=float, default=30.0, help='Sekunden pro Endpunkt')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--protocol-id', type=int, default=1)
+    parser.add_argument('--endpoints', default='protocols,download,generate-section')
+    args = parser.parse_args()
+
+    definitions = build_requests(args.base_url.rstrip('/'), args.protocol_id)
+    names = [name.strip() for name in args.endpoints.split(',') if name.strip()]
+
+    print(f"{'Endpunkt':<18} {'Anfragen':>9} {'RPS':>9} {'p50 ms':>9} {'p99 ms':>9}  Fehler")
+    for name in names:
+        method, url, body = definitions[name]
+        result = run_endpoint(name, method, url, body, args.duration, args.concurrency)
+        print(f"{result['endpoint']:<18} {result['requests']:>9} {result['rps']:>9.1f} "
+              f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f}  {result['errors'] or '-'}")
+
+
+if __name__ == '__main__':
+    main()
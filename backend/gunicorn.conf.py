@@ -0,0 +1,43 @@
+"""
+Gunicorn-Konfiguration für den Produktivbetrieb
+
+Anfragen warten überwiegend auf Ollama, pdflatex oder Tesseract (I/O bzw.
+Kindprozesse), daher wenige Prozesse mit vielen Threads (gthread). Alle Werte
+sind über Umgebungsvariablen einstellbar.
+
+Graceful Reload (z.B. nach Deployment): kill -HUP <master-pid>
+"""
+
+import os
+import multiprocessing
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Prozesse: ein Worker pro CPU reicht, die Parallelität kommt aus den Threads
+worker_class = 'gthread'
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+# LLM-Generierung kann Minuten dauern
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 60))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Worker regelmäßig erneuern (Speicher von OCR/PDF-Bibliotheken), versetzt statt gleichzeitig
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# Jeder Worker lädt die App selbst (eigene Thread-Pools und Hintergrund-Threads)
+preload_app = False
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def on_reload(server):
+    server.log.info("Graceful Reload: neue Worker starten, alte beenden laufende Anfragen")
+
+
+def worker_int(worker):
+    worker.log.info(f"Worker {worker.pid} wird beendet")
@@ -0,0 +1,363 @@
+"""
+Artifact Service - Index, Versionshistorie und Kompaktierung generierter Dateien
+"""
+
+import os
+import re
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .storage import LocalStorage, storage_key
+from .storage_layout import shard_dir
+
+logger = logging.getLogger(__name__)
+
+# Hilfsdateien von pdflatex, die nach dem Build nicht mehr benötigt werden
+DEBRIS_SUFFIXES = ('.aux', '.log', '.out')
+
+# Archivkopien älterer LaTeXService-Versionen: protocol_<id>_<YYYYMMDD>_<HHMMSS>.tex
+_LEGACY_ARCHIVE_PATTERN = re.compile(r'^protocol_(\d+)_\d{8}_\d{6}\.tex$')
+
+class ArtifactService:
+    """
+    Index der generierten Artefakte (PDF, TeX) in einer SQLite-Datei
+
+    Der SHA-256-Hash wird einmal berechnet, wenn ein Artefakt entsteht, und
+    dient beim Download als ETag. Größe, mtime und Inhalt kommen aus dem
+    Speicher-Backend, damit alle Replikate denselben Stand sehen. Dateien, die sich seit der Erfassung
+    geändert haben (Größe oder mtime), werden beim nächsten Zugriff neu erfasst.
+
+    Zusätzlich wird pro Protokoll eine Versionshistorie der TeX-Quellen
+    geführt (inhaltsadressiert, identische Quellen nur einmal). Eine
+    Hintergrund-Kompaktierung setzt die Aufbewahrungsregeln durch und entfernt
+    Build-Reste anhand des Index statt per Verzeichnis-Scan.
+    """
+
+    def __init__(self, generated_folder: str, db_path: Optional[str] = None,
+                 keep_versions: Optional[int] = None, max_version_age_days: Optional[int] = None,
+                 storage=None):
+        self.generated_folder = Path(generated_folder).resolve()
+        self.storage = storage if storage is not None else LocalStorage()
+        self.generated_folder.mkdir(parents=True, exist_ok=True)
+        self.db_path = Path(db_path) if db_path else self.generated_folder / 'artifacts.db'
+        self.versions_folder = self.generated_folder / 'versions'
+
+        # Aufbewahrung: letzte N Versionen, ältere Versionen nach Alter (0 = unbegrenzt)
+        self.keep_versions = keep_versions or int(os.environ.get('ARTIFACT_KEEP_VERSIONS', 10))
+        self.max_version_age_days = (
+            max_version_age_days if max_version_age_days is not None
+            else int(os.environ.get('ARTIFACT_MAX_VERSION_AGE_DAYS', 0))
+        )
+
+        # Mindestalter von Build-Resten vor dem Löschen (Sekunden)
+        self.debris_min_age = float(os.environ.get('ARTIFACT_DEBRIS_MIN_AGE', 600))
+
+        self._compaction_thread = None
+        self._stop_compaction = threading.Event()
+        # Weitere Aufräumarbeiten im Kompaktierungs-Thread: Name -> Funktion (liefert Anzahl)
+        self._compaction_tasks: Dict[str, Callable[[], int]] = {}
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS artifacts (
+                name TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                protocol_id INTEGER
+            )
+        ''')
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS versions (
+                protocol_id INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (protocol_id, sha256)
+            )
+        ''')
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS debris (
+                name TEXT PRIMARY KEY,
+                created_at REAL NOT NULL
+            )
+        ''')
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        self._connection.commit()
+
+    def on_pdf_created(self, protocol_id: int, pdf_path: Path):
+        """Listener für LaTeXService: PDF und TeX erfassen, Version archivieren (nach dem Veröffentlichen)"""
+        pdf_path = Path(pdf_path)
+        self.record(pdf_path, protocol_id)
+
+        tex_path = pdf_path.with_suffix('.tex')
+        if tex_path.exists():
+            self.record(tex_path, protocol_id)
+            self.archive_version(protocol_id, tex_path)
+
+    def on_build_finished(self, protocol_id: int, tex_path: Path):
+        """Listener für LaTeXService: Build-Reste (auch fehlgeschlagener Builds) vormerken"""
+        now = time.time()
+        with self._lock:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO debris (name, created_at) VALUES (?, ?)',
+                [(self._name(Path(tex_path).with_suffix(suffix)), now) for suffix in DEBRIS_SUFFIXES]
+            )
+            self._connection.commit()
+
+    def archive_version(self, protocol_id: int, tex_path: Path, created_at: Optional[float] = None) -> str:
+        """
+        Legt die TeX-Quelle als Version des Protokolls ab
+
+        Identische Quellen werden nicht erneut gespeichert, sondern nur als
+        neueste Version markiert.
+
+        Args:
+            protocol_id: ID des Protokolls
+            tex_path: Pfad zur TeX-Datei
+            created_at: Zeitpunkt der Version (Standard: jetzt)
+
+        Returns:
+            SHA-256-Hash der Version
+        """
+        tex_path = Path(tex_path)
+        sha256 = self._hash_file(tex_path)
+        version_path = self.version_dir(protocol_id) / f"{sha256[:16]}.tex"
+
+        if not version_path.exists():
+            version_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = version_path.with_name(f".{version_path.name}.{os.getpid()}.tmp")
+            shutil.copyfile(tex_path, tmp_path)
+            os.replace(tmp_path, version_path)
+
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO versions (protocol_id, sha256, name, size, created_at) VALUES (?, ?, ?, ?, ?)',
+                (protocol_id, sha256, self._name(version_path), version_path.stat().st_size, created_at or time.time())
+            )
+            self._connection.commit()
+        return sha256
+
+    def version_dir(self, protocol_id: int) -> Path:
+        """Versionsordner eines Protokolls: versions/<shard>/protocol_<id>"""
+        name = f"protocol_{protocol_id}"
+        return shard_dir(self.versions_folder, name) / name
+
+    def list_versions(self, protocol_id: int) -> List[Dict]:
+        """Versionshistorie eines Protokolls, neueste zuerst"""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT sha256, name, size, created_at FROM versions WHERE protocol_id = ? ORDER BY created_at DESC',
+                (protocol_id,)
+            ).fetchall()
+        return [{'sha256': row[0], 'name': row[1], 'size': row[2], 'created_at': row[3]} for row in rows]
+
+    def start_compaction(self, interval_seconds: Optional[int] = None):
+        """Startet die periodische Kompaktierung in einem Hintergrund-Thread"""
+        if self._compaction_thread is not None:
+            return
+
+        interval = interval_seconds or int(os.environ.get('ARTIFACT_COMPACTION_INTERVAL', 3600))
+
+        def run():
+            while not self._stop_compaction.is_set():
+                try:
+                    self.compact()
+                except Exception as e:
+                    logger.error(f"Artefakt-Kompaktierung fehlgeschlagen: {str(e)}")
+                self._stop_compaction.wait(interval)
+
+        self._compaction_thread = threading.Thread(target=run, name='artifact-compaction', daemon=True)
+        self._compaction_thread.start()
+
+    def add_compaction_task(self, name: str, task: Callable[[], int]):
+        """Registriert eine Aufräumfunktion, die bei jeder Kompaktierung mitläuft"""
+        self._compaction_tasks[name] = task
+
+    def stop_compaction(self):
+        self._stop_compaction.set()
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Setzt die Aufbewahrungsregeln durch und entfernt Build-Reste
+
+        Returns:
+            Anzahl importierter Altversionen, gelöschter Versionen und Reste
+        """
+        stats = {'imported': self._import_legacy_archives(), 'versions': 0, 'debris': 0}
+
+        # Build-Reste erst nach debris_min_age: ein erneuter Build desselben Protokolls
+        # (z.B. zwischen den beiden pdflatex-Läufen) braucht seine .aux noch
+        debris_cutoff = time.time() - self.debris_min_age
+        with self._lock:
+            debris = self._connection.execute(
+                'SELECT name FROM debris WHERE created_at < ?', (debris_cutoff,)
+            ).fetchall()
+        for (name,) in debris:
+            try:
+                if (self.generated_folder / name).stat().st_mtime >= debris_cutoff:
+                    continue  # gerade von einem laufenden Build geschrieben
+            except OSError:
+                pass
+            if self._unlink(name):
+                stats['debris'] += 1
+            with self._lock:
+                self._connection.execute('DELETE FROM debris WHERE name = ? AND created_at < ?', (name, debris_cutoff))
+                self._connection.commit()
+
+        cutoff = time.time() - self.max_version_age_days * 86400 if self.max_version_age_days else None
+        with self._lock:
+            protocol_ids = [row[0] for row in self._connection.execute('SELECT DISTINCT protocol_id FROM versions')]
+
+        for protocol_id in protocol_ids:
+            # Die neueste Version bleibt immer erhalten
+            for index, version in enumerate(self.list_versions(protocol_id)):
+                expired = index >= self.keep_versions or (index > 0 and cutoff and version['created_at'] < cutoff)
+                if not expired:
+                    continue
+                with self._lock:
+                    self._connection.execute(
+                        'DELETE FROM versions WHERE protocol_id = ? AND sha256 = ?', (protocol_id, version['sha256'])
+                    )
+                    self._connection.commit()
+                self._unlink(version['name'])
+                stats['versions'] += 1
+
+        for name, task in list(self._compaction_tasks.items()):
+            try:
+                stats[name] = task()
+            except Exception as e:
+                logger.error(f"Aufräumen '{name}' fehlgeschlagen: {str(e)}")
+
+        if any(stats.values()):
+            logger.info(f"Artefakt-Kompaktierung: {stats}")
+        return stats
+
+    def _import_legacy_archives(self) -> int:
+        """Übernimmt einmalig alte Zeitstempel-Archive und Build-Reste in den Index"""
+        with self._lock:
+            done = self._connection.execute("SELECT value FROM meta WHERE key = 'legacy_imported'").fetchone()
+        if done:
+            return 0
+
+        imported = 0
+        for path in sorted(self.generated_folder.iterdir(), key=lambda path: path.name):
+            if not path.is_file():
+                continue
+            match = _LEGACY_ARCHIVE_PATTERN.match(path.name)
+            try:
+                if match:
+                    self.archive_version(int(match.group(1)), path, created_at=path.stat().st_mtime)
+                    path.unlink()
+                    imported += 1
+                elif path.suffix in DEBRIS_SUFFIXES:
+                    path.unlink()
+            except OSError as e:
+                logger.warning(f"Altes Artefakt konnte nicht übernommen werden ({path.name}): {str(e)}")
+
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_imported', '1')")
+            self._connection.commit()
+        return imported
+
+    def _unlink(self, name: str) -> bool:
+        """Löscht eine Datei relativ zum generated-Ordner, falls vorhanden"""
+        try:
+            (self.generated_folder / name).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning(f"Artefakt konnte nicht gelöscht werden ({name}): {str(e)}")
+            return False
+
+    def record(self, path: Path, protocol_id: Optional[int] = None) -> Dict:
+        """
+        Berechnet den Hash eines Artefakts und speichert ihn im Index
+
+        Args:
+            path: Pfad zur Datei im generated-Ordner
+            protocol_id: Zugehöriges Protokoll (optional)
+
+        Returns:
+            Dict mit 'sha256', 'size' und 'mtime'
+        """
+        path = Path(path)
+        key = storage_key(path)
+        stat = self.storage.stat(key)
+        if stat is None:
+            raise FileNotFoundError(key)
+        entry = {'sha256': self._hash_stored(key), 'size': stat['size'], 'mtime': stat['mtime']}
+
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO artifacts (name, sha256, size, mtime, protocol_id) VALUES (?, ?, ?, ?, ?)',
+                (self._name(path), entry['sha256'], entry['size'], entry['mtime'], protocol_id)
+            )
+            self._connection.commit()
+        return entry
+
+    def get(self, path: Path) -> Optional[Dict]:
+        """
+        Liefert die Validatoren eines Artefakts
+
+        Returns:
+            Dict mit 'sha256', 'size' und 'mtime' oder None, wenn die Datei fehlt
+        """
+        path = Path(path)
+        stat = self.storage.stat(storage_key(path))
+        if stat is None:
+            return None
+
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT sha256, size, mtime FROM artifacts WHERE name = ?', (self._name(path),)
+            ).fetchone()
+
+        if row and row[1] == stat['size'] and row[2] == stat['mtime']:
+            return {'sha256': row[0], 'size': row[1], 'mtime': row[2]}
+
+        logger.info(f"Artefakt neu erfasst: {path.name}")
+        try:
+            return self.record(path)
+        except OSError as e:
+            # Datei wurde zwischen stat() und Hash-Berechnung ersetzt oder gelöscht
+            logger.warning(f"Artefakt konnte nicht erfasst werden: {path.name}: {str(e)}")
+            return None
+
+    def _name(self, path: Path) -> str:
+        """Schlüssel relativ zum generated-Ordner"""
+        path = path.resolve()
+        try:
+            return str(path.relative_to(self.generated_folder))
+        except ValueError:
+            return str(path)
+
+    def _hash_file(self, path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _hash_stored(self, key: str) -> str:
+        """SHA-256 eines Artefakts, blockweise aus dem Speicher-Backend gelesen"""
+        digest = hashlib.sha256()
+        with self.storage.open_read(key) as stream:
+            for block in iter(lambda: stream.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
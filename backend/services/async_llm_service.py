@@ -0,0 +1,385 @@
+"""
+Async LLM Service - Nebenläufige Ollama-Anfragen über ollama.AsyncClient
+
+Der synchrone ollama.Client belegt für jede laufende Generierung einen
+Thread samt offener HTTP-Verbindung. Hier laufen alle Generierungen eines
+Workers als Tasks auf einer gemeinsamen Event-Loop in einem Hintergrund-Thread:
+
+- der LLMRouter verteilt die Anfragen auf die Ollama-Instanzen (OLLAMA_BASE_URLS)
+- der LLMScheduler begrenzt die gleichzeitigen Anfragen an Ollama
+  (OLLAMA_MAX_CONCURRENCY, Standard 4 pro Backend) und vergibt freie Slots nach
+  Priorität und reihum pro Nutzer; Wartende belegen keine Verbindung
+- identische gleichzeitige Anfragen (Modell, Prompt, Optionen) werden zu
+  einer Generierung zusammengefasst (SingleFlight)
+- generate_structured_protocol() fordert die Abschnitte als JSON an und fragt
+  nur fehlende Abschnitte nach (siehe structured_output)
+- speculate() generiert wahrscheinliche Folgeanfragen bei freier Kapazität
+  vorab; Anfragen mit use_cache=True bedienen sich daraus (SpeculativeCache)
+- jede Anfrage hat ein Timeout (OLLAMA_TIMEOUT bzw. pro Anfrage)
+- trennt der HTTP-Client die Verbindung, wird der Task abgebrochen; httpx
+  schließt dabei die Verbindung zu Ollama und die Generierung endet dort
+"""
+
+import os
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple
+
+from .llm_service import LLMService
+from .llm_router import LLMRouter, ollama_base_urls
+from .single_flight import SingleFlight, request_key
+from .llm_scheduler import LLMScheduler, SlotTicket
+from .speculation import SpeculativeCache
+from .structured_output import PROTOCOL_SECTIONS, parse_sections, sections_to_text
+from .client_connection import GenerationCancelled
+
+logger = logging.getLogger(__name__)
+
+# Intervall, in dem wartende Request-Threads die Client-Verbindung prüfen
+DISCONNECT_POLL_INTERVAL = 0.5
+
+
+class AsyncLLMService(LLMService):
+    """LLM-Service, dessen Generierungen als asyncio-Tasks auf einer Event-Loop laufen"""
+
+    def __init__(self, max_concurrency: int = None, timeout: float = None,
+                 speculation_db: Optional[str] = None):
+        # Synchroner Client für Modellprüfung und is_available()
+        super().__init__()
+
+        self.max_concurrency = max_concurrency or int(
+            os.environ.get('OLLAMA_MAX_CONCURRENCY', 4 * len(ollama_base_urls()))
+        )
+        self.timeout = timeout or float(os.environ.get('OLLAMA_TIMEOUT', 300))
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name='llm-event-loop', daemon=True)
+        self._thread.start()
+
+        # Router (mit den AsyncClients) gehört zur Event-Loop und wird dort erstellt
+        self.router = self._call_in_loop(self._create_router())
+        self.scheduler = LLMScheduler(self.max_concurrency)
+        self._single_flight = SingleFlight()
+        # Vorab generierte Ergebnisse, bei speculation_db für alle Worker-Prozesse gemeinsam
+        self.speculation = SpeculativeCache(speculation_db)
+        self.structured_stats = {
+            'requests': 0,          # Protokolle mit JSON-Ausgabe
+            'complete_first': 0,    # alle Abschnitte in der ersten Antwort
+            'retries': 0,           # Nachfragen für fehlende Abschnitte
+            'retried_sections': 0,
+            'incomplete': 0,        # Abschnitte fehlen auch nach allen Nachfragen
+            'failed': 0             # keine verwertbare Antwort
+        }
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _create_router(self):
+        # Einzelne Backend-Anfragen enden vor dem Gesamt-Timeout, damit Hänger als Fehler zählen
+        request_timeout = float(os.environ.get('LLM_REQUEST_TIMEOUT', self.timeout / 2))
+        return LLMRouter(request_timeout=request_timeout)
+
+    def _call_in_loop(self, coroutine: Coroutine) -> Any:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Scheduler-Warteschlangen, Zusammenfassung identischer Anfragen und Zustand der Backends"""
+        return self._call_in_loop(self._loop_stats())
+
+    async def _loop_stats(self):
+        stats = self.scheduler.stats()
+        stats['coalescing'] = self._single_flight.stats()
+        stats['speculation'] = self.speculation.stats()
+        stats['structured_output'] = dict(self.structured_stats)
+        stats['backends'] = self.router.stats()
+        return stats
+
+    async def agenerate(self, prompt: str, options: Optional[Dict] = None,
+                        timeout: Optional[float] = None, priority: str = 'standard',
+                        user: Optional[str] = None, use_cache: bool = False, format: str = '') -> str:
+        """
+        Generiert Text mit Ollama (Coroutine, läuft auf der Event-Loop des Services)
+
+        Läuft bereits eine identische Generierung, wird auf deren Ergebnis gewartet.
+
+        Args:
+            prompt: Vollständiger Prompt
+            options: Ollama-Optionen (Standard: PROTOCOL_OPTIONS)
+            timeout: Timeout in Sekunden inkl. Wartezeit auf einen Slot
+            priority: Prioritätsklasse ('interactive', 'standard', 'batch')
+            user: Nutzerkennung für faire Slot-Vergabe
+            use_cache: Vorab generiertes Ergebnis verwenden, falls vorhanden
+            format: Ausgabeformat für Ollama ('' oder 'json')
+
+        Returns:
+            Generierter Text
+
+        Raises:
+            asyncio.TimeoutError: Timeout überschritten
+        """
+        options = options or self.PROTOCOL_OPTIONS
+        key = self._request_key(prompt, options, format)
+        if use_cache:
+            cached = self.speculation.take(key)
+            if cached is not None:
+                return cached
+        ticket = SlotTicket(priority, user)
+        # Hängt sich eine höher priorisierte Anfrage an, wartet der gemeinsame Aufruf in deren Klasse
+        return await asyncio.wait_for(
+            self._single_flight.do(
+                key, lambda: self._generate_with_slot(prompt, options, ticket, format), context=ticket,
+                on_join=lambda shared: self.scheduler.promote(shared, priority, user)
+            ),
+            timeout or self.timeout
+        )
+
+    def _request_key(self, prompt: str, options: Dict, format: str = '') -> str:
+        """Schlüssel für SingleFlight und SpeculativeCache"""
+        if format:
+            return request_key(self.model_name, prompt, options, format)
+        return request_key(self.model_name, prompt, options)
+
+    async def _generate_with_slot(self, prompt: str, options: Dict, ticket: SlotTicket,
+                                  format: str = '') -> str:
+        async with self.scheduler.slot(ticket=ticket):
+            response = await self.router.generate(
+                model=self.model_name,
+                prompt=prompt,
+                options=options,
+                format=format
+            )
+            return response['response']
+
+    async def agenerate_protocol_content(self, files: List[Dict], protocol_metadata: Dict,
+                                         timeout: Optional[float] = None, priority: str = 'standard',
+                                         user: Optional[str] = None, use_cache: bool = False) -> str:
+        """Async-Variante von generate_protocol_content() (ohne Fallback)"""
+        input_context = self._prepare_input_context(files, protocol_metadata)
+        prompt = self._create_protocol_prompt(input_context)
+        generated_content = await self.agenerate(prompt, timeout=timeout, priority=priority,
+                                                 user=user, use_cache=use_cache)
+        return self._validate_generated_content(generated_content)
+
+    async def agenerate_protocol_sections(self, files: List[Dict], protocol_metadata: Dict,
+                                          timeout: Optional[float] = None, priority: str = 'standard',
+                                          user: Optional[str] = None) -> Dict[str, str]:
+        """
+        Generiert die Protokoll-Abschnitte als JSON (Ollama format='json', ohne Fallback)
+
+        Fehlen nach der ersten Antwort Abschnitte (ungültiges oder abgeschnittenes
+        JSON), werden nur diese mit kleinerem Token-Budget erneut angefordert.
+        Scheitert eine Nachfrage (Timeout, Backend-Fehler), bleiben die bereits
+        erhaltenen Abschnitte erhalten. Das Timeout gilt für alle Anfragen inkl.
+        der Nachfragen zusammen.
+
+        Returns:
+            Abschnitts-Schlüssel -> Inhalt für alle Abschnitte aus PROTOCOL_SECTIONS
+            (fehlende als MISSING_SECTION)
+
+        Raises:
+            ValueError: Kein Abschnitt erhalten
+        """
+        input_context = self._prepare_input_context(files, protocol_metadata)
+        deadline = self._loop.time() + (timeout or self.timeout)
+        self.structured_stats['requests'] += 1
+
+        sections = {}
+        try:
+            for attempt in range(1 + self.structured_retries):
+                missing = [key for key in PROTOCOL_SECTIONS if key not in sections]
+                if not missing:
+                    break
+                if attempt:
+                    self.structured_stats['retries'] += 1
+                    self.structured_stats['retried_sections'] += len(missing)
+                try:
+                    text = await self.agenerate(
+                        self._create_structured_prompt(input_context, missing),
+                        options=self._structured_options(missing),
+                        timeout=max(deadline - self._loop.time(), 0.001),
+                        priority=priority, user=user, format='json'
+                    )
+                except Exception as e:
+                    if not sections:
+                        raise
+                    # Erhaltene Abschnitte behalten, der Rest wird als zu ergänzen markiert
+                    logger.warning(f"Nachfrage für {len(missing)} Abschnitt(e) fehlgeschlagen: "
+                                   f"{str(e) or type(e).__name__}")
+                    break
+                sections.update(parse_sections(text, missing))
+                if attempt == 0 and len(sections) == len(PROTOCOL_SECTIONS):
+                    self.structured_stats['complete_first'] += 1
+            completed = self._complete_sections(sections, protocol_metadata)
+        except Exception:
+            self.structured_stats['failed'] += 1
+            raise
+        if len(sections) < len(PROTOCOL_SECTIONS):
+            self.structured_stats['incomplete'] += 1
+        return completed
+
+    def run(self, coroutine: Coroutine, is_disconnected: Optional[Callable[[], bool]] = None) -> Any:
+        """
+        Führt eine Coroutine auf der Event-Loop aus und wartet auf das Ergebnis
+
+        Der aufrufende Request-Thread prüft währenddessen periodisch, ob der
+        Client noch verbunden ist, und bricht den Task andernfalls ab.
+
+        Raises:
+            GenerationCancelled: Client hat die Verbindung getrennt
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        try:
+            # Nicht future.result(timeout=...): dessen TimeoutError ist nicht vom
+            # asyncio.TimeoutError der Coroutine zu unterscheiden
+            while not concurrent.futures.wait([future], timeout=DISCONNECT_POLL_INTERVAL).done:
+                if is_disconnected is not None and is_disconnected():
+                    raise GenerationCancelled("Client hat die Verbindung getrennt")
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def generate_protocol_content(self, files: List[Dict], protocol_metadata: Dict,
+                                  timeout: Optional[float] = None,
+                                  is_disconnected: Optional[Callable[[], bool]] = None,
+                                  priority: str = 'standard', user: Optional[str] = None,
+                                  use_cache: bool = False) -> str:
+        """
+        Generiert den Protokoll-Inhalt über die Event-Loop
+
+        Args:
+            files: Liste der hochgeladenen Dateien mit Metadaten
+            protocol_metadata: Zusätzliche Metadaten für die Generierung
+            timeout: Timeout in Sekunden (Standard: OLLAMA_TIMEOUT)
+            is_disconnected: Prüffunktion für Verbindungsabbruch (siehe client_disconnected)
+            priority: Prioritätsklasse im Scheduler ('interactive', 'standard', 'batch')
+            user: Nutzerkennung für faire Slot-Vergabe
+            use_cache: Vorab generiertes Ergebnis verwenden (siehe speculate)
+
+        Returns:
+            Generierter Protokoll-Inhalt, bei Fehler oder Timeout der Fallback-Inhalt
+
+        Raises:
+            GenerationCancelled: Client hat die Verbindung getrennt
+        """
+        try:
+            return self.run(
+                self.agenerate_protocol_content(files, protocol_metadata, timeout, priority, user, use_cache),
+                is_disconnected
+            )
+        except GenerationCancelled:
+            logger.info(f"Generierung abgebrochen: {protocol_metadata.get('title', 'unbenannt')}")
+            raise
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout bei der Protokoll-Generierung nach {timeout or self.timeout:g}s")
+            return self._create_fallback_content(files, protocol_metadata)
+        except Exception as e:
+            logger.error(f"Fehler bei der Protokoll-Generierung: {str(e)}")
+            return self._create_fallback_content(files, protocol_metadata)
+
+    def generate_structured_protocol(self, files: List[Dict], protocol_metadata: Dict,
+                                     timeout: Optional[float] = None,
+                                     is_disconnected: Optional[Callable[[], bool]] = None,
+                                     priority: str = 'standard',
+                                     user: Optional[str] = None) -> Tuple[str, Optional[Dict[str, str]]]:
+        """
+        Generiert ein Protokoll, bei aktiver JSON-Ausgabe (LLM_STRUCTURED_OUTPUT) abschnittsweise
+
+        Args wie generate_protocol_content().
+
+        Returns:
+            (Textinhalt für Protocol.generated_content, Abschnitte oder None bei
+            Freitext bzw. Fallback-Inhalt)
+
+        Raises:
+            GenerationCancelled: Client hat die Verbindung getrennt
+        """
+        if not self.structured_output:
+            content = self.generate_protocol_content(files, protocol_metadata, timeout, is_disconnected,
+                                                     priority, user)
+            return content, None
+
+        try:
+            sections = self.run(
+                self.agenerate_protocol_sections(files, protocol_metadata, timeout, priority, user),
+                is_disconnected
+            )
+        except GenerationCancelled:
+            logger.info(f"Generierung abgebrochen: {protocol_metadata.get('title', 'unbenannt')}")
+            raise
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout bei der Protokoll-Generierung nach {timeout or self.timeout:g}s")
+            return self._create_fallback_content(files, protocol_metadata), None
+        except Exception as e:
+            logger.error(f"Fehler bei der Protokoll-Generierung: {str(e)}")
+            return self._create_fallback_content(files, protocol_metadata), None
+
+        title = protocol_metadata.get('title', 'Laborprotokoll')
+        return sections_to_text(title, sections), sections
+
+    def speculate(self, tag: str, requests: List[tuple]):
+        """
+        Generiert Protokoll-Inhalte vorab, ohne auf das Ergebnis zu warten
+
+        Ergebnisse früherer Aufrufe mit demselben Tag, deren Eingaben nicht mehr
+        vorkommen, werden verworfen bzw. abgebrochen.
+
+        Args:
+            tag: Kennung der Quelle, z.B. 'draft:12'
+            requests: Liste von (files, protocol_metadata) wie für generate_protocol_content
+        """
+        prompts = [
+            self._create_protocol_prompt(self._prepare_input_context(files, metadata))
+            for files, metadata in requests
+        ]
+        asyncio.run_coroutine_threadsafe(self._speculate(tag, prompts), self._loop)
+
+    async def _speculate(self, tag: str, prompts: List[str]):
+        keyed = [(self._request_key(prompt, self.PROTOCOL_OPTIONS), prompt) for prompt in prompts]
+        self.speculation.invalidate(tag, keep=[key for key, _ in keyed])
+
+        for key, prompt in keyed:
+            if self.speculation.is_known(key):
+                self.speculation.count('skipped_known')
+            elif not self.scheduler.has_idle_capacity('batch'):
+                # Nie hinter Nutzeranfragen anstellen, nur freie Kapazität nutzen
+                self.speculation.count('skipped_busy')
+            else:
+                task = asyncio.ensure_future(self._run_speculation(key, prompt))
+                self.speculation.track(tag, key, task)
+                await asyncio.sleep(0)  # Task den Slot belegen lassen, bevor die Kapazität erneut geprüft wird
+
+    async def _run_speculation(self, key: str, prompt: str):
+        text = None
+        try:
+            text = await self.agenerate(prompt, priority='batch', user='speculative')
+            self.speculation.count('completed')
+        except asyncio.CancelledError:
+            self.speculation.count('cancelled')
+        except Exception as e:
+            self.speculation.count('failed')
+            logger.info(f"Vorab-Generierung fehlgeschlagen: {str(e)}")
+        finally:
+            self.speculation.finish(key, text)
+
+    def refine_section(self, section_content: str, section_type: str,
+                       user: Optional[str] = None) -> str:
+        """Verfeinert einen Abschnitt (interaktive Priorität im Scheduler)"""
+        try:
+            return self.run(self.agenerate(
+                self._create_refinement_prompt(section_content, section_type),
+                options=self.REFINEMENT_OPTIONS, priority='interactive', user=user
+            ))
+        except Exception as e:
+            logger.error(f"Fehler bei der Abschnitts-Verfeinerung: {str(e)}")
+            return section_content
+
+    def shutdown(self):
+        """Beendet die Event-Loop (offene Generierungen werden abgebrochen)"""
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
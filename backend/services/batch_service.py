@@ -0,0 +1,468 @@
+"""
+Batch Service - Protokoll-Generierung für ganze Kurse oder Versuchsreihen
+
+Ein Manifest beschreibt viele Protokolle (Titel, Metadaten, Dateien bzw.
+Ordner im Upload-Verzeichnis). Beim Anlegen werden alle Protocol-Zeilen in
+einer Transaktion erstellt; danach läuft der Job als Pipeline:
+
+    OCR/Textextraktion → LLM-Generierung → LaTeX/PDF
+
+Jede Stufe hat eigene Worker (BATCH_OCR_WORKERS, BATCH_LLM_WORKERS,
+BATCH_LATEX_WORKERS). Zwischenergebnisse (extrahierte Texte, generierter
+Inhalt bzw. Abschnitte) werden als Checkpoint gespeichert, gebündelt in wenigen Transaktionen.
+Ein abgebrochener oder unterbrochener Job setzt beim Fortsetzen an der
+letzten abgeschlossenen Stufe jedes Protokolls wieder an.
+"""
+
+import os
+import socket
+import logging
+import mimetypes
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .client_connection import GenerationCancelled
+from .pipeline import BulkWriter, Pipeline, Stage
+from .structured_output import build_sections_content, sections_to_text
+
+logger = logging.getLogger(__name__)
+
+# Reihenfolge der Checkpoints eines Protokolls
+ITEM_STAGES = ('pending', 'extracted', 'generated', 'completed')
+
+FINISHED_STATUSES = ('completed', 'completed_with_errors', 'cancelled')
+
+
+class BatchService:
+    """Legt Batch-Jobs aus Manifesten an und führt sie als Pipeline aus"""
+
+    def __init__(self, app, db, models: Dict, extraction_service, llm_service, latex_service,
+                 upload_folder: str):
+        """
+        Args:
+            app: Flask-App (für den App-Kontext in Hintergrund-Threads)
+            db: SQLAlchemy-Instanz
+            models: Modellklassen 'Protocol', 'BatchJob', 'BatchJobItem'
+            extraction_service: TextExtractionService
+            llm_service: AsyncLLMService
+            latex_service: LaTeXService
+            upload_folder: Basisordner für Dateipfade im Manifest
+        """
+        self.app = app
+        self.db = db
+        self.Protocol = models['Protocol']
+        self.BatchJob = models['BatchJob']
+        self.BatchJobItem = models['BatchJobItem']
+        self.extraction_service = extraction_service
+        self.llm_service = llm_service
+        self.latex_service = latex_service
+        self.upload_folder = Path(upload_folder).resolve()
+
+        self.ocr_workers = int(os.environ.get('BATCH_OCR_WORKERS', 2))
+        self.llm_workers = int(os.environ.get('BATCH_LLM_WORKERS', 4))
+        self.latex_workers = int(os.environ.get('BATCH_LATEX_WORKERS', 2))
+        self.stale_after = timedelta(seconds=int(os.environ.get('BATCH_STALE_SECONDS', 60)))
+        self.runner_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        # Laufende Jobs dieses Prozesses: job_id -> (Pipeline, cancel_event)
+        self._running: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    # --- Manifest und Anlegen ---
+
+    def create_job(self, manifest: Dict) -> int:
+        """
+        Legt einen Batch-Job samt aller Protokolle in einer Transaktion an
+
+        Manifest:
+            {"name": "...", "pdf": true, "protocols": [
+                {"title": "...", "author": "...", "metadata": {...},
+                 "files": ["projects/kurs1/a.jpg", ...]}  oder  {"folder": "projects/kurs1/anna"}
+            ]}
+
+        Returns:
+            ID des Jobs
+
+        Raises:
+            ValueError: Ungültiges Manifest oder Pfad außerhalb des Upload-Ordners
+        """
+        entries = manifest.get('protocols')
+        if not isinstance(entries, list) or not entries:
+            raise ValueError("Manifest enthält keine Protokolle")
+
+        prepared = [self._prepare_entry(position, entry) for position, entry in enumerate(entries)]
+
+        job = self.BatchJob(
+            name=manifest.get('name') or f"Batch {datetime.now():%Y-%m-%d %H:%M}",
+            status='queued',
+            options={'pdf': bool(manifest.get('pdf', True))},
+            total=len(prepared)
+        )
+        self.db.session.add(job)
+        self.db.session.flush()
+
+        protocols = []
+        for entry in prepared:
+            protocol = self.Protocol(
+                title=entry['title'],
+                status='queued',
+                author=entry['author'],
+                experiment_type=entry['metadata'].get('experiment_type'),
+                input_files=entry['files'],
+                protocol_metadata=dict(entry['metadata'], batch_job_id=job.id)
+            )
+            protocols.append(protocol)
+        self.db.session.add_all(protocols)
+        self.db.session.flush()
+
+        self.db.session.add_all([
+            self.BatchJobItem(job_id=job.id, position=entry['position'], protocol_id=protocol.id,
+                              stage='pending', files=entry['files'])
+            for entry, protocol in zip(prepared, protocols)
+        ])
+        self.db.session.commit()
+
+        logger.info(f"Batch-Job {job.id} angelegt: {len(prepared)} Protokolle")
+        return job.id
+
+    def _prepare_entry(self, position: int, entry: Dict) -> Dict:
+        if not isinstance(entry, dict) or not entry.get('title'):
+            raise ValueError(f"Protokoll {position + 1}: Titel fehlt")
+
+        files = [self._resolve(path, position) for path in entry.get('files', [])]
+        if entry.get('folder'):
+            folder = self.upload_folder / self._resolve(entry['folder'], position)
+            if not folder.is_dir():
+                raise ValueError(f"Protokoll {position + 1}: Ordner nicht gefunden: {entry['folder']}")
+            files.extend(
+                str(path.relative_to(self.upload_folder))
+                for path in sorted(folder.rglob('*')) if path.is_file()
+            )
+        if not files:
+            raise ValueError(f"Protokoll {position + 1}: keine Dateien angegeben")
+
+        metadata = dict(entry.get('metadata') or {})
+        for key in ('author', 'experiment_type', 'date'):
+            if entry.get(key):
+                metadata.setdefault(key, entry[key])
+        metadata.setdefault('title', entry['title'])
+
+        return {
+            'position': position,
+            'title': entry['title'],
+            'author': entry.get('author'),
+            'metadata': metadata,
+            'files': files
+        }
+
+    def _resolve(self, relative_path: str, position: int) -> str:
+        """Prüft, dass ein Manifest-Pfad im Upload-Ordner liegt, und normalisiert ihn"""
+        path = (self.upload_folder / relative_path).resolve()
+        if path != self.upload_folder and self.upload_folder not in path.parents:
+            raise ValueError(f"Protokoll {position + 1}: Pfad außerhalb des Upload-Ordners: {relative_path}")
+        return str(path.relative_to(self.upload_folder))
+
+    # --- Ausführen, Abbrechen, Fortsetzen ---
+
+    def start(self, job_id: int):
+        """Startet einen Job im Hintergrund"""
+        cancel_event = threading.Event()
+        with self._lock:
+            if job_id in self._running:
+                return
+            self._running[job_id] = (None, cancel_event)
+
+        threading.Thread(target=self._run, args=(job_id, cancel_event),
+                         name=f'batch-job-{job_id}', daemon=True).start()
+
+    def cancel(self, job_id: int) -> bool:
+        """Bricht einen Job ab (auch wenn er in einem anderen Worker-Prozess läuft)"""
+        job = self.db.session.get(self.BatchJob, job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return False
+
+        job.status = 'cancelled'
+        job.finished_at = datetime.utcnow()
+        self.db.session.commit()
+
+        with self._lock:
+            running = self._running.get(job_id)
+        if running is not None:
+            running[1].set()
+        return True
+
+    def resume(self, job_id: int) -> bool:
+        """
+        Setzt einen abgebrochenen, unterbrochenen oder teilweise fehlgeschlagenen Job fort
+
+        Fehlgeschlagene Protokolle werden ab ihrem letzten Checkpoint wiederholt.
+        """
+        job = self.db.session.get(self.BatchJob, job_id)
+        if job is None or self.job_status(job) in ('running', 'queued', 'completed'):
+            return False
+
+        failed_items = self.BatchJobItem.query.filter_by(job_id=job_id, stage='failed').all()
+        protocols = self._protocols_by_id(item.protocol_id for item in failed_items)
+        for item in failed_items:
+            protocol = protocols.get(item.protocol_id)
+            if protocol is not None and protocol.generated_content:
+                item.stage = 'generated'
+            elif item.extracted_files is not None:
+                item.stage = 'extracted'
+            else:
+                item.stage = 'pending'
+            item.error = None
+            if protocol is not None:
+                protocol.status = 'queued'
+
+        job.status = 'queued'
+        job.finished_at = None
+        self.db.session.commit()
+
+        self.start(job_id)
+        return True
+
+    def job_status(self, job) -> str:
+        """Status inkl. 'interrupted' für laufende Jobs ohne aktuelles Lebenszeichen"""
+        if job.status in ('queued', 'running'):
+            with self._lock:
+                local = job.id in self._running
+            heartbeat = job.heartbeat_at or job.created_at
+            if not local and heartbeat and datetime.utcnow() - heartbeat > self.stale_after:
+                return 'interrupted'
+        return job.status
+
+    def _run(self, job_id: int, cancel_event: threading.Event):
+        try:
+            with self.app.app_context():
+                items = self._load_items(job_id)
+                options = self.db.session.get(self.BatchJob, job_id).options or {}
+
+            writer = BulkWriter(lambda records: self._flush(job_id, records, cancel_event),
+                                name=f'batch-writer-{job_id}')
+            stages = [
+                Stage('ocr', lambda item: self._extract(item, writer, cancel_event), self.ocr_workers),
+                Stage('llm', lambda item: self._generate(job_id, item, writer, cancel_event), self.llm_workers)
+            ]
+            if options.get('pdf', True):
+                stages.append(Stage('latex', self._render, self.latex_workers))
+
+            pipeline = Pipeline(
+                stages,
+                on_result=lambda item: writer.add({'item': item, 'stage': 'completed'}),
+                on_error=lambda item, stage, e: self._record_failure(writer, item, stage, e, cancel_event),
+                cancel_event=cancel_event,
+                name=f'batch-{job_id}'
+            )
+            with self._lock:
+                self._running[job_id] = (pipeline, cancel_event)
+
+            logger.info(f"Batch-Job {job_id} startet: {len(items)} offene Protokolle")
+            pipeline.run(items)
+            writer.close()
+
+            with self.app.app_context():
+                self._finish(job_id, cancelled=cancel_event.is_set())
+        except Exception as e:
+            logger.error(f"Batch-Job {job_id} fehlgeschlagen: {str(e)}")
+            with self.app.app_context():
+                job = self.db.session.get(self.BatchJob, job_id)
+                job.status = 'failed'
+                job.finished_at = datetime.utcnow()
+                self.db.session.commit()
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+
+    def _load_items(self, job_id: int) -> List[Dict]:
+        """Offene Protokolle des Jobs als einfache Dicts (Threads teilen keine ORM-Objekte)"""
+        job = self.db.session.get(self.BatchJob, job_id)
+        job.status = 'running'
+        job.runner = self.runner_id
+        job.started_at = job.started_at or datetime.utcnow()
+        job.heartbeat_at = datetime.utcnow()
+
+        open_items = self.BatchJobItem.query.filter(
+            self.BatchJobItem.job_id == job_id,
+            self.BatchJobItem.stage.in_(ITEM_STAGES[:-1])
+        ).order_by(self.BatchJobItem.position).all()
+        protocols = self._protocols_by_id(item.protocol_id for item in open_items)
+
+        items = []
+        for item in open_items:
+            protocol = protocols[item.protocol_id]
+            items.append({
+                'item_id': item.id,
+                'protocol_id': protocol.id,
+                'metadata': protocol.protocol_metadata or {},
+                'files': item.files or [],
+                'extracted_files': item.extracted_files,
+                'generated_content': protocol.generated_content if item.stage == 'generated' else None,
+                'sections': {key: section['content'] for key, section in protocol.sections_content.items()}
+                if item.stage == 'generated' and protocol.sections_content else None
+            })
+        self.db.session.commit()
+        return items
+
+    def _protocols_by_id(self, protocol_ids) -> Dict:
+        protocol_ids = list(protocol_ids)
+        if not protocol_ids:
+            return {}
+        return {p.id: p for p in self.Protocol.query.filter(self.Protocol.id.in_(protocol_ids)).all()}
+
+    # --- Stufen ---
+
+    def _extract(self, item: Dict, writer: BulkWriter, cancel_event: threading.Event) -> Dict:
+        if item['extracted_files'] is not None:
+            return item  # Checkpoint aus einem früheren Lauf
+
+        extracted = []
+        for relative_path in item['files']:
+            path = self.upload_folder / relative_path
+            mime_type = mimetypes.guess_type(str(path))[0] or ''
+            # Seitenweise, damit ein Abbruch des Jobs nicht das ganze Dokument abwartet
+            pages = []
+            for page in self.extraction_service.iter_text_pages(str(path)):
+                if cancel_event.is_set():
+                    raise GenerationCancelled("Batch-Job wurde abgebrochen")
+                pages.append(page)
+            extracted.append({
+                'name': path.name,
+                'type': mime_type.split('/')[0] or 'other',
+                'content': '\n'.join(pages)
+            })
+
+        item['extracted_files'] = extracted
+        writer.add({'item': item, 'stage': 'extracted'})
+        return item
+
+    def _generate(self, job_id: int, item: Dict, writer: BulkWriter,
+                  cancel_event: threading.Event) -> Dict:
+        if item['generated_content'] is not None:
+            return item
+
+        # Ohne Fallback-Inhalt: Fehler markieren das Protokoll zum Wiederholen;
+        # ein Abbruch des Jobs bricht auch die laufende Generierung ab
+        if self.llm_service.structured_output:
+            item['sections'] = self.llm_service.run(
+                self.llm_service.agenerate_protocol_sections(
+                    item['extracted_files'], item['metadata'], priority='batch', user=f'batch-{job_id}'
+                ),
+                cancel_event.is_set
+            )
+            item['generated_content'] = sections_to_text(item['metadata'].get('title', ''), item['sections'])
+        else:
+            item['generated_content'] = self.llm_service.run(
+                self.llm_service.agenerate_protocol_content(
+                    item['extracted_files'], item['metadata'], priority='batch', user=f'batch-{job_id}'
+                ),
+                cancel_event.is_set
+            )
+        writer.add({'item': item, 'stage': 'generated'})
+        return item
+
+    def _render(self, item: Dict) -> Dict:
+        if item['sections']:
+            result = self.latex_service.create_document_from_sections(
+                sections=item['sections'], protocol_id=item['protocol_id'],
+                title=item['metadata'].get('title', ''), author=item['metadata'].get('author')
+            )
+        else:
+            result = self.latex_service.create_document(content=item['generated_content'],
+                                                        protocol_id=item['protocol_id'])
+        if not result['success']:
+            raise RuntimeError(result.get('error') or 'LaTeX-Generierung fehlgeschlagen')
+        if not result.get('pdf_file'):
+            raise RuntimeError('PDF-Generierung fehlgeschlagen')
+        return item
+
+    # --- Checkpoints und Fortschritt ---
+
+    def _record_failure(self, writer: BulkWriter, item: Dict, stage: str, error: Exception,
+                        cancel_event: threading.Event):
+        if cancel_event.is_set():
+            return  # Abgebrochene Protokolle bleiben an ihrem letzten Checkpoint
+        writer.add({'item': item, 'stage': 'failed', 'error': f"{stage}: {str(error)}"})
+
+    def _flush(self, job_id: int, records: List[Dict], cancel_event: threading.Event):
+        """Schreibt gesammelte Checkpoints in einer Transaktion (läuft im BulkWriter-Thread)"""
+        with self.app.app_context():
+            session = self.db.session
+            item_ids = [record['item']['item_id'] for record in records]
+            items = {item.id: item for item in
+                     self.BatchJobItem.query.filter(self.BatchJobItem.id.in_(item_ids)).all()} if item_ids else {}
+            protocols = self._protocols_by_id(record['item']['protocol_id'] for record in records)
+
+            for record in records:
+                data = record['item']
+                item = items[data['item_id']]
+                protocol = protocols[data['protocol_id']]
+                stage = record['stage']
+
+                item.stage = stage
+                if stage == 'extracted':
+                    item.extracted_files = data['extracted_files']
+                    protocol.status = 'processing'
+                elif stage == 'generated':
+                    protocol.generated_content = data['generated_content']
+                    if data['sections']:
+                        protocol.sections_content = build_sections_content(data['sections'])
+                    protocol.status = 'generated'
+                elif stage == 'completed':
+                    protocol.status = 'completed'
+                elif stage == 'failed':
+                    item.error = record['error']
+                    protocol.status = 'failed'
+
+            job = session.get(self.BatchJob, job_id)
+            counts = self._stage_counts(job_id)
+            job.completed_count = counts.get('completed', 0)
+            job.failed_count = counts.get('failed', 0)
+            job.heartbeat_at = datetime.utcnow()
+            if job.status == 'cancelled':
+                cancel_event.set()  # Abbruch aus einem anderen Worker-Prozess
+            session.commit()
+
+    def _stage_counts(self, job_id: int) -> Dict[str, int]:
+        rows = self.db.session.query(self.BatchJobItem.stage, self.db.func.count(self.BatchJobItem.id)) \
+            .filter_by(job_id=job_id).group_by(self.BatchJobItem.stage).all()
+        return dict(rows)
+
+    def _finish(self, job_id: int, cancelled: bool):
+        job = self.db.session.get(self.BatchJob, job_id)
+        if not cancelled and job.status != 'cancelled':
+            job.status = 'completed_with_errors' if job.failed_count else 'completed'
+        job.finished_at = datetime.utcnow()
+        self.db.session.commit()
+        logger.info(f"Batch-Job {job_id} beendet ({job.status}): "
+                    f"{job.completed_count} fertig, {job.failed_count} fehlgeschlagen")
+
+    def pipeline_stats(self) -> Dict[int, Dict]:
+        """Stufen-Statistik der in diesem Prozess laufenden Jobs"""
+        with self._lock:
+            running = dict(self._running)
+        return {job_id: pipeline.stats() for job_id, (pipeline, _) in running.items() if pipeline is not None}
+
+    def progress(self, job_id: int) -> Optional[Dict]:
+        """Fortschritt eines Jobs inkl. Stufen-Statistik, falls er in diesem Prozess läuft"""
+        job = self.db.session.get(self.BatchJob, job_id)
+        if job is None:
+            return None
+
+        progress = job.to_dict()
+        progress['status'] = self.job_status(job)
+        progress['stages'] = self._stage_counts(job_id)
+
+        with self._lock:
+            running = self._running.get(job_id)
+        pipeline = running[0] if running else None
+        if pipeline is not None:
+            stats = pipeline.stats()
+            progress['pipeline'] = stats
+            finished = job.completed_count + job.failed_count
+            remaining = job.total - finished
+            rate = stats['stages'][-1]['per_minute']
+            progress['eta_minutes'] = round(remaining / rate, 1) if rate else None
+        return progress
@@ -0,0 +1,53 @@
+"""
+Client Connection - Erkennung getrennter HTTP-Clients während langer Anfragen
+
+Leichtgewichtig (ohne ollama-Import), damit app.py es beim Start laden kann.
+"""
+
+import socket
+import select
+from typing import Any, Callable, Dict
+
+
+class GenerationCancelled(Exception):
+    """Die Generierung wurde abgebrochen, weil der Client nicht mehr wartet"""
+
+
+def client_disconnected(environ: Dict[str, Any]) -> Callable[[], bool]:
+    """
+    Erstellt eine Prüffunktion für einen Verbindungsabbruch des HTTP-Clients
+
+    Nutzt den Socket aus dem WSGI-Environ (gunicorn bzw. Werkzeug-Entwicklungsserver):
+    ist er lesbar, liefert aber keine Daten mehr, hat der Client die Verbindung
+    geschlossen. Ohne Socket (z.B. Test-Client) gilt der Client als verbunden.
+
+    Args:
+        environ: WSGI-Environ der Anfrage
+
+    Returns:
+        Funktion ohne Argumente, die True liefert, sobald der Client getrennt ist
+    """
+    sock = environ.get('gunicorn.socket') or environ.get('werkzeug.socket')
+    if sock is None or not hasattr(select, 'poll'):
+        return lambda: False
+
+    def is_disconnected() -> bool:
+        # poll statt select: select() scheitert an Deskriptoren >= FD_SETSIZE (1024)
+        fd = sock.fileno()
+        if fd < 0:
+            return True  # Socket bereits geschlossen
+        poller = select.poll()
+        poller.register(fd, select.POLLIN | select.POLLERR | select.POLLHUP)
+        try:
+            events = poller.poll(0)
+            if not events:
+                return False
+            if events[0][1] & (select.POLLERR | select.POLLHUP):
+                return True
+            return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b''
+        except BlockingIOError:
+            return False
+        except OSError:
+            return True
+
+    return is_disconnected
@@ -0,0 +1,117 @@
+"""
+Entity Extraction - Vorkompilierte Muster für OCR-Nachbearbeitung und Strukturextraktion
+
+Alle Muster sind zu wenigen Alternationen mit benannten Gruppen zusammengefasst,
+sodass der Text pro Aufgabe nur einmal durchlaufen wird.
+"""
+
+import re
+from typing import Dict, List
+
+# Schreibweisen chemischer Formeln und Einheiten, die OCR häufig verfälscht
+_CHEMICAL_SPELLINGS = {
+    'h20': 'H2O',
+    'nacl': 'NaCl',
+    'cacl2': 'CaCl2',
+    'hci': 'HCl',
+    'naoh': 'NaOH'
+}
+
+_UNIT_SPELLINGS = {
+    'ml': 'mL',
+    'mg': 'mg',
+    'g': 'g',
+    'mol': 'mol'
+}
+
+_NOTATION_PATTERN = re.compile(r"""
+      \b(?P<chemical>h20|nacl|cacl2|hci|naoh)\b
+    | (?P<amount>\d+)\s*(?:
+          (?P<unit>ml|mg|mol|g)\b
+        | (?P<celsius>°\s*c)\b
+      )
+""", re.IGNORECASE | re.VERBOSE)
+
+_OBSERVATION_TEXT = r'[a-zA-ZäöüÄÖÜß\s]+'
+
+_ENTITY_PATTERN = re.compile(r"""
+      (?i:farbe?|geruch|niederschlag|reaktion|beobachtung)
+          (?=\s*[:\-]?\s*(?P<observation>""" + _OBSERVATION_TEXT + r"""))
+    | (?i:ph)\s*[=:]\s*(?P<ph>\d+(?:\.\d+)?)
+    | (?P<number>\d+(?:\.\d+)?)\s*(?:
+          °\s*(?P<degree>[CF])
+        | (?P<kelvin>K)(?![A-Za-z0-9])
+        | (?P<unit>(?i:mg|kg|ml|mol|min|g|l|h|s))(?![A-Za-z0-9])
+      )
+    | (?P<compound>\b[A-Z][a-z]?\d*(?:[A-Z][a-z]?\d*)*\b)
+""", re.VERBOSE)
+
+
+def _replace_notation(match: re.Match) -> str:
+    if match.group('chemical'):
+        return _CHEMICAL_SPELLINGS[match.group('chemical').lower()]
+    if match.group('celsius'):
+        return f"{match.group('amount')}°C"
+    return f"{match.group('amount')} {_UNIT_SPELLINGS[match.group('unit').lower()]}"
+
+
+def format_chemical_notations(text: str) -> str:
+    """
+    Korrigiert chemische Formeln und vereinheitlicht Einheiten in einem Durchlauf
+
+    Args:
+        text: OCR-Text
+
+    Returns:
+        Text mit korrigierten Formeln (z.B. H20 -> H2O) und Einheiten (z.B. 5ml -> 5 mL)
+    """
+    return _NOTATION_PATTERN.sub(_replace_notation, text)
+
+
+def extract_entities(text: str) -> Dict[str, List]:
+    """
+    Extrahiert Messwerte, Temperaturen, Verbindungen und Beobachtungen in einem Durchlauf
+
+    Args:
+        text: Bereinigter OCR-Text
+
+    Returns:
+        Dict mit den Listen 'measurements', 'temperatures',
+        'chemical_compounds' und 'observations'
+    """
+    measurements = []
+    temperatures = []
+    compounds = {}
+    observations = {}
+
+    for match in _ENTITY_PATTERN.finditer(text):
+        kind = match.lastgroup
+
+        if match.group('observation') is not None:
+            observation = match.group('observation').strip()
+            if observation:
+                observations[observation] = None
+        elif kind == 'ph':
+            measurements.append({'value': float(match.group('ph')), 'unit': 'pH', 'type': 'measurement'})
+        elif kind == 'compound':
+            if len(match.group('compound')) > 1:
+                compounds[match.group('compound')] = None
+        elif kind == 'unit':
+            measurements.append({
+                'value': float(match.group('number')),
+                'unit': match.group('unit'),
+                'type': 'measurement'
+            })
+        else:
+            temperatures.append({
+                'value': float(match.group('number')),
+                'unit': match.group('degree') or 'K',
+                'type': 'temperature'
+            })
+
+    return {
+        'measurements': measurements,
+        'temperatures': temperatures,
+        'chemical_compounds': list(compounds),
+        'observations': list(observations)
+    }
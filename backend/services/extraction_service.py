@@ -0,0 +1,146 @@
+"""
+Extraction Service - Einheitliche Textextraktion für hochgeladene Dateien
+"""
+
+import os
+import logging
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class TextExtractionService:
+    """Wählt je nach MIME-Typ den passenden Extraktor (OCR, PDF, Word, Text)"""
+
+    WORD_MIME_TYPES = {
+        'application/msword',
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+    }
+
+    def __init__(self, file_service, ocr_service, max_workers: Optional[int] = None):
+        self.file_service = file_service
+        self.ocr_service = ocr_service
+        self.max_workers = max_workers or int(os.environ.get('EXTRACTION_WORKERS', 4))
+
+        self._handlers: Dict[str, Callable[[Path], Optional[str]]] = {
+            'application/pdf': self._extract_pdf,
+            'application/json': self._extract_plain_text
+        }
+        for mime_type in self.WORD_MIME_TYPES:
+            self._handlers[mime_type] = self._extract_word
+
+    def extract_text(self, file_path: str, mime_type: Optional[str] = None) -> Optional[str]:
+        """
+        Extrahiert den Text einer Datei
+
+        Args:
+            file_path: Pfad zur Datei
+            mime_type: MIME-Typ (wird aus dem Dateinamen bestimmt, falls nicht angegeben)
+
+        Returns:
+            Extrahierter Text oder None, wenn der Typ nicht unterstützt wird
+        """
+        path = Path(file_path)
+        mime_type = mime_type or mimetypes.guess_type(str(path))[0]
+        handler = self._get_handler(mime_type)
+
+        if handler is None:
+            logger.info(f"Keine Textextraktion für {path.name} ({mime_type})")
+            return None
+
+        try:
+            text = handler(path)
+            return text or None
+        except Exception as e:
+            logger.error(f"Text-Extraktion fehlgeschlagen für {path.name}: {str(e)}")
+            return None
+
+    def extract_many(self, file_paths: List[str]) -> List[Optional[str]]:
+        """
+        Extrahiert die Texte mehrerer Dateien parallel
+
+        Args:
+            file_paths: Liste von Dateipfaden
+
+        Returns:
+            Extrahierte Texte in der Reihenfolge der Eingabe
+        """
+        if len(file_paths) <= 1:
+            return [self.extract_text(path) for path in file_paths]
+
+        workers = min(self.max_workers, len(file_paths))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.extract_text, file_paths))
+
+    def iter_text_pages(self, file_path: str, mime_type: Optional[str] = None) -> Iterator[str]:
+        """
+        Liefert den Text einer Datei seitenweise
+
+        PDFs laufen über PDFService (Textebene, OCR nur für Seiten ohne Text,
+        Seiten-Cache), mehrseitige Bilder (TIFF) werden Seite für Seite per OCR
+        erkannt. So kann die Weiterverarbeitung beginnen bzw. abgebrochen
+        werden, bevor die letzte Seite fertig ist. Andere Typen liefern ihren
+        Text als einen Block.
+
+        Args:
+            file_path: Pfad zur Datei
+            mime_type: MIME-Typ (wird aus dem Dateinamen bestimmt, falls nicht angegeben)
+
+        Yields:
+            Nicht-leere Seitentexte in Seitenreihenfolge
+        """
+        path = Path(file_path)
+        mime_type = mime_type or mimetypes.guess_type(str(path))[0]
+
+        if mime_type == 'application/pdf':
+            pages = self.file_service.pdf_service.iter_page_texts(str(path))
+        elif mime_type and mime_type.startswith('image/') and self.ocr_service.is_multipage(str(path)):
+            pages = self.ocr_service.iter_page_texts(str(path))
+        else:
+            text = self.extract_text(str(path), mime_type)
+            if text:
+                yield text
+            return
+
+        try:
+            for _, text in pages:
+                if text and text.strip():
+                    yield text
+        except Exception as e:
+            logger.error(f"Text-Extraktion fehlgeschlagen für {path.name}: {str(e)}")
+        finally:
+            pages.close()
+
+    def _get_handler(self, mime_type: Optional[str]) -> Optional[Callable[[Path], Optional[str]]]:
+        """Bestimmt den Extraktor für einen MIME-Typ"""
+        if not mime_type:
+            return None
+        if mime_type in self._handlers:
+            return self._handlers[mime_type]
+        if mime_type.startswith('image/'):
+            return self._extract_image
+        if mime_type.startswith('text/'):
+            return self._extract_plain_text
+        return None
+
+    def _extract_image(self, path: Path) -> Optional[str]:
+        text = self.ocr_service.extract_text(str(path))
+        # OCRService liefert Fehler als Platzhalter-Text, der nicht in den RAG-Index gehört
+        if text.startswith('[OCR-FEHLER'):
+            logger.warning(f"OCR fehlgeschlagen für {path.name}: {text}")
+            return None
+        return text
+
+    def _extract_pdf(self, path: Path) -> Optional[str]:
+        return self.file_service.extract_pdf_text(path)
+
+    def _extract_word(self, path: Path) -> Optional[str]:
+        return self.file_service.extract_word_text(path)
+
+    def _extract_plain_text(self, path: Path) -> Optional[str]:
+        if path.suffix.lower() == '.txt':
+            return self.file_service.get_file_content(str(path))
+        with open(path, 'r', encoding='utf-8', errors='replace') as file:
+            return file.read()
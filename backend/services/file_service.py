@@ -11,6 +11,10 @@ from werkzeug.utils import secure_filename
 from werkzeug.datastructures import FileStorage
 import logging
 
+from .pdf_service import PDFService
+from .storage_layout import AgeIndex, shard_path
+from .storage import LocalStorage, storage_key
+
 logger = logging.getLogger(__name__)
 
 class FileService:
@@ -25,13 +29,22 @@ class FileService:
     
     MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
     
-    def __init__(self, upload_folder: str):
+    def __init__(self, upload_folder: str, storage=None):
         self.upload_folder = Path(upload_folder)
         self.upload_folder.mkdir(exist_ok=True)
         
+        # Lokale Dateien bleiben Arbeitskopie für OCR/Extraktion, das Backend hält das Original
+        self.storage = storage or LocalStorage()
+        
         # Unterordner für verschiedene Dateitypen erstellen
         for category in self.ALLOWED_EXTENSIONS.keys():
             (self.upload_folder / category).mkdir(exist_ok=True)
+        
+        # Seitenparallele PDF-Extraktion mit Seiten-Cache
+        self.pdf_service = PDFService(self.upload_folder / '.cache' / 'pdf_text')
+        
+        # Upload-Zeitpunkte für das Aufräumen ohne Verzeichnis-Scan
+        self.age_index = AgeIndex(self.upload_folder / '.index' / 'age.db', delete=self._delete_stored)
     
     def save_uploaded_file(self, file: FileStorage) -> Dict:
         """
@@ -59,11 +72,8 @@ class FileService:
             # Dateikategorie bestimmen
             file_category = self._get_file_category(file_extension)
             
-            # Speicherpfad bestimmen
-            save_path = self.upload_folder / file_category / unique_filename
-            
-            # Datei speichern
-            file.save(save_path)
+            # Datei im Shard-Verzeichnis der Kategorie speichern
+            save_path = self.save_to_area(file, file_category, unique_filename)
             
             # Datei-Informationen sammeln
             file_info = {
@@ -93,6 +103,25 @@ class FileService:
             logger.error(f"Fehler beim Speichern der Datei: {str(e)}")
             raise
     
+    def save_to_area(self, file: FileStorage, area: str, filename: str) -> Path:
+        """
+        Speichert eine Datei unter <upload_folder>/<area>/<shard>/<filename>
+        
+        Args:
+            file: Werkzeug FileStorage Objekt
+            area: Bereich, z.B. Dateikategorie, 'global' oder 'projects'
+            filename: Bereits eindeutiger, sicherer Dateiname
+            
+        Returns:
+            Pfad der gespeicherten Datei
+        """
+        save_path = shard_path(self.upload_folder / area, filename)
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        file.save(save_path)
+        self.storage.save_file(storage_key(save_path), save_path, file.mimetype)
+        self.age_index.add(save_path)
+        return save_path
+    
     def _is_allowed_file(self, filename: str) -> bool:
         """Prüft, ob der Dateityp erlaubt ist"""
         if not filename:
@@ -249,9 +278,9 @@ class FileService:
                 with open(path, 'r', encoding='utf-8') as file:
                     return file.read()
             elif path.suffix.lower() == '.pdf':
-                return self._extract_pdf_text(path)
+                return self.extract_pdf_text(path)
             elif path.suffix.lower() in ['.doc', '.docx']:
-                return self._extract_word_text(path)
+                return self.extract_word_text(path)
             else:
                 logger.warning(f"Textextraktion für {path.suffix} nicht unterstützt")
                 return None
@@ -260,33 +289,22 @@ class FileService:
             logger.error(f"Fehler beim Lesen der Datei {file_path}: {str(e)}")
             return None
     
-    def _extract_pdf_text(self, file_path: Path) -> str:
-        """Extrahiert Text aus PDF-Dateien"""
+    def extract_pdf_text(self, file_path: Path) -> str:
+        """Extrahiert Text aus PDF-Dateien (seitenparallel, mit OCR für Scans)"""
         try:
-            import PyPDF2
-            
-            text = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-            
-            return text.strip()
+            return self.pdf_service.extract_text(str(file_path))
             
         except Exception as e:
             logger.error(f"PDF-Textextraktion fehlgeschlagen: {str(e)}")
             return ""
     
-    def _extract_word_text(self, file_path: Path) -> str:
+    def extract_word_text(self, file_path: Path) -> str:
         """Extrahiert Text aus Word-Dokumenten"""
         try:
             from docx import Document
             
             doc = Document(file_path)
-            text = ""
-            
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
+            text = "\n".join(paragraph.text for paragraph in doc.paragraphs)
             
             return text.strip()
             
@@ -308,6 +326,8 @@ class FileService:
             path = Path(file_path)
             if path.exists():
                 path.unlink()
+                self.storage.delete(storage_key(path))
+                self.age_index.remove(path)
                 logger.info(f"Datei gelöscht: {file_path}")
                 return True
             else:
@@ -318,9 +338,14 @@ class FileService:
             logger.error(f"Fehler beim Löschen der Datei {file_path}: {str(e)}")
             return False
     
+    def _delete_stored(self, path: Path):
+        """Löscht Arbeitskopie und Original im Speicher-Backend"""
+        path.unlink(missing_ok=True)
+        self.storage.delete(storage_key(path))
+    
     def cleanup_old_files(self, max_age_days: int = 7) -> int:
         """
-        Löscht alte Dateien
+        Löscht alte Dateien anhand des Alters-Index
         
         Args:
             max_age_days: Maximales Alter der Dateien in Tagen
@@ -328,24 +353,11 @@ class FileService:
         Returns:
             Anzahl der gelöschten Dateien
         """
-        import time
-        
-        deleted_count = 0
-        max_age_seconds = max_age_days * 24 * 60 * 60
-        current_time = time.time()
-        
         try:
-            for file_path in self.upload_folder.rglob('*'):
-                if file_path.is_file():
-                    file_age = current_time - file_path.stat().st_mtime
-                    if file_age > max_age_seconds:
-                        file_path.unlink()
-                        deleted_count += 1
-                        logger.info(f"Alte Datei gelöscht: {file_path}")
-            
+            deleted_count = self.age_index.expire(max_age_days * 24 * 60 * 60)
             logger.info(f"Cleanup abgeschlossen: {deleted_count} Dateien gelöscht")
             return deleted_count
             
         except Exception as e:
             logger.error(f"Fehler beim Cleanup: {str(e)}")
-            return deleted_count 
\ No newline at end of file
+            return 0 
\ No newline at end of file
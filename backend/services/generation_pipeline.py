@@ -0,0 +1,175 @@
+"""
+Generation Pipeline - Protokoll-Generierung als dauerhaft laufende Stufen
+
+/generate führte DB-Insert, LLM-Generierung, create_document (zwei
+pdflatex-Läufe) und DB-Update nacheinander im Request-Thread aus. Hier sind
+LLM, LaTeX und Speichern eigene Stufen mit eigenen Workern, verbunden über
+begrenzte Queues: während Protokoll N kompiliert wird, generiert das LLM
+bereits Protokoll N+1. Die Worker-Zahl jeder Stufe ist einzeln einstellbar
+(GENERATION_LLM_WORKERS, GENERATION_LATEX_WORKERS, GENERATION_STORE_WORKERS).
+
+Der Request-Thread reicht nur ein und wartet auf das Ergebnis (oder kehrt
+sofort zurück und der Client fragt den Status ab).
+
+Liefert das LLM die Abschnitte als JSON, werden sie direkt als
+Protocol.sections_content gespeichert und abschnittsweise gesetzt, ohne den
+Text erneut in Abschnitte zu zerlegen.
+"""
+
+import os
+import queue
+import logging
+import threading
+import concurrent.futures
+from typing import Callable, Dict, List, Optional
+
+from .client_connection import GenerationCancelled
+from .pipeline import Pipeline, Stage
+from .structured_output import build_sections_content
+
+logger = logging.getLogger(__name__)
+
+# Intervall, in dem wartende Request-Threads die Client-Verbindung prüfen
+WAIT_POLL_INTERVAL = 0.5
+
+
+class PipelineBusy(Exception):
+    """Die Eingangs-Queue ist voll (Überlast)"""
+
+
+class GenerationTicket:
+    """Handle einer eingereichten Generierung"""
+
+    def __init__(self, protocol_id: int):
+        self.protocol_id = protocol_id
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.cancel_event = threading.Event()
+
+    def wait(self, is_disconnected: Optional[Callable[[], bool]] = None) -> Dict:
+        """
+        Wartet auf das Ergebnis; trennt der Client die Verbindung, wird die Generierung abgebrochen
+
+        Returns:
+            Dict mit 'generated_content' und 'latex_output'
+
+        Raises:
+            GenerationCancelled: Client hat die Verbindung getrennt
+        """
+        while not concurrent.futures.wait([self.future], timeout=WAIT_POLL_INTERVAL).done:
+            if is_disconnected is not None and is_disconnected():
+                self.cancel_event.set()
+                raise GenerationCancelled("Client hat die Verbindung getrennt")
+        return self.future.result()
+
+
+class GenerationPipeline:
+    """LLM → LaTeX → Speichern als nebenläufige Stufen für einzelne Protokolle"""
+
+    def __init__(self, app, db, protocol_model, llm_service, latex_service):
+        self.app = app
+        self.db = db
+        self.Protocol = protocol_model
+        self.llm_service = llm_service
+        self.latex_service = latex_service
+        self.submit_timeout = float(os.environ.get('GENERATION_SUBMIT_TIMEOUT', 30))
+
+        self.pipeline = Pipeline(
+            [
+                Stage('llm', self._generate, int(os.environ.get('GENERATION_LLM_WORKERS', 8))),
+                Stage('latex', self._render, int(os.environ.get('GENERATION_LATEX_WORKERS', 2))),
+                Stage('store', self._store, int(os.environ.get('GENERATION_STORE_WORKERS', 1)))
+            ],
+            on_result=self._resolve,
+            on_error=self._reject,
+            name='generation'
+        ).start()
+
+    def submit(self, protocol_id: int, files: List[Dict], metadata: Dict, timeout: Optional[float] = None,
+               priority: str = 'standard', user: Optional[str] = None) -> GenerationTicket:
+        """
+        Reiht ein bereits angelegtes Protokoll zur Generierung ein
+
+        Raises:
+            PipelineBusy: Kein Platz in der Eingangs-Queue innerhalb von GENERATION_SUBMIT_TIMEOUT
+        """
+        ticket = GenerationTicket(protocol_id)
+        item = {
+            'ticket': ticket,
+            'files': files,
+            'metadata': metadata,
+            'timeout': timeout,
+            'priority': priority,
+            'user': user
+        }
+        try:
+            self.pipeline.submit(item, timeout=self.submit_timeout)
+        except queue.Full:
+            raise PipelineBusy("Generierungs-Pipeline ausgelastet")
+        return ticket
+
+    def stats(self) -> Dict:
+        return self.pipeline.stats()
+
+    # --- Stufen ---
+
+    def _generate(self, item: Dict) -> Dict:
+        ticket = item['ticket']
+        if ticket.cancel_event.is_set():
+            raise GenerationCancelled("Abgebrochen vor der Generierung")
+
+        item['generated_content'], item['sections'] = self.llm_service.generate_structured_protocol(
+            files=item['files'],
+            protocol_metadata=item['metadata'],
+            timeout=item['timeout'],
+            is_disconnected=ticket.cancel_event.is_set,
+            priority=item['priority'],
+            user=item['user']
+        )
+        return item
+
+    def _render(self, item: Dict) -> Dict:
+        if item['ticket'].cancel_event.is_set():
+            raise GenerationCancelled("Abgebrochen vor der LaTeX-Generierung")
+
+        if item['sections']:
+            item['latex_output'] = self.latex_service.create_document_from_sections(
+                sections=item['sections'],
+                protocol_id=item['ticket'].protocol_id,
+                title=item['metadata'].get('title', 'Laborprotokoll'),
+                author=item['metadata'].get('author')
+            )
+        else:
+            item['latex_output'] = self.latex_service.create_document(
+                content=item['generated_content'],
+                protocol_id=item['ticket'].protocol_id
+            )
+        return item
+
+    def _store(self, item: Dict) -> Dict:
+        with self.app.app_context():
+            protocol = self.db.session.get(self.Protocol, item['ticket'].protocol_id)
+            protocol.generated_content = item['generated_content']
+            if item['sections']:
+                protocol.sections_content = build_sections_content(item['sections'])
+            protocol.status = 'completed'
+            self.db.session.commit()
+        return item
+
+    def _resolve(self, item: Dict):
+        item['ticket'].future.set_result({
+            'generated_content': item['generated_content'],
+            'latex_output': item['latex_output']
+        })
+
+    def _reject(self, item: Dict, stage: str, error: Exception):
+        ticket = item['ticket']
+        status = 'cancelled' if isinstance(error, GenerationCancelled) else 'failed'
+        try:
+            with self.app.app_context():
+                protocol = self.db.session.get(self.Protocol, ticket.protocol_id)
+                if protocol is not None:
+                    protocol.status = status
+                    self.db.session.commit()
+        except Exception as e:
+            logger.error(f"Status '{status}' für Protokoll {ticket.protocol_id} nicht gespeichert: {str(e)}")
+        ticket.future.set_exception(error)
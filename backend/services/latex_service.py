@@ -3,28 +3,60 @@ LaTeX Service - Generiert professionelle Laborprotokolle im LaTeX/PDF-Format
 """
 
 import os
+import hashlib
 import subprocess
 import logging
 from pathlib import Path
-from typing import Dict, Optional
-from datetime import datetime
-from pylatex import Document, Section, Subsection, Command, Package
-from pylatex.base_classes import Environment
-from pylatex.utils import NoEscape
+from datetime import date
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+# pylatex wird erst beim Erstellen eines Dokuments importiert (schneller App-Start)
+if TYPE_CHECKING:
+    from pylatex import Document
+
+from .storage import storage_key
+from .storage_layout import AgeIndex, shard_dir
 
 logger = logging.getLogger(__name__)
 
+# Reihenfolge der Protokoll-Abschnitte
+SECTION_ORDER = [
+    'zielsetzung', 'theorie', 'material', 'durchführung',
+    'ergebnisse', 'berechnungen', 'diskussion', 'schlussfolgerung'
+]
+
+# Schreibweisen der Abschnitts-Schlüssel aus dem Frontend
+SECTION_ALIASES = {'durchfuehrung': 'durchführung'}
+
+
+def section_hash(content: str) -> str:
+    """SHA-256-Hash des Inhalts eines Abschnitts"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
 class LaTeXService:
     """Service für LaTeX-Dokumenterstellung und PDF-Generierung"""
     
-    def __init__(self, output_folder: str):
+    def __init__(self, output_folder: str, storage=None):
         self.output_folder = Path(output_folder)
+        # Speicher-Backend, in das die Artefakte veröffentlicht werden (für das Aufräumen)
+        self.storage = storage
         self.output_folder.mkdir(exist_ok=True)
         
         # LaTeX-Templates-Ordner
         self.templates_folder = self.output_folder / 'templates'
         self.templates_folder.mkdir(exist_ok=True)
         
+        # Erstellungszeitpunkte der Artefakte für das Aufräumen ohne Verzeichnis-Scan
+        self.age_index = AgeIndex(self.output_folder / '.index' / 'age.db', delete=self._delete_artifact)
+        # Aufbewahrungsdauer der Artefakte; Downloads erzeugen gelöschte PDFs neu (0 = nie löschen)
+        self.max_age_days = int(os.environ.get('LATEX_MAX_AGE_DAYS', 7))
+        
+        # Callbacks (protocol_id, pdf_path) nach jeder erfolgreichen PDF-Erstellung
+        self._pdf_listeners: List[Callable[[int, Path], None]] = []
+        # Callbacks (protocol_id, tex_path) nach jedem pdflatex-Build, auch wenn er fehlschlägt
+        self._build_listeners: List[Callable[[int, Path], None]] = []
+        
         # Prüfen ob LaTeX verfügbar ist
         self._check_latex_installation()
     
@@ -41,6 +73,55 @@ class LaTeXService:
             logger.error("LaTeX nicht installiert")
             raise RuntimeError("LaTeX ist nicht installiert")
     
+    def artifact_path(self, protocol_id: int, extension: str) -> Path:
+        """
+        Pfad eines Protokoll-Artefakts im Shard-Verzeichnis des Protokolls
+        
+        Args:
+            protocol_id: ID des Protokolls
+            extension: Dateiendung ohne Punkt, z.B. 'pdf' oder 'tex'
+        """
+        name = f"protocol_{protocol_id}"
+        return shard_dir(self.output_folder, name) / f"{name}.{extension}"
+    
+    def _relative_path(self, path: Path) -> str:
+        """Pfad relativ zum Arbeitsverzeichnis der App, z.B. 'generated/ab/cd/protocol_1.pdf'"""
+        return str(Path(self.output_folder.name) / path.relative_to(self.output_folder))
+    
+    def _register_artifacts(self, protocol_id: int):
+        for extension in ('tex', 'pdf'):
+            path = self.artifact_path(protocol_id, extension)
+            if path.exists():
+                self.age_index.add(path)
+    
+    def _delete_artifact(self, path: Path):
+        """Löscht ein abgelaufenes Artefakt lokal und im Speicher-Backend"""
+        path.unlink(missing_ok=True)
+        if self.storage is not None:
+            self.storage.delete(storage_key(path))
+    
+    def add_pdf_listener(self, listener: Callable[[int, Path], None]):
+        """Registriert einen Callback, der nach jeder PDF-Erstellung aufgerufen wird"""
+        self._pdf_listeners.append(listener)
+    
+    def _notify_pdf_created(self, protocol_id: int, pdf_path: Path):
+        for listener in self._pdf_listeners:
+            try:
+                listener(protocol_id, pdf_path)
+            except Exception as e:
+                logger.error(f"PDF-Listener fehlgeschlagen: {str(e)}")
+    
+    def add_build_listener(self, listener: Callable[[int, Path], None]):
+        """Registriert einen Callback, der nach jedem Build aufgerufen wird (z.B. für Build-Reste)"""
+        self._build_listeners.append(listener)
+    
+    def _notify_build_finished(self, protocol_id: int, latex_path: Path):
+        for listener in self._build_listeners:
+            try:
+                listener(protocol_id, latex_path)
+            except Exception as e:
+                logger.error(f"Build-Listener fehlgeschlagen: {str(e)}")
+    
     def create_document(self, content: str, protocol_id: int) -> Dict:
         """
         Erstellt ein LaTeX-Dokument und PDF
@@ -56,27 +137,28 @@ class LaTeXService:
         try:
             doc = self._create_latex_document(content)
             
-            # LaTeX-Datei speichern
+            # LaTeX-Datei speichern (Versionen archivieren die PDF-Listener)
             latex_filename = f"protocol_{protocol_id}"
-            timestamped_filename = f"protocol_{protocol_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            latex_path = self.artifact_path(protocol_id, 'tex')
+            latex_path.parent.mkdir(parents=True, exist_ok=True)
             
-            latex_path = self.output_folder / f"{latex_filename}.tex"
-            timestamped_path = self.output_folder / f"{timestamped_filename}.tex"
-            
-            # Beide Dateien erstellen (für Download + Archiv)
-            doc.generate_tex(str(latex_path))
-            doc.generate_tex(str(timestamped_path))
+            # generate_tex ergänzt '.tex'
+            doc.generate_tex(str(latex_path.with_suffix('')))
             
             logger.info(f"LaTeX-Dokument erstellt: {latex_path}")
             
             # PDF generieren
             pdf_path = self._compile_to_pdf(latex_path)
+            self._notify_build_finished(protocol_id, latex_path)
+            self._register_artifacts(protocol_id)
+            if pdf_path and pdf_path.exists():
+                self._notify_pdf_created(protocol_id, pdf_path)
             
             return {
                 'success': True,
                 'filename': latex_filename,
-                'latex_file': f"generated/{latex_filename}.tex",
-                'pdf_file': f"generated/{latex_filename}.pdf" if pdf_path and pdf_path.exists() else None,
+                'latex_file': self._relative_path(latex_path),
+                'pdf_file': self._relative_path(pdf_path) if pdf_path and pdf_path.exists() else None,
                 'message': 'LaTeX-Dokument und PDF erfolgreich erstellt!' if pdf_path and pdf_path.exists() else 'LaTeX-Dokument erstellt, PDF-Generierung fehlgeschlagen'
             }
             
@@ -88,8 +170,90 @@ class LaTeXService:
                 'message': 'Fehler bei der LaTeX-Generierung'
             }
     
-    def _create_latex_document(self, content: str) -> Document:
-        """Erstellt das LaTeX-Dokument"""
+    def create_document_from_sections(self, sections: Dict[str, str], protocol_id: int,
+                                      title: str, author: Optional[str] = None) -> Dict:
+        """
+        Erstellt LaTeX-Dokument und PDF aus einzelnen Abschnitten
+        
+        Kompiliert wird immer die vollständige .tex-Datei wie bei create_document,
+        damit Seitenumbrüche, Verweise und Inhaltsverzeichnis einem vollen Build
+        entsprechen. Ist der Quelltext unverändert und das PDF noch vom selben Tag
+        (\\today in Titel und Kopfzeile), entfällt der pdflatex-Lauf.
+        
+        Args:
+            sections: Abschnitts-Schlüssel -> Inhalt
+            protocol_id: ID des Protokolls
+            title: Titel des Protokolls
+            author: Autor (Standard: CTA-Azubi)
+            
+        Returns:
+            Dict mit Pfaden zu LaTeX- und PDF-Dateien (wie create_document)
+            sowie den neu gesetzten Abschnitten unter 'rebuilt_sections'
+        """
+        try:
+            sections = self.normalize_sections(sections)
+            doc = self._create_latex_document_from_sections(sections, title, author or 'CTA-Azubi')
+            source = doc.dumps()
+            
+            latex_filename = f"protocol_{protocol_id}"
+            latex_path = self.artifact_path(protocol_id, 'tex')
+            pdf_path = self.artifact_path(protocol_id, 'pdf')
+            latex_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            if self._is_up_to_date(latex_path, pdf_path, source):
+                logger.info(f"PDF aktuell, kein Build nötig: {pdf_path}")
+                rebuilt = []
+            else:
+                # generate_tex ergänzt '.tex'
+                doc.generate_tex(str(latex_path.with_suffix('')))
+                pdf_path = self._compile_to_pdf(latex_path)
+                self._notify_build_finished(protocol_id, latex_path)
+                self._register_artifacts(protocol_id)
+                if pdf_path and pdf_path.exists():
+                    self._notify_pdf_created(protocol_id, pdf_path)
+                rebuilt = [key for key in SECTION_ORDER if key in sections]
+            
+            built = pdf_path is not None and pdf_path.exists()
+            return {
+                'success': True,
+                'filename': latex_filename,
+                'latex_file': self._relative_path(latex_path),
+                'pdf_file': self._relative_path(pdf_path) if built else None,
+                'rebuilt_sections': rebuilt,
+                'message': 'LaTeX-Dokument und PDF erfolgreich erstellt!' if built else 'LaTeX-Dokument erstellt, PDF-Generierung fehlgeschlagen'
+            }
+            
+        except Exception as e:
+            logger.error(f"LaTeX-Generierung aus Abschnitten fehlgeschlagen: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'message': 'Fehler bei der LaTeX-Generierung'
+            }
+    
+    def _is_up_to_date(self, latex_path: Path, pdf_path: Path, source: str) -> bool:
+        """True, wenn .tex-Datei und PDF bereits zu diesem Quelltext und Tag gehören"""
+        try:
+            pdf_mtime = pdf_path.stat().st_mtime
+            # PDF älter als die .tex-Datei: letzter Build fehlgeschlagen
+            if pdf_mtime < latex_path.stat().st_mtime or date.fromtimestamp(pdf_mtime) != date.today():
+                return False
+            return latex_path.read_text(encoding='utf-8') == source
+        except OSError:
+            return False
+    
+    def normalize_sections(self, sections: Dict[str, str]) -> Dict[str, str]:
+        """Vereinheitlicht Abschnitts-Schlüssel und entfernt leere Abschnitte"""
+        normalized = {}
+        for key, content in sections.items():
+            if content and content.strip():
+                normalized[SECTION_ALIASES.get(key, key)] = content
+        return normalized
+    
+    def _create_base_document(self, page_numbers: bool = True) -> 'Document':
+        """Dokument mit Präambel sowie Kopf- und Fußzeile"""
+        from pylatex import Document, Command, Package
+        from pylatex.utils import NoEscape
         
         # Dokument-Optionen
         geometry_options = {
@@ -118,33 +282,56 @@ class LaTeXService:
         doc.append(Command('fancyhf', ''))
         doc.append(Command('fancyhead', NoEscape(r'[L]{Laborprotokoll}')))
         doc.append(Command('fancyhead', NoEscape(r'[R]{\today}')))
-        doc.append(Command('fancyfoot', NoEscape(r'[C]{\thepage\ von \pageref{LastPage}}')))
+        if page_numbers:
+            doc.append(Command('fancyfoot', NoEscape(r'[C]{\thepage\ von \pageref{LastPage}}')))
+        
+        return doc
+    
+    def _create_latex_document(self, content: str) -> 'Document':
+        """Erstellt das LaTeX-Dokument"""
+        doc = self._create_base_document()
         
         # Inhalt verarbeiten und hinzufügen
         self._add_content_to_document(doc, content)
         
         return doc
     
-    def _add_content_to_document(self, doc: Document, content: str):
+    def _create_latex_document_from_sections(self, sections: Dict[str, str], title: str, author: str,
+                                             page_numbers: bool = True) -> 'Document':
+        """Erstellt das vollständige LaTeX-Dokument aus bereits getrennten Abschnitten"""
+        from pylatex import Section
+        from pylatex.utils import NoEscape
+        doc = self._create_base_document(page_numbers)
+        self._append_title(doc, title, author)
+        
+        for section_key in SECTION_ORDER:
+            if section_key in sections:
+                with doc.create(Section(self._get_section_title(section_key))):
+                    doc.append(NoEscape(sections[section_key]))
+        
+        return doc
+    
+    def _append_title(self, doc: 'Document', title: str, author: str):
+        from pylatex import Command
+        doc.append(Command('title', title))
+        doc.append(Command('author', author))
+        doc.append(Command('date', Command('today')))
+        doc.append(Command('maketitle'))
+    
+    def _add_content_to_document(self, doc: 'Document', content: str):
         """Fügt den Inhalt zum LaTeX-Dokument hinzu"""
+        from pylatex import Section
+        from pylatex.utils import NoEscape
         
         # Inhalt in Abschnitte aufteilen
         sections = self._parse_content_sections(content)
         
         # Titel hinzufügen
         if 'title' in sections:
-            doc.append(Command('title', sections['title']))
-            doc.append(Command('author', sections.get('author', 'CTA-Azubi')))
-            doc.append(Command('date', Command('today')))
-            doc.append(Command('maketitle'))
+            self._append_title(doc, sections['title'], sections.get('author', 'CTA-Azubi'))
         
         # Weitere Abschnitte hinzufügen
-        section_order = [
-            'zielsetzung', 'theorie', 'material', 'durchführung',
-            'ergebnisse', 'berechnungen', 'diskussion', 'schlussfolgerung'
-        ]
-        
-        for section_key in section_order:
+        for section_key in SECTION_ORDER:
             if section_key in sections:
                 section_title = self._get_section_title(section_key)
                 with doc.create(Section(section_title)):
@@ -327,27 +514,18 @@ class LaTeXService:
         
         return templates
     
-    def cleanup_old_files(self, max_age_days: int = 7) -> int:
-        """Löscht alte LaTeX- und PDF-Dateien"""
-        
-        import time
-        
-        deleted_count = 0
-        max_age_seconds = max_age_days * 24 * 60 * 60
-        current_time = time.time()
+    def cleanup_old_files(self, max_age_days: Optional[int] = None) -> int:
+        """Löscht alte LaTeX- und PDF-Dateien anhand des Alters-Index (Standard: LATEX_MAX_AGE_DAYS)"""
+        max_age_days = self.max_age_days if max_age_days is None else max_age_days
+        if max_age_days <= 0:
+            return 0
         
         try:
-            # Alle .tex, .pdf, .aux, .log Dateien durchgehen
-            for file_path in self.output_folder.glob('*'):
-                if file_path.is_file() and file_path.suffix in ['.tex', '.pdf', '.aux', '.log']:
-                    file_age = current_time - file_path.stat().st_mtime
-                    if file_age > max_age_seconds:
-                        file_path.unlink()
-                        deleted_count += 1
-            
-            logger.info(f"LaTeX-Cleanup: {deleted_count} Dateien gelöscht")
+            deleted_count = self.age_index.expire(max_age_days * 24 * 60 * 60)
+            if deleted_count:
+                logger.info(f"LaTeX-Cleanup: {deleted_count} Dateien gelöscht")
             return deleted_count
             
         except Exception as e:
             logger.error(f"LaTeX-Cleanup fehlgeschlagen: {str(e)}")
-            return deleted_count 
\ No newline at end of file
+            return 0 
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+Lazy Services - Verzögerte Initialisierung und Aufwärmen im Hintergrund
+
+Services wie LLMService (Modell-Abfrage bei Ollama), LaTeXService
+(pdflatex --version) oder OCRService (tesseract --version, pytesseract/numpy)
+blockieren beim Erstellen. Ein LazyService erstellt den echten Service erst
+beim ersten Attributzugriff oder im Hintergrund-Warm-up, sodass Worker sofort
+Anfragen annehmen können.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Callable, Generic, Iterable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class LazyService(Generic[T]):
+    """Proxy, der den Service beim ersten Zugriff threadsicher erstellt"""
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self._name = name
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+
+    @property
+    def service_name(self) -> str:
+        return self._name
+
+    @property
+    def is_ready(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> T:
+        """Liefert den Service und erstellt ihn bei Bedarf"""
+        instance = self._instance
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if self._instance is None:
+                start = time.perf_counter()
+                self._instance = self._factory()
+                logger.info(f"Service '{self._name}' initialisiert ({time.perf_counter() - start:.2f}s)")
+            return self._instance
+
+    def __getattr__(self, attribute):
+        # Nur für Attribute, die der Proxy selbst nicht hat
+        return getattr(self.get(), attribute)
+
+    def __repr__(self):
+        state = 'bereit' if self.is_ready else 'nicht initialisiert'
+        return f"<LazyService {self._name} ({state})>"
+
+
+def warm_up(services: Iterable[LazyService]) -> Optional[threading.Thread]:
+    """
+    Initialisiert Services nacheinander in einem Hintergrund-Thread
+
+    Fehler (z.B. Ollama nicht erreichbar) werden protokolliert; der Service wird
+    dann beim nächsten Zugriff erneut erstellt. Mit LAZY_WARMUP=0 abschaltbar.
+    """
+    if os.environ.get('LAZY_WARMUP', '1') == '0':
+        return None
+
+    services = list(services)
+
+    def run():
+        for service in services:
+            try:
+                service.get()
+            except Exception as e:
+                logger.warning(f"Warm-up von {service!r} fehlgeschlagen: {str(e)}")
+
+    thread = threading.Thread(target=run, name='service-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,182 @@
+"""
+LLM Router - Lastverteilung über mehrere Ollama-Instanzen
+
+Die Backends kommen aus OLLAMA_BASE_URLS (kommagetrennt, ersatzweise
+OLLAMA_BASE_URL). Pro Backend werden laufende Anfragen und die beobachtete
+Generierungsgeschwindigkeit (Tokens/s, gleitender Mittelwert) geführt. Jede
+Anfrage geht an das gesunde Backend mit der kürzesten erwarteten Wartezeit;
+schlägt sie fehl, wird sie auf einem anderen Host wiederholt.
+
+Circuit Breaker: nach LLM_CIRCUIT_FAILURES Verbindungs-, Timeout- oder
+Serverfehlern in Folge wird ein Backend für LLM_CIRCUIT_COOLDOWN Sekunden
+gemieden, danach bekommt es eine einzelne Probeanfrage (half-open). Jede
+Anfrage hat einen eigenen HTTP-Timeout (LLM_REQUEST_TIMEOUT, Verbindungsaufbau
+LLM_CONNECT_TIMEOUT), damit ein hängendes Backend als Fehler zählt, bevor das
+Gesamt-Timeout des Aufrufers die Anfrage abbricht.
+"""
+
+import os
+import time
+import logging
+from typing import Dict, List, Optional
+
+import httpx
+import ollama
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'http://172.17.0.1:11434'
+
+# Gewicht neuer Messungen im gleitenden Mittelwert der Tokens/s
+TPS_SMOOTHING = 0.3
+
+
+class NoBackendAvailable(Exception):
+    """Kein Ollama-Backend ist erreichbar bzw. alle Versuche sind fehlgeschlagen"""
+
+
+def ollama_base_urls() -> List[str]:
+    """Konfigurierte Ollama-URLs (OLLAMA_BASE_URLS, sonst OLLAMA_BASE_URL)"""
+    urls = [url.strip().rstrip('/') for url in os.environ.get('OLLAMA_BASE_URLS', '').split(',') if url.strip()]
+    return urls or [os.environ.get('OLLAMA_BASE_URL', DEFAULT_BASE_URL)]
+
+
+class LLMBackend:
+    """Zustand einer Ollama-Instanz (nur von der Event-Loop des Routers verändert)"""
+
+    def __init__(self, url: str, timeout: Optional[httpx.Timeout] = None):
+        self.url = url
+        self.client = ollama.AsyncClient(host=url, timeout=timeout)
+        self.in_flight = 0
+        self.tokens_per_second: Optional[float] = None
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.probing = False
+
+    def state(self, now: float) -> str:
+        if self.open_until == 0.0:
+            return 'closed'
+        return 'open' if now < self.open_until else 'half-open'
+
+    def is_selectable(self, now: float) -> bool:
+        state = self.state(now)
+        if state == 'closed':
+            return True
+        # Half-open: nur eine Probeanfrage gleichzeitig
+        return state == 'half-open' and not self.probing
+
+    def expected_wait(self, default_tps: float) -> float:
+        """Relative Wartezeit: laufende Anfragen geteilt durch Geschwindigkeit"""
+        return (self.in_flight + 1) / (self.tokens_per_second or default_tps)
+
+    def record_success(self, response: Dict):
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+        eval_count = response.get('eval_count') or 0
+        eval_duration = response.get('eval_duration') or 0  # Nanosekunden
+        if eval_count and eval_duration:
+            tps = eval_count / (eval_duration / 1e9)
+            if self.tokens_per_second is None:
+                self.tokens_per_second = tps
+            else:
+                self.tokens_per_second += TPS_SMOOTHING * (tps - self.tokens_per_second)
+
+    def record_failure(self, failure_threshold: int, cooldown: float):
+        self.errors += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= failure_threshold:
+            if self.state(time.monotonic()) != 'open':
+                logger.warning(f"Ollama-Backend {self.url} gesperrt für {cooldown:g}s "
+                               f"({self.consecutive_failures} Fehler in Folge)")
+            self.open_until = time.monotonic() + cooldown
+
+    def stats(self, now: float) -> Dict:
+        return {
+            'url': self.url,
+            'state': self.state(now),
+            'in_flight': self.in_flight,
+            'tokens_per_second': round(self.tokens_per_second, 1) if self.tokens_per_second else None,
+            'requests': self.requests,
+            'errors': self.errors
+        }
+
+
+class LLMRouter:
+    """Verteilt Generierungen auf mehrere Ollama-Backends (in der Event-Loop verwenden)"""
+
+    def __init__(self, urls: List[str] = None, max_attempts: int = None,
+                 failure_threshold: int = None, cooldown: float = None,
+                 request_timeout: float = None):
+        self.request_timeout = request_timeout or float(os.environ.get('LLM_REQUEST_TIMEOUT', 150))
+        timeout = httpx.Timeout(self.request_timeout, connect=float(os.environ.get('LLM_CONNECT_TIMEOUT', 10)))
+        self.backends = [LLMBackend(url, timeout) for url in (urls or ollama_base_urls())]
+        self.max_attempts = max_attempts or int(os.environ.get('LLM_ROUTER_ATTEMPTS', min(3, len(self.backends))))
+        self.failure_threshold = failure_threshold or int(os.environ.get('LLM_CIRCUIT_FAILURES', 3))
+        self.cooldown = cooldown or float(os.environ.get('LLM_CIRCUIT_COOLDOWN', 30))
+
+        logger.info(f"LLM-Router mit {len(self.backends)} Backend(s): {', '.join(b.url for b in self.backends)}")
+
+    def select(self, exclude=()) -> Optional[LLMBackend]:
+        """Wählt das gesunde Backend mit der kürzesten erwarteten Wartezeit"""
+        now = time.monotonic()
+        candidates = [b for b in self.backends if b not in exclude and b.is_selectable(now)]
+        if not candidates:
+            return None
+
+        # Backends ohne Messung werden wie der Durchschnitt der gemessenen behandelt
+        measured = [b.tokens_per_second for b in self.backends if b.tokens_per_second]
+        default_tps = sum(measured) / len(measured) if measured else 1.0
+        return min(candidates, key=lambda b: b.expected_wait(default_tps))
+
+    async def generate(self, model: str, prompt: str, options: Optional[Dict] = None, **kwargs) -> Dict:
+        """
+        Generiert auf dem am wenigsten ausgelasteten Backend, bei Fehlern auf einem anderen
+
+        Returns:
+            Ollama-Antwort (dict mit 'response', 'eval_count', ...)
+
+        Raises:
+            NoBackendAvailable: Alle Versuche fehlgeschlagen oder alle Backends gesperrt
+        """
+        tried = []
+        last_error = None
+
+        for _ in range(self.max_attempts):
+            backend = self.select(exclude=tried)
+            if backend is None:
+                break
+            tried.append(backend)
+
+            probing = backend.state(time.monotonic()) == 'half-open'
+            backend.probing = probing
+            backend.in_flight += 1
+            backend.requests += 1
+            try:
+                response = await backend.client.generate(model=model, prompt=prompt, options=options, **kwargs)
+            except (httpx.TransportError, ConnectionError) as e:
+                # inkl. httpx.TimeoutException: Backend hängt oder ist nicht erreichbar
+                last_error = e
+                backend.record_failure(self.failure_threshold, self.cooldown)
+            except ollama.ResponseError as e:
+                last_error = e
+                # Nur Serverfehler zählen für den Circuit Breaker (z.B. nicht 404 Modell fehlt)
+                if e.status_code >= 500:
+                    backend.record_failure(self.failure_threshold, self.cooldown)
+            else:
+                backend.record_success(response)
+                return response
+            finally:
+                backend.in_flight -= 1
+                if probing:
+                    backend.probing = False
+
+            logger.warning(f"Ollama-Backend {backend.url} fehlgeschlagen: {last_error or type(last_error).__name__}")
+
+        raise NoBackendAvailable(f"Kein Ollama-Backend verfügbar (letzter Fehler: {last_error})")
+
+    def stats(self) -> List[Dict]:
+        now = time.monotonic()
+        return [backend.stats(now) for backend in self.backends]
@@ -0,0 +1,231 @@
+"""
+LLM Scheduler - Prioritäten und faire Warteschlangen vor Ollama
+
+Ollama bearbeitet nur wenige Anfragen parallel (OLLAMA_NUM_PARALLEL pro
+Instanz). Der Scheduler vergibt diese Slots (OLLAMA_MAX_CONCURRENCY):
+
+- Prioritätsklassen: 'interactive' (Abschnitt generieren/verfeinern) vor
+  'standard' (vollständige Protokolle) vor 'batch' (Hintergrundarbeit, Tests)
+- innerhalb einer Klasse reihum pro Nutzer, damit ein Nutzer mit vielen
+  Anfragen die anderen nicht blockiert
+- 'batch' darf LLM_INTERACTIVE_RESERVE Slots nicht belegen, sodass interaktive
+  Anfragen nie hinter einer langen Hintergrund-Generierung warten; freie
+  Kapazität darüber hinaus nutzt Batch-Arbeit vollständig
+
+Schließt sich einer wartenden Anfrage (SingleFlight) ein höher priorisierter
+Aufrufer an, wird ihr Platz per promote() in dessen Klasse verschoben.
+
+Wartezeiten werden pro Klasse erfasst (Anzahl, Mittelwert, p50/p95, Maximum).
+Nur innerhalb einer Event-Loop verwenden (nicht threadsicher).
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ('interactive', 'standard', 'batch')
+
+# Anzahl der Wartezeiten pro Klasse für die Perzentile
+WAIT_SAMPLES = 500
+
+
+class _PriorityClass:
+    def __init__(self, name: str):
+        self.name = name
+        self.queues: 'OrderedDict[str, Deque[asyncio.Future]]' = OrderedDict()
+        self.running = 0
+        self.completed = 0
+        self.wait_times: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self.wait_total = 0.0
+        self.wait_count = 0
+        self.wait_max = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def enqueue(self, user: str, waiter: asyncio.Future):
+        self.queues.setdefault(user, deque()).append(waiter)
+
+    def remove(self, user: str, waiter: asyncio.Future):
+        queue = self.queues.get(user)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self.queues[user]
+
+    def pop_next(self) -> Optional[asyncio.Future]:
+        """Nächster Wartender reihum über die Nutzer"""
+        while self.queues:
+            user, queue = next(iter(self.queues.items()))
+            waiter = queue.popleft()
+            del self.queues[user]
+            if queue:
+                self.queues[user] = queue  # Nutzer ans Ende der Runde
+            if not waiter.done():
+                return waiter
+        return None
+
+    def record_wait(self, seconds: float):
+        self.wait_times.append(seconds)
+        self.wait_total += seconds
+        self.wait_count += 1
+        self.wait_max = max(self.wait_max, seconds)
+
+    def stats(self) -> Dict:
+        samples = sorted(self.wait_times)
+
+        def percentile(fraction):
+            return round(samples[min(len(samples) - 1, int(len(samples) * fraction))], 3) if samples else None
+
+        return {
+            'queued': self.queued,
+            'queued_users': len(self.queues),
+            'running': self.running,
+            'completed': self.completed,
+            'wait_seconds': {
+                'count': self.wait_count,
+                'mean': round(self.wait_total / self.wait_count, 3) if self.wait_count else None,
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': round(self.wait_max, 3)
+            }
+        }
+
+
+class SlotTicket:
+    """Anfrage auf einen Slot; kann bis zur Zuteilung höher eingestuft werden"""
+
+    def __init__(self, priority: str = 'standard', user: Optional[str] = None):
+        self.priority = priority
+        self.user = user or 'anonymous'
+        self.waiter: Optional[asyncio.Future] = None
+        self.started = False
+
+
+class LLMScheduler:
+    """Vergibt begrenzte LLM-Slots nach Priorität und reihum pro Nutzer"""
+
+    def __init__(self, max_concurrency: int, interactive_reserve: int = None):
+        self.max_concurrency = max_concurrency
+        if interactive_reserve is None:
+            interactive_reserve = int(os.environ.get('LLM_INTERACTIVE_RESERVE', 1 if max_concurrency > 1 else 0))
+        self.interactive_reserve = min(interactive_reserve, max_concurrency - 1)
+        self.active = 0
+        self._classes = {name: _PriorityClass(name) for name in PRIORITIES}
+
+    def _limit(self, priority: str) -> int:
+        return self.max_concurrency - (self.interactive_reserve if priority == 'batch' else 0)
+
+    def _can_start(self, priority: str) -> bool:
+        if self.active >= self._limit(priority):
+            return False
+        # Höher- oder gleichrangige Wartende haben Vorrang
+        for name in PRIORITIES[:PRIORITIES.index(priority) + 1]:
+            if self._classes[name].queued:
+                return False
+        return True
+
+    def has_idle_capacity(self, priority: str = 'batch') -> bool:
+        """True, wenn eine Anfrage dieser Klasse sofort einen Slot bekäme"""
+        return self._can_start(priority)
+
+    @asynccontextmanager
+    async def slot(self, priority: str = 'standard', user: Optional[str] = None,
+                   ticket: Optional[SlotTicket] = None):
+        """
+        Wartet auf einen freien Slot und gibt ihn danach wieder frei
+
+        Args:
+            priority: 'interactive', 'standard' oder 'batch'
+            user: Nutzerkennung für faire Reihenfolge innerhalb der Klasse
+            ticket: Vorab erzeugte Anfrage (ersetzt priority/user), um sie per
+                promote() höher einstufen zu können
+        """
+        ticket = ticket or SlotTicket(priority, user)
+        if ticket.priority not in self._classes:
+            raise ValueError(f"Unbekannte Priorität: {ticket.priority}")
+        start = time.monotonic()
+
+        if self._can_start(ticket.priority):
+            self.active += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            ticket.waiter = waiter
+            self._classes[ticket.priority].enqueue(ticket.user, waiter)
+            try:
+                await waiter  # Slot wird in _dispatch() bereits gezählt
+            except asyncio.CancelledError:
+                self._classes[ticket.priority].remove(ticket.user, waiter)
+                if waiter.done() and not waiter.cancelled():
+                    self._release()  # Slot war schon zugeteilt
+                raise
+            finally:
+                ticket.waiter = None
+
+        ticket.started = True
+        priority_class = self._classes[ticket.priority]
+        priority_class.record_wait(time.monotonic() - start)
+        priority_class.running += 1
+        try:
+            yield
+        finally:
+            priority_class.running -= 1
+            priority_class.completed += 1
+            self._release()
+
+    def promote(self, ticket: SlotTicket, priority: str, user: Optional[str] = None):
+        """
+        Stuft eine noch wartende Anfrage in eine höhere Klasse hoch
+
+        Läuft die Anfrage bereits oder ist sie schon mindestens so hoch
+        eingestuft, passiert nichts.
+
+        Args:
+            ticket: Anfrage aus slot()
+            priority: Neue Prioritätsklasse
+            user: Nutzer, dem der Platz in der neuen Klasse zugerechnet wird
+        """
+        if ticket.started or PRIORITIES.index(priority) >= PRIORITIES.index(ticket.priority):
+            return
+        user = user or ticket.user
+        waiter = ticket.waiter
+        if waiter is not None and not waiter.done():
+            self._classes[ticket.priority].remove(ticket.user, waiter)
+            self._classes[priority].enqueue(user, waiter)
+        logger.debug(f"LLM-Anfrage hochgestuft: {ticket.priority} -> {priority}")
+        ticket.priority, ticket.user = priority, user
+        if waiter is not None:
+            self._dispatch()
+
+    def _release(self):
+        self.active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Vergibt freie Slots an die nächsten Wartenden"""
+        for name in PRIORITIES:
+            priority_class = self._classes[name]
+            while self.active < self._limit(name):
+                waiter = priority_class.pop_next()
+                if waiter is None:
+                    break
+                self.active += 1
+                waiter.set_result(None)
+            if priority_class.queued:
+                # Nachrangige Klassen erst, wenn diese Klasse leer ist
+                return
+
+    def stats(self) -> Dict:
+        return {
+            'max_concurrency': self.max_concurrency,
+            'interactive_reserve': self.interactive_reserve,
+            'active': self.active,
+            'priorities': {name: priority_class.stats() for name, priority_class in self._classes.items()}
+        }
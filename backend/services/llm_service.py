@@ -9,48 +9,85 @@ from typing import Dict, List, Any, Optional
 import ollama
 from jinja2 import Template
 
+from .llm_router import ollama_base_urls
+from .structured_output import (
+    MISSING_SECTION, PROTOCOL_SECTIONS, structured_instructions
+)
+
 logger = logging.getLogger(__name__)
 
 class LLMService:
     """Service für LLM-Interaktionen mit Ollama"""
     
+    # Generierungsoptionen für vollständige Protokolle
+    PROTOCOL_OPTIONS = {
+        'temperature': 0.3,  # Niedrige Temperatur für konsistente Ergebnisse
+        'num_predict': 4000,  # Längere Ausgabe für vollständige Protokolle
+        'top_k': 40,
+        'top_p': 0.9
+    }
+    
+    # Generierungsoptionen für die Abschnitts-Verfeinerung
+    REFINEMENT_OPTIONS = {'temperature': 0.1, 'num_predict': 1000}
+    
+    # Token-Budget pro Abschnitt bei JSON-Ausgabe (Nachfragen nur für fehlende Abschnitte)
+    SECTION_TOKENS = 600
+    
     def __init__(self):
-        self.base_url = os.environ.get('OLLAMA_BASE_URL', 'http://172.17.0.1:11434')
+        # Bei mehreren Backends (OLLAMA_BASE_URLS) nutzt der synchrone Client das erste
+        self.base_urls = ollama_base_urls()
+        self.base_url = self.base_urls[0]
         self.model_name = os.environ.get('OLLAMA_MODEL', 'llama2')
         self.client = ollama.Client(host=self.base_url)
         
-        # Sicherstellen, dass das Modell verfügbar ist
+        # Clients mit kurzem Timeout für Modellprüfung und Gesundheitscheck aller Backends
+        self.health_timeout = float(os.environ.get('LLM_HEALTH_TIMEOUT', 10))
+        self._probe_clients = {url: ollama.Client(host=url, timeout=self.health_timeout) for url in self.base_urls}
+        
+        # Abschnitte als JSON anfordern statt Freitext nachträglich zu zerlegen
+        self.structured_output = os.environ.get('LLM_STRUCTURED_OUTPUT', '1') != '0'
+        self.structured_retries = int(os.environ.get('LLM_JSON_RETRIES', 2))
+        
+        # Sicherstellen, dass das Modell auf allen Backends verfügbar ist
         self._ensure_model_available()
     
     def _ensure_model_available(self):
-        """Stellt sicher, dass das gewünschte Modell verfügbar ist"""
-        try:
-            # Verfügbare Modelle abrufen
-            models = self.client.list()
-            model_names = [model['name'] for model in models['models']]
-            
-            if self.model_name not in model_names:
-                logger.info(f"Modell {self.model_name} nicht gefunden. Lade herunter...")
-                self.client.pull(self.model_name)
-                logger.info(f"Modell {self.model_name} erfolgreich geladen.")
-            
-        except Exception as e:
-            logger.error(f"Fehler beim Laden des Modells: {str(e)}")
+        """Stellt sicher, dass das gewünschte Modell auf jedem Backend verfügbar ist"""
+        available = False
+        for url, probe_client in self._probe_clients.items():
+            try:
+                # Verfügbare Modelle abrufen
+                models = probe_client.list()
+                model_names = [model['name'] for model in models['models']]
+                
+                if self.model_name not in model_names:
+                    logger.info(f"Modell {self.model_name} auf {url} nicht gefunden. Lade herunter...")
+                    # Ohne Timeout: der Download kann lange dauern
+                    ollama.Client(host=url).pull(self.model_name)
+                    logger.info(f"Modell {self.model_name} auf {url} erfolgreich geladen.")
+                available = True
+                
+            except Exception as e:
+                logger.error(f"Fehler beim Laden des Modells auf {url}: {str(e)}")
+        
+        if not available:
             # Fallback auf kleineres Modell wenn verfügbar
             self.model_name = 'llama2:7b'
     
     def is_available(self) -> bool:
-        """Prüft, ob der LLM-Service verfügbar ist"""
-        try:
-            response = self.client.generate(
-                model=self.model_name,
-                prompt="Test",
-                options={'num_predict': 1}
-            )
-            return True
-        except Exception as e:
-            logger.error(f"LLM-Service nicht verfügbar: {str(e)}")
-            return False
+        """Prüft, ob mindestens ein Ollama-Backend das Modell bedienen kann"""
+        for url, probe_client in self._probe_clients.items():
+            try:
+                probe_client.generate(
+                    model=self.model_name,
+                    prompt="Test",
+                    options={'num_predict': 1}
+                )
+                return True
+            except Exception as e:
+                logger.warning(f"Ollama-Backend {url} nicht verfügbar: {str(e)}")
+        logger.error("LLM-Service nicht verfügbar: kein Backend erreichbar")
+        return False
     
     def generate_protocol_content(self, files: List[Dict], protocol_metadata: Dict) -> str:
         """
@@ -74,12 +111,7 @@ class LLMService:
             response = self.client.generate(
                 model=self.model_name,
                 prompt=prompt,
-                options={
-                    'temperature': 0.3,  # Niedrige Temperatur für konsistente Ergebnisse
-                    'num_predict': 4000,  # Längere Ausgabe für vollständige Protokolle
-                    'top_k': 40,
-                    'top_p': 0.9
-                }
+                options=self.PROTOCOL_OPTIONS
             )
             
             generated_content = response['response']
@@ -93,6 +125,21 @@ class LLMService:
             logger.error(f"Fehler bei der Protokoll-Generierung: {str(e)}")
             return self._create_fallback_content(files, protocol_metadata)
     
+    def _structured_options(self, sections: List[str]) -> Dict:
+        """Generierungsoptionen mit Token-Budget passend zur Zahl der Abschnitte"""
+        num_predict = min(self.PROTOCOL_OPTIONS['num_predict'], self.SECTION_TOKENS * len(sections))
+        return dict(self.PROTOCOL_OPTIONS, num_predict=num_predict)
+    
+    def _complete_sections(self, sections: Dict[str, str], protocol_metadata: Dict) -> Dict[str, str]:
+        """Ordnet die Abschnitte und markiert dauerhaft fehlende als zu ergänzen"""
+        if not sections:
+            raise ValueError("Keine gültige JSON-Antwort vom LLM")
+        
+        missing = [key for key in PROTOCOL_SECTIONS if key not in sections]
+        if missing:
+            logger.warning(f"Abschnitte ohne Inhalt ({protocol_metadata.get('title', 'unbenannt')}): {missing}")
+        return {key: sections.get(key, MISSING_SECTION) for key in PROTOCOL_SECTIONS}
+    
     def _prepare_input_context(self, files: List[Dict], protocol_metadata: Dict) -> Dict:
         """Bereitet den Eingabekontext für das LLM auf"""
         context = {
@@ -122,6 +169,27 @@ class LLMService:
     
     def _create_protocol_prompt(self, context: Dict) -> str:
         """Erstellt den Prompt für die Protokoll-Generierung"""
+        return self._create_input_prompt(context) + """
+Erstelle ein vollständiges Laborprotokoll mit folgender Struktur:
+
+1. TITEL UND METADATEN
+2. ZIELSETZUNG
+3. THEORETISCHER HINTERGRUND
+4. MATERIALIEN UND GERÄTE
+5. DURCHFÜHRUNG
+6. BEOBACHTUNGEN UND ERGEBNISSE
+7. BERECHNUNGEN
+8. DISKUSSION
+9. SCHLUSSFOLGERUNG
+
+Beginne mit der Erstellung:"""
+    
+    def _create_structured_prompt(self, context: Dict, sections: List[str]) -> str:
+        """Erstellt den Prompt für die JSON-Ausgabe der angegebenen Abschnitte"""
+        return self._create_input_prompt(context) + structured_instructions(sections)
+    
+    def _create_input_prompt(self, context: Dict) -> str:
+        """Regeln und Eingabedaten, gemeinsamer Anfang aller Protokoll-Prompts"""
         
         prompt_template = """
 Du bist ein Assistent für die Erstellung wissenschaftlicher Laborprotokolle in der CTA-Ausbildung.
@@ -151,23 +219,9 @@ DATEIEN:
 
 ZUSÄTZLICHE METADATEN:
 {{ metadata }}
-
-Erstelle ein vollständiges Laborprotokoll mit folgender Struktur:
-
-1. TITEL UND METADATEN
-2. ZIELSETZUNG
-3. THEORETISCHER HINTERGRUND
-4. MATERIALIEN UND GERÄTE
-5. DURCHFÜHRUNG
-6. BEOBACHTUNGEN UND ERGEBNISSE
-7. BERECHNUNGEN
-8. DISKUSSION
-9. SCHLUSSFOLGERUNG
-
-Beginne mit der Erstellung:
 """
         
-        template = Template(prompt_template)
+        template = Template(prompt_template, keep_trailing_newline=True)
         return template.render(**context)
     
     def _validate_generated_content(self, content: str) -> str:
@@ -234,7 +288,22 @@ Bitte überprüfen Sie alle Inhalte und ergänzen Sie fehlende Informationen.
     def refine_section(self, section_content: str, section_type: str) -> str:
         """Verfeinert einen spezifischen Abschnitt des Protokolls"""
         
-        refinement_prompt = f"""
+        refinement_prompt = self._create_refinement_prompt(section_content, section_type)
+        
+        try:
+            response = self.client.generate(
+                model=self.model_name,
+                prompt=refinement_prompt,
+                options=self.REFINEMENT_OPTIONS
+            )
+            return response['response']
+        except Exception as e:
+            logger.error(f"Fehler bei der Abschnitts-Verfeinerung: {str(e)}")
+            return section_content  # Rückgabe des ursprünglichen Inhalts 
+    
+    def _create_refinement_prompt(self, section_content: str, section_type: str) -> str:
+        """Erstellt den Prompt für die Abschnitts-Verfeinerung"""
+        return f"""
 Verbessere den folgenden Abschnitt eines Laborprotokolls:
 
 ABSCHNITT-TYP: {section_type}
@@ -251,14 +320,3 @@ WICHTIG: Erfinde keine neuen Daten oder Messwerte!
 
 Verbesserte Version:
 """
-        
-        try:
-            response = self.client.generate(
-                model=self.model_name,
-                prompt=refinement_prompt,
-                options={'temperature': 0.1, 'num_predict': 1000}
-            )
-            return response['response']
-        except Exception as e:
-            logger.error(f"Fehler bei der Abschnitts-Verfeinerung: {str(e)}")
-            return section_content  # Rückgabe des ursprünglichen Inhalts 
\ No newline at end of file
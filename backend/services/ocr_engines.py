@@ -0,0 +1,219 @@
+"""
+OCR Engines - Tesseract-Backends für den OCR Service
+
+pytesseract startet für jeden Aufruf einen neuen tesseract-Prozess und lädt
+die Sprachdaten neu. Das tesserocr-Backend hält initialisierte Tesseract-APIs
+in Worker-Prozessen am Leben und übergibt die Bilder im Speicher.
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tesserocr
+except ImportError:  # optionale Abhängigkeit (benötigt libtesseract)
+    tesserocr = None
+
+# Initialisierte Tesseract-APIs pro Prozess, Schlüssel: (Sprache, PSM, OEM, Variablen).
+# Variablen gehören zum Schlüssel, da SetVariable die API dauerhaft verändert.
+_PROCESS_APIS: Dict[Tuple[str, int, int, Tuple[Tuple[str, str], ...]], object] = {}
+
+
+def parse_tesseract_config(config: str) -> Tuple[str, int, int, Dict[str, str]]:
+    """
+    Zerlegt eine pytesseract-Konfiguration wie '--oem 3 --psm 6 -l deu+eng'
+
+    Returns:
+        Tupel (Sprache, PSM, OEM, Variablen aus '-c key=value')
+    """
+    lang, psm, oem = 'eng', 3, 3
+    variables = {}
+
+    tokens = config.split()
+    for i, token in enumerate(tokens[:-1]):
+        value = tokens[i + 1]
+        if token == '-l':
+            lang = value
+        elif token == '--psm':
+            psm = int(value)
+        elif token == '--oem':
+            oem = int(value)
+        elif token == '-c' and '=' in value:
+            key, var_value = value.split('=', 1)
+            variables[key] = var_value
+
+    return lang, psm, oem, variables
+
+
+def _get_process_api(config: str):
+    """Liefert eine initialisierte Tesseract-API für diesen Prozess"""
+    lang, psm, oem, variables = parse_tesseract_config(config)
+    key = (lang, psm, oem, tuple(sorted(variables.items())))
+
+    api = _PROCESS_APIS.get(key)
+    if api is None:
+        api = tesserocr.PyTessBaseAPI(lang=lang, psm=psm, oem=oem)
+        for name, value in variables.items():
+            api.SetVariable(name, value)
+        _PROCESS_APIS[key] = api
+        logger.info(f"Tesseract-API initialisiert (pid {os.getpid()}, {lang}, psm {psm})")
+    return api
+
+
+def _pack_image(image: Image.Image) -> Tuple[str, Tuple[int, int], bytes]:
+    """Serialisiert ein Bild als Rohdaten für die Übergabe an Worker-Prozesse"""
+    if image.mode not in ('L', 'RGB', '1'):
+        image = image.convert('RGB')
+    return image.mode, image.size, image.tobytes()
+
+
+def _unpack_image(packed: Tuple[str, Tuple[int, int], bytes]) -> Image.Image:
+    mode, size, data = packed
+    return Image.frombytes(mode, size, data)
+
+
+def _tesserocr_image_to_string(packed, config: str) -> str:
+    """Texterkennung mit der prozesslokalen API (läuft im Worker-Prozess)"""
+    api = _get_process_api(config)
+    api.SetImage(_unpack_image(packed))
+    return api.GetUTF8Text()
+
+
+def _tesserocr_image_to_data(packed, config: str) -> Dict[str, List]:
+    """Wortdaten im Format von pytesseract.Output.DICT (läuft im Worker-Prozess)"""
+    api = _get_process_api(config)
+    api.SetImage(_unpack_image(packed))
+    api.Recognize()
+
+    data = {key: [] for key in (
+        'level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+        'left', 'top', 'width', 'height', 'conf', 'text'
+    )}
+
+    level = tesserocr.RIL.WORD
+    iterator = api.GetIterator()
+    if iterator is None:
+        return data
+
+    block_num = par_num = line_num = word_num = 0
+    for word in tesserocr.iterate_level(iterator, level):
+        if word.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+            block_num, par_num, line_num, word_num = block_num + 1, 0, 0, 0
+        if word.IsAtBeginningOf(tesserocr.RIL.PARA):
+            par_num, line_num, word_num = par_num + 1, 0, 0
+        if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+            line_num, word_num = line_num + 1, 0
+        word_num += 1
+
+        box = word.BoundingBox(level)
+        if box is None:
+            continue
+        left, top, right, bottom = box
+
+        data['level'].append(5)
+        data['page_num'].append(1)
+        data['block_num'].append(block_num)
+        data['par_num'].append(par_num)
+        data['line_num'].append(line_num)
+        data['word_num'].append(word_num)
+        data['left'].append(left)
+        data['top'].append(top)
+        data['width'].append(right - left)
+        data['height'].append(bottom - top)
+        data['conf'].append(int(word.Confidence(level)))
+        data['text'].append(word.GetUTF8Text(level) or '')
+
+    return data
+
+
+def image_to_string_local(image: Image.Image, config: str) -> str:
+    """
+    Texterkennung im aktuellen Prozess
+
+    Für Code, der bereits in einem Worker-Prozess läuft (z.B. PDF-Extraktion):
+    nutzt die prozesslokale tesserocr-API, falls verfügbar, sonst pytesseract.
+    """
+    if tesserocr is not None:
+        return _tesserocr_image_to_string(_pack_image(image), config)
+
+    import pytesseract
+    return pytesseract.image_to_string(image, config=config)
+
+
+class PytesseractEngine:
+    """OCR über pytesseract (ein tesseract-Prozess pro Aufruf)"""
+
+    name = 'pytesseract'
+
+    def image_to_string(self, image: Image.Image, config: str) -> str:
+        import pytesseract
+        return pytesseract.image_to_string(image, config=config)
+
+    def image_to_data(self, image: Image.Image, config: str) -> Dict[str, List]:
+        import pytesseract
+        return pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+
+    def shutdown(self):
+        pass
+
+
+class TesserocrEngine:
+    """OCR über persistente Tesseract-APIs in Worker-Prozessen (tesserocr)"""
+
+    name = 'tesserocr'
+
+    def __init__(self, max_workers: int = None):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr ist nicht installiert")
+
+        self.max_workers = max_workers or int(os.environ.get('OCR_WORKERS', os.cpu_count() or 1))
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def image_to_string(self, image: Image.Image, config: str) -> str:
+        return self._get_executor().submit(_tesserocr_image_to_string, _pack_image(image), config).result()
+
+    def image_to_data(self, image: Image.Image, config: str) -> Dict[str, List]:
+        return self._get_executor().submit(_tesserocr_image_to_data, _pack_image(image), config).result()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+def create_ocr_engine(backend: str = None):
+    """
+    Erstellt das konfigurierte OCR-Backend
+
+    Args:
+        backend: 'pytesseract', 'tesserocr' oder 'auto' (Standard: OCR_BACKEND)
+
+    Returns:
+        OCR-Engine mit image_to_string() und image_to_data()
+    """
+    backend = (backend or os.environ.get('OCR_BACKEND', 'auto')).lower()
+
+    if backend in ('tesserocr', 'auto'):
+        if tesserocr is not None:
+            logger.info("OCR-Backend: tesserocr (persistente Tesseract-APIs)")
+            return TesserocrEngine()
+        if backend == 'tesserocr':
+            logger.warning("tesserocr nicht installiert, verwende pytesseract")
+
+    logger.info("OCR-Backend: pytesseract")
+    return PytesseractEngine()
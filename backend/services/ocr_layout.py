@@ -0,0 +1,183 @@
+"""
+OCR Layout - Auflösungsnormalisierung und Zerlegung von Seiten in Textblöcke
+
+Große Fotos und mehrspaltige Laborblätter werden per rekursivem XY-Cut an
+Weißraum-Lücken in Blöcke zerlegt. Zu hohe Blöcke werden an der ink-ärmsten
+Zeile in Kacheln geteilt, damit keine Kachel eine Maximalhöhe überschreitet.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image
+
+Box = Tuple[int, int, int, int]  # (left, top, right, bottom)
+
+A4_LONG_SIDE_INCH = 11.69
+ANALYSIS_WIDTH = 1000  # Breite des verkleinerten Bildes für die Layout-Analyse
+
+
+def normalize_resolution(image: Image.Image, target_dpi: int = 300) -> Image.Image:
+    """
+    Skaliert ein Bild auf die Ziel-DPI
+
+    Ohne (oder mit unplausibler) DPI-Angabe wird eine A4-Seite angenommen,
+    z.B. wird ein 12-MP-Handyfoto auf ca. 3500 px Kantenlänge verkleinert.
+
+    Args:
+        image: Graustufenbild
+        target_dpi: Ziel-Auflösung
+
+    Returns:
+        Skaliertes Bild (oder das Original, wenn keine Skalierung nötig ist)
+    """
+    max_long_side = A4_LONG_SIDE_INCH * target_dpi * 1.2
+    long_side = max(image.size)
+
+    dpi = image.info.get('dpi')
+    if dpi and dpi[0] and dpi[0] > 1:
+        scale = target_dpi / float(dpi[0])
+    else:
+        scale = 1.0
+    # Handyfotos melden oft 72 DPI; nie über A4 bei Ziel-DPI hinaus vergrößern
+    scale = min(scale, max_long_side / long_side)
+
+    if abs(scale - 1.0) < 0.05:
+        return image
+
+    new_size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+    return image.resize(new_size, Image.Resampling.LANCZOS)
+
+
+def find_text_blocks(image: Image.Image, threshold: int, max_tile_height: int = 1200,
+                     min_row_gap: float = 0.02, min_column_gap: float = 0.03) -> List[Box]:
+    """
+    Zerlegt eine Seite in Textblöcke bzw. Kacheln in Lesereihenfolge
+
+    Args:
+        image: Graustufenbild in voller Auflösung
+        threshold: Binarisierungsschwelle (Pixel bis einschließlich gelten als Tinte)
+        max_tile_height: Maximale Kachelhöhe in Pixeln (volle Auflösung)
+        min_row_gap: Minimale horizontale Lücke relativ zur Bildhöhe
+        min_column_gap: Minimale Spaltenlücke relativ zur Bildbreite
+
+    Returns:
+        Liste von Boxen (left, top, right, bottom): Spalten von links nach
+        rechts, innerhalb einer Spalte von oben nach unten
+    """
+    scale = min(1.0, ANALYSIS_WIDTH / image.width)
+    analysis = image
+    if scale < 1.0:
+        analysis = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))))
+
+    ink = np.asarray(analysis.convert('L')) <= threshold
+    height, width = ink.shape
+
+    blocks = _xy_cut(
+        ink, (0, 0, width, height),
+        min_row_gap=max(2, int(height * min_row_gap)),
+        min_column_gap=max(2, int(width * min_column_gap)),
+        depth=0
+    )
+
+    tiles = []
+    for left, top, right, bottom in blocks:
+        full_box = (
+            int(left / scale), int(top / scale),
+            min(image.width, int(right / scale) + 1), min(image.height, int(bottom / scale) + 1)
+        )
+        tiles.extend(_split_tall_block(ink, (left, top, right, bottom), full_box, scale, max_tile_height))
+    return tiles
+
+
+def _ink_mask(profile: np.ndarray, length: int) -> np.ndarray:
+    """Zeilen/Spalten mit nennenswertem Tintenanteil (kleine Störungen ignorieren)"""
+    return profile > max(1, int(length * 0.002))
+
+
+def _gaps(mask: np.ndarray, min_gap: int) -> List[Tuple[int, int]]:
+    """Findet Läufe ohne Tinte mit Mindestlänge (ohne Ränder)"""
+    gaps = []
+    start = None
+    for i, has_ink in enumerate(mask):
+        if not has_ink and start is None:
+            start = i
+        elif has_ink and start is not None:
+            if i - start >= min_gap and start > 0:
+                gaps.append((start, i))
+            start = None
+    return gaps
+
+
+def _split_at_gaps(start: int, end: int, gaps: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    segments = []
+    position = start
+    for gap_start, gap_end in gaps:
+        segments.append((position, start + gap_start))
+        position = start + gap_end
+    segments.append((position, end))
+    return segments
+
+
+def _xy_cut(ink: np.ndarray, box: Box, min_row_gap: int, min_column_gap: int, depth: int) -> List[Box]:
+    """Rekursiver XY-Cut: erst an horizontalen Lücken, dann an Spaltenlücken teilen"""
+    left, top, right, bottom = box
+    region = ink[top:bottom, left:right]
+    if region.size == 0:
+        return []
+
+    rows = _ink_mask(region.sum(axis=1), right - left)
+    columns = _ink_mask(region.sum(axis=0), bottom - top)
+    if not rows.any() or not columns.any():
+        return []
+
+    # Auf Tinten-Ausdehnung zuschneiden
+    row_indices = np.flatnonzero(rows)
+    column_indices = np.flatnonzero(columns)
+    top, bottom = top + int(row_indices[0]), top + int(row_indices[-1]) + 1
+    left, right = left + int(column_indices[0]), left + int(column_indices[-1]) + 1
+
+    if depth >= 8:
+        return [(left, top, right, bottom)]
+
+    region = ink[top:bottom, left:right]
+    row_gaps = _gaps(_ink_mask(region.sum(axis=1), right - left), min_row_gap)
+    if row_gaps:
+        blocks = []
+        for segment_top, segment_bottom in _split_at_gaps(top, bottom, row_gaps):
+            blocks.extend(_xy_cut(ink, (left, segment_top, right, segment_bottom),
+                                  min_row_gap, min_column_gap, depth + 1))
+        return blocks
+
+    column_gaps = _gaps(_ink_mask(region.sum(axis=0), bottom - top), min_column_gap)
+    if column_gaps:
+        blocks = []
+        for segment_left, segment_right in _split_at_gaps(left, right, column_gaps):
+            blocks.extend(_xy_cut(ink, (segment_left, top, segment_right, bottom),
+                                  min_row_gap, min_column_gap, depth + 1))
+        return blocks
+
+    return [(left, top, right, bottom)]
+
+
+def _split_tall_block(ink: np.ndarray, small_box: Box, full_box: Box,
+                      scale: float, max_tile_height: int) -> List[Box]:
+    """Teilt zu hohe Blöcke an der ink-ärmsten Zeile nahe der Maximalhöhe"""
+    left, top, right, bottom = full_box
+    if bottom - top <= max_tile_height:
+        return [full_box]
+
+    small_left, small_top, small_right, small_bottom = small_box
+    row_ink = ink[small_top:small_bottom, small_left:small_right].sum(axis=1)
+    small_max = max(2, int(max_tile_height * scale))
+
+    tiles = []
+    start = 0
+    while len(row_ink) - start > small_max:
+        window_start = start + small_max * 3 // 4
+        window_end = start + small_max
+        cut = window_start + int(np.argmin(row_ink[window_start:window_end]))
+        tiles.append((left, top + int(start / scale), right, top + int(cut / scale)))
+        start = cut
+    tiles.append((left, top + int(start / scale), right, bottom))
+    return tiles
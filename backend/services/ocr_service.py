@@ -3,15 +3,158 @@ OCR Service - Texterkennung aus handschriftlichen Notizen und Bildern
 """
 
 import os
+import time
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 from pathlib import Path
-from typing import Optional, Dict, List
-from PIL import Image, ImageEnhance, ImageFilter
+from typing import Optional, Dict, List, Iterator, Tuple, Callable
+from PIL import Image, ImageEnhance, ImageFilter, ImageOps
 import pytesseract
 import numpy as np
 
+from .ocr_engines import create_ocr_engine
+from .entity_extraction import extract_entities, format_chemical_notations
+from .ocr_layout import normalize_resolution, find_text_blocks
+
 logger = logging.getLogger(__name__)
 
+class OCRResult:
+    """
+    Ergebnis eines einzelnen image_to_data-Durchlaufs
+    
+    Text, Konfidenzen, Layout und strukturierte Extraktionen werden erst bei
+    Bedarf berechnet und auf dem Objekt zwischengespeichert.
+    """
+    
+    MIN_WORD_CONFIDENCE = 30  # Wörter darunter gelten als unsicher
+    
+    def __init__(self, data: Dict[str, List], service: 'OCRService'):
+        self.data = data
+        self._service = service
+        self.escalation = None  # Stufen-Statistik im adaptiven Modus
+    
+    @cached_property
+    def words(self) -> List[Dict]:
+        """Alle erkannten Wörter mit Konfidenz und Position"""
+        words = []
+        for i, text in enumerate(self.data.get('text', [])):
+            if not str(text).strip():
+                continue
+            words.append({
+                'text': str(text),
+                'conf': int(float(self.data['conf'][i])),
+                'block': self.data['block_num'][i],
+                'par': self.data['par_num'][i],
+                'line': self.data['line_num'][i],
+                'left': self.data['left'][i],
+                'top': self.data['top'][i],
+                'width': self.data['width'][i],
+                'height': self.data['height'][i]
+            })
+        return words
+    
+    @cached_property
+    def confidences(self) -> List[int]:
+        """Konfidenzwerte aller bewerteten Wörter"""
+        return [word['conf'] for word in self.words if word['conf'] > 0]
+    
+    @cached_property
+    def average_confidence(self) -> float:
+        confidences = self.confidences
+        return sum(confidences) / len(confidences) if confidences else 0
+    
+    @cached_property
+    def lines(self) -> List[Dict]:
+        """Wörter gruppiert nach Textzeilen in Lesereihenfolge"""
+        lines = []
+        current_key = None
+        for word in self.words:
+            key = (word['block'], word['par'], word['line'])
+            if key != current_key:
+                lines.append({'block': word['block'], 'par': word['par'], 'line': word['line'], 'words': []})
+                current_key = key
+            lines[-1]['words'].append(word)
+        
+        for line in lines:
+            line['text'] = ' '.join(word['text'] for word in line['words'])
+            line_confidences = [word['conf'] for word in line['words'] if word['conf'] > 0]
+            line['confidence'] = sum(line_confidences) / len(line_confidences) if line_confidences else 0
+        return lines
+    
+    @cached_property
+    def blocks(self) -> List[Dict]:
+        """Textzeilen gruppiert nach Textblöcken"""
+        blocks = []
+        for line in self.lines:
+            if not blocks or blocks[-1]['block'] != line['block']:
+                blocks.append({'block': line['block'], 'lines': []})
+            blocks[-1]['lines'].append(line)
+        
+        for block in blocks:
+            block['text'] = '\n'.join(line['text'] for line in block['lines'])
+        return blocks
+    
+    @cached_property
+    def layout_text(self) -> str:
+        """Rohtext mit erhaltenen Zeilen- und Blockumbrüchen"""
+        return '\n\n'.join(block['text'] for block in self.blocks)
+    
+    @cached_property
+    def text(self) -> str:
+        """Bereinigter Text aller erkannten Wörter"""
+        return self._service._postprocess_text(' '.join(word['text'] for word in self.words))
+    
+    @cached_property
+    def confident_text(self) -> str:
+        """Bereinigter Text ohne unsichere Wörter"""
+        return self._service._postprocess_text(' '.join(
+            word['text'] for word in self.words if word['conf'] > self.MIN_WORD_CONFIDENCE
+        ))
+    
+    @cached_property
+    def entities(self) -> Dict[str, List]:
+        """Alle strukturierten Extraktionen aus einem Durchlauf über den Text"""
+        return extract_entities(self.text)
+    
+    @property
+    def measurements(self) -> List[Dict]:
+        return self.entities['measurements']
+    
+    @property
+    def chemical_compounds(self) -> List[str]:
+        return self.entities['chemical_compounds']
+    
+    @property
+    def temperatures(self) -> List[Dict]:
+        return self.entities['temperatures']
+    
+    @property
+    def observations(self) -> List[str]:
+        return self.entities['observations']
+    
+    def confidence_summary(self) -> Dict:
+        """Konfidenz-Auswertung im Format von extract_text_with_confidence"""
+        confidences = self.confidences
+        return {
+            'text': self.confident_text,
+            'confidence': self.average_confidence,
+            'word_count': len(self.words),
+            'high_confidence_words': len([c for c in confidences if c > 70]),
+            'low_confidence_areas': len([c for c in confidences if c < 50])
+        }
+    
+    def structured_data(self) -> Dict:
+        """Strukturierte Daten im Format von extract_structured_data"""
+        return {
+            'raw_text': self.text,
+            'measurements': self.measurements,
+            'chemical_compounds': self.chemical_compounds,
+            'temperatures': self.temperatures,
+            'observations': self.observations
+        }
+
 class OCRService:
     """Service für Optical Character Recognition (OCR)"""
     
@@ -21,6 +164,26 @@ class OCRService:
         
         # Prüfen ob Tesseract verfügbar ist
         self._check_tesseract_availability()
+        
+        # OCR-Backend (tesserocr mit persistenten APIs oder pytesseract als Fallback)
+        self.engine = create_ocr_engine()
+        
+        # Standard-Modus: 'standard' (ganzes Bild), 'layout' (Blöcke/Kacheln)
+        # oder 'adaptive' (schneller Durchlauf, Eskalation bei niedriger Konfidenz)
+        self.ocr_mode = os.environ.get('OCR_MODE', 'standard')
+        self.target_dpi = int(os.environ.get('OCR_TARGET_DPI', 300))
+        self.max_tile_height = int(os.environ.get('OCR_MAX_TILE_HEIGHT', 1200))
+        self.tile_workers = int(os.environ.get('OCR_TILE_WORKERS', os.cpu_count() or 1))
+        
+        # Adaptive Qualitätsstufen
+        self.confidence_threshold = float(os.environ.get('OCR_CONFIDENCE_THRESHOLD', 75))
+        # Obergrenze der Pixelzahl für die Hochskalierungs-Stufe (Speicher, Laufzeit)
+        self.upscale_max_pixels = int(os.environ.get('OCR_UPSCALE_MAX_PIXELS', 16_000_000))
+        self.escalation_stats = deque(maxlen=500)
+        
+        # Mehrseitige Bilder und Scans: Worker-Pool und max. Seiten im Speicher
+        self.page_workers = int(os.environ.get('OCR_PAGE_WORKERS', self.tile_workers))
+        self.page_window = int(os.environ.get('OCR_PAGE_WINDOW', self.page_workers * 2))
     
     def _check_tesseract_availability(self):
         """Prüft die Verfügbarkeit von Tesseract"""
@@ -31,29 +194,26 @@ class OCRService:
             logger.error(f"Tesseract nicht verfügbar: {str(e)}")
             raise RuntimeError("Tesseract OCR ist nicht verfügbar")
     
-    def extract_text(self, image_path: str) -> str:
+    def extract_text(self, image_path: str, mode: Optional[str] = None) -> str:
         """
         Extrahiert Text aus einem Bild
         
+        Mehrseitige TIFFs werden seitenweise erkannt (PDFs: PDFService).
+        
         Args:
             image_path: Pfad zum Bild
+            mode: 'standard', 'layout' oder 'adaptive' (Standard: OCR_MODE)
             
         Returns:
             Extrahierter Text
         """
         try:
-            # Bild laden und vorverarbeiten
-            image = Image.open(image_path)
-            processed_image = self._preprocess_image(image)
+            if self.is_multipage(image_path):
+                return '\n\n'.join(text for _, text in self.iter_page_texts(image_path, mode) if text)
             
-            # OCR durchführen
-            extracted_text = pytesseract.image_to_string(
-                processed_image, 
-                config=self.tesseract_config
-            )
-            
-            # Text nachbearbeiten
-            cleaned_text = self._postprocess_text(extracted_text)
+            with Image.open(image_path) as image:
+                image.load()
+                cleaned_text = self._recognize_image(image, mode, image_path)
             
             logger.info(f"Text erfolgreich extrahiert aus {image_path}")
             return cleaned_text
@@ -62,49 +222,276 @@ class OCRService:
             logger.error(f"OCR-Fehler bei {image_path}: {str(e)}")
             return f"[OCR-FEHLER: {str(e)}]"
     
-    def extract_text_with_confidence(self, image_path: str) -> Dict:
+    def iter_page_texts(self, file_path: str, mode: Optional[str] = None) -> Iterator[Tuple[int, str]]:
         """
-        Extrahiert Text mit Konfidenz-Informationen
+        Erkennt mehrseitige Bilder (TIFF) Seite für Seite
+        
+        Die Frames werden erst bei Bedarf dekodiert und auf einem
+        Worker-Pool erkannt. Höchstens OCR_PAGE_WINDOW Seiten sind gleichzeitig
+        in Arbeit; die Texte werden in Seitenreihenfolge geliefert, sobald sie
+        fertig sind.
         
         Args:
-            image_path: Pfad zum Bild
+            file_path: Pfad zum Bild
+            mode: OCR-Modus pro Seite (siehe extract_text)
             
-        Returns:
-            Dict mit Text und Konfidenz-Informationen
+        Yields:
+            Tupel (Seitenindex, Text)
         """
+        executor = ThreadPoolExecutor(max_workers=max(1, self.page_workers))
+        pending = deque()
+        
         try:
-            image = Image.open(image_path)
-            processed_image = self._preprocess_image(image)
+            for index, load_page in enumerate(self._iter_page_loaders(file_path)):
+                pending.append((index, executor.submit(self._recognize_page, load_page, mode, f"{file_path}#{index + 1}")))
+                if len(pending) >= self.page_window:
+                    page_index, future = pending.popleft()
+                    yield page_index, future.result()
             
-            # Detaillierte OCR-Daten abrufen
-            data = pytesseract.image_to_data(
-                processed_image,
-                config=self.tesseract_config,
-                output_type=pytesseract.Output.DICT
-            )
+            while pending:
+                page_index, future = pending.popleft()
+                yield page_index, future.result()
+        finally:
+            # Bei vorzeitigem Abbruch durch den Aufrufer keine weiteren Seiten erkennen
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _iter_page_loaders(self, file_path: str) -> Iterator[Callable[[], Image.Image]]:
+        """Liefert pro Seite eine Funktion, die die Seite als Bild lädt"""
+        # Frames werden nacheinander dekodiert, da ein Image-Objekt nicht threadsicher ist
+        with Image.open(file_path) as image:
+            for index in range(getattr(image, 'n_frames', 1)):
+                image.seek(index)
+                frame = image.convert('L')
+                yield lambda frame=frame: frame
+    
+    def _recognize_page(self, load_page: Callable[[], Image.Image], mode: Optional[str], label: str) -> str:
+        """Lädt und erkennt eine einzelne Seite (läuft im Worker-Pool)"""
+        try:
+            return self._recognize_image(load_page(), mode, label)
+        except Exception as e:
+            logger.error(f"OCR-Fehler bei {label}: {str(e)}")
+            return ""
+    
+    def is_multipage(self, file_path: str) -> bool:
+        """Prüft, ob ein Bild mehrere Seiten bzw. Frames enthält"""
+        with Image.open(file_path) as image:
+            return getattr(image, 'n_frames', 1) > 1
+    
+    def _recognize_image(self, image: Image.Image, mode: Optional[str] = None, label: str = '') -> str:
+        """Führt OCR im gewählten Modus für ein geladenes Bild aus"""
+        mode = mode or self.ocr_mode
+        if mode == 'layout':
+            return self._extract_text_layout(image, label)
+        if mode == 'adaptive':
+            return self._analyze_adaptive_image(image.convert('L'), label).text
+        
+        # Bild vorverarbeiten
+        processed_image = self._preprocess_image(image)
+        
+        # OCR durchführen
+        extracted_text = self.engine.image_to_string(
+            processed_image, 
+            self.tesseract_config
+        )
+        
+        # Text nachbearbeiten
+        return self._postprocess_text(extracted_text)
+    
+    def _extract_text_layout(self, image: Image.Image, label: str = '') -> str:
+        """
+        Layout-bewusste OCR für große Fotos und mehrspaltige Blätter
+        
+        Das Bild wird auf die Ziel-DPI normalisiert, in Textblöcke bzw. Kacheln
+        zerlegt, parallel erkannt und in Lesereihenfolge zusammengesetzt.
+        """
+        image = normalize_resolution(ImageOps.exif_transpose(image).convert('L'), self.target_dpi)
+        
+        threshold = self._get_optimal_threshold(image)
+        tiles = find_text_blocks(image, threshold, max_tile_height=self.max_tile_height)
+        if not tiles:
+            return ""
+        
+        def recognize(box):
+            # Bild ist bereits auf target_dpi normalisiert: Kacheln nicht erneut hochskalieren
+            tile = self._preprocess_image(image.crop(self._pad_box(box, image.size)), upscale=False)
+            return self._postprocess_text(self.engine.image_to_string(tile, self.tesseract_config))
+        
+        workers = max(1, min(self.tile_workers, len(tiles)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            texts = list(executor.map(recognize, tiles))
+        
+        logger.info(f"Layout-OCR: {len(tiles)} Kacheln aus {label}")
+        return '\n\n'.join(text for text in texts if text)
+    
+    def _pad_box(self, box, size, padding: int = 12):
+        """Vergrößert eine Kachel um einen Rand, damit Zeichen nicht abgeschnitten werden"""
+        left, top, right, bottom = box
+        width, height = size
+        return (max(0, left - padding), max(0, top - padding),
+                min(width, right + padding), min(height, bottom + padding))
+    
+    def analyze(self, image_path: str) -> OCRResult:
+        """
+        Führt Vorverarbeitung und OCR genau einmal aus
+        
+        Args:
+            image_path: Pfad zum Bild
             
-            # Konfidenz-Analyse
-            confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+        Returns:
+            OCRResult mit Text, Konfidenzen, Layout und strukturierten Daten
+        """
+        image = Image.open(image_path)
+        processed_image = self._preprocess_image(image)
+        
+        # Detaillierte OCR-Daten abrufen (ein Tesseract-Durchlauf)
+        data = self.engine.image_to_data(
+            processed_image,
+            self.tesseract_config
+        )
+        
+        return OCRResult(data, self)
+    
+    def analyze_adaptive(self, image_path: str) -> OCRResult:
+        """
+        Adaptive OCR mit Qualitätsleiter und frühem Abbruch
+        
+        Beginnt mit einem schnellen Durchlauf ohne Vorverarbeitung und eskaliert
+        nur, solange die mittlere Konfidenz unter OCR_CONFIDENCE_THRESHOLD liegt.
+        
+        Args:
+            image_path: Pfad zum Bild
             
-            # Text zusammenfügen
-            text_parts = []
-            for i, word in enumerate(data['text']):
-                if int(data['conf'][i]) > 30:  # Nur Wörter mit > 30% Konfidenz
-                    text_parts.append(word)
+        Returns:
+            OCRResult der Stufe mit der höchsten Konfidenz, inkl. Eskalations-Statistik
+        """
+        with Image.open(image_path) as original:
+            gray_image = original.convert('L')
+        
+        return self._analyze_adaptive_image(gray_image, image_path)
+    
+    def _analyze_adaptive_image(self, gray_image: Image.Image, label: str) -> OCRResult:
+        """Qualitätsleiter für ein bereits geladenes Graustufenbild"""
+        best = None
+        best_step = None
+        steps = []
+        cache = {}
+        
+        for name, prepare, psm in self._quality_ladder():
+            start = time.perf_counter()
+            stage_image = prepare(gray_image, cache)
+            if stage_image is None:
+                continue  # Stufe bringt für dieses Bild nichts (z.B. schon groß genug)
+            result = OCRResult(self.engine.image_to_data(stage_image, self._config_with_psm(psm)), self)
+            confidence = result.average_confidence
             
-            extracted_text = ' '.join(text_parts)
-            cleaned_text = self._postprocess_text(extracted_text)
+            steps.append({
+                'step': name,
+                'psm': psm,
+                'confidence': round(confidence, 1),
+                'duration_ms': round((time.perf_counter() - start) * 1000, 1)
+            })
             
-            result = {
-                'text': cleaned_text,
-                'confidence': avg_confidence,
-                'word_count': len([w for w in data['text'] if w.strip()]),
-                'high_confidence_words': len([c for c in confidences if c > 70]),
-                'low_confidence_areas': len([c for c in confidences if c < 50])
-            }
+            if best is None or confidence > best.average_confidence:
+                best = result
+                best_step = name
+            if confidence >= self.confidence_threshold:
+                break
+        
+        best.escalation = {
+            'image': os.path.basename(label),
+            'steps': steps,
+            'escalations': len(steps) - 1,
+            'final_step': best_step,
+            'final_confidence': round(best.average_confidence, 1),
+            'total_ms': round(sum(step['duration_ms'] for step in steps), 1)
+        }
+        self.escalation_stats.append(best.escalation)
+        
+        logger.info(f"Adaptive OCR: {len(steps)} Stufe(n), Konfidenz {best.average_confidence:.1f}% ({label})")
+        return best
+    
+    def _quality_ladder(self):
+        """Stufen der adaptiven OCR: (Name, Vorverarbeitung, PSM), aufsteigend nach Kosten"""
+        
+        def fast(image, cache):
+            return image
+        
+        def enhanced(image, cache):
+            if 'enhanced' not in cache:
+                cache['enhanced'] = self._preprocess_image(image)
+            return cache['enhanced']
+        
+        def otsu(image, cache):
+            if 'otsu' not in cache:
+                cache['otsu'] = self._binarize(enhanced(image, cache))
+            return cache['otsu']
+        
+        def upscaled(image, cache):
+            base = enhanced(image, cache)
+            # Bis zu 2x, aber höchstens upscale_max_pixels; lohnt sich das nicht, Stufe auslassen
+            factor = min(2.0, (self.upscale_max_pixels / (base.width * base.height)) ** 0.5)
+            if factor < 1.25:
+                return None
+            scaled = base.resize((int(base.width * factor), int(base.height * factor)), Image.Resampling.LANCZOS)
+            return self._binarize(scaled)
+        
+        return [
+            ('fast', fast, 6),
+            ('enhanced', enhanced, 6),
+            ('otsu', otsu, 6),
+            ('upscale', upscaled, 6),
+            ('sparse_text', otsu, 11)
+        ]
+    
+    def _binarize(self, image: Image.Image) -> Image.Image:
+        """Binarisierung mit Otsu-Schwellenwert"""
+        threshold = self._get_optimal_threshold(image)
+        return image.point(lambda x: 0 if x <= threshold else 255, 'L')
+    
+    def _config_with_psm(self, psm: int) -> str:
+        """Tesseract-Konfiguration mit anderem Page-Segmentation-Mode"""
+        parts = self.tesseract_config.split()
+        if '--psm' in parts:
+            parts[parts.index('--psm') + 1] = str(psm)
+        else:
+            parts += ['--psm', str(psm)]
+        return ' '.join(parts)
+    
+    def get_escalation_statistics(self) -> Dict:
+        """Zusammenfassung der Eskalationen im adaptiven Modus"""
+        stats = list(self.escalation_stats)
+        final_steps = {}
+        for entry in stats:
+            final_steps[entry['final_step']] = final_steps.get(entry['final_step'], 0) + 1
+        
+        return {
+            'images': len(stats),
+            'single_pass': len([entry for entry in stats if entry['escalations'] == 0]),
+            'average_steps': sum(len(entry['steps']) for entry in stats) / len(stats) if stats else 0,
+            'final_steps': final_steps,
+            'recent': stats[-10:]
+        }
+    
+    def extract_text_with_confidence(self, image_path: str, mode: Optional[str] = None) -> Dict:
+        """
+        Extrahiert Text mit Konfidenz-Informationen
+        
+        Args:
+            image_path: Pfad zum Bild
+            mode: 'adaptive' für die Qualitätsleiter, sonst ein Durchlauf
+            
+        Returns:
+            Dict mit Text und Konfidenz-Informationen
+        """
+        try:
+            if (mode or self.ocr_mode) == 'adaptive':
+                ocr_result = self.analyze_adaptive(image_path)
+                result = ocr_result.confidence_summary()
+                result['escalation'] = ocr_result.escalation
+            else:
+                result = self.analyze(image_path).confidence_summary()
             
-            logger.info(f"OCR mit Konfidenz-Analyse abgeschlossen: {avg_confidence:.1f}%")
+            logger.info(f"OCR mit Konfidenz-Analyse abgeschlossen: {result['confidence']:.1f}%")
             return result
             
         except Exception as e:
@@ -115,12 +502,14 @@ class OCRService:
                 'error': str(e)
             }
     
-    def _preprocess_image(self, image: Image.Image) -> Image.Image:
+    def _preprocess_image(self, image: Image.Image, upscale: bool = True) -> Image.Image:
         """
         Bildvorverarbeitung für bessere OCR-Ergebnisse
         
         Args:
             image: Original PIL-Image
+            upscale: Schmale Bilder auf 1000 px Breite vergrößern (nicht für
+                bereits DPI-normalisierte Kacheln)
             
         Returns:
             Vorverarbeitetes PIL-Image
@@ -131,7 +520,7 @@ class OCRService:
             
             # Bildgröße anpassen (OCR funktioniert besser bei höherer Auflösung)
             width, height = gray_image.size
-            if width < 1000:
+            if upscale and width < 1000:
                 scale_factor = 1000 / width
                 new_width = int(width * scale_factor)
                 new_height = int(height * scale_factor)
@@ -235,45 +624,10 @@ class OCRService:
         cleaned = cleaned.replace('\n\n', '\n').replace('\r\n', '\n')
         
         # Chemische Formeln und Zahlen besser formatieren
-        cleaned = self._format_chemical_notations(cleaned)
+        cleaned = format_chemical_notations(cleaned)
         
         return cleaned
     
-    def _format_chemical_notations(self, text: str) -> str:
-        """
-        Verbessert die Formatierung von chemischen Formeln und Messwerten
-        """
-        # Vereinfachte Formatierung für MVP
-        # Könnte durch spezialisierte chemische OCR-Nachbearbeitung erweitert werden
-        
-        import re
-        
-        # Häufige chemische Elemente richtig formatieren
-        chemical_patterns = {
-            r'\bH20\b': 'H2O',
-            r'\bNaCl\b': 'NaCl',
-            r'\bCaCl2\b': 'CaCl2',
-            r'\bHCI\b': 'HCl',
-            r'\bNaOH\b': 'NaOH'
-        }
-        
-        for pattern, replacement in chemical_patterns.items():
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-        
-        # Einheiten besser formatieren
-        unit_patterns = {
-            r'(\d+)\s*(ml|ML)\b': r'\1 mL',
-            r'(\d+)\s*(mg|MG)\b': r'\1 mg',
-            r'(\d+)\s*(g|G)\b(?!\w)': r'\1 g',
-            r'(\d+)\s*°\s*C\b': r'\1°C',
-            r'(\d+)\s*(mol|MOL)\b': r'\1 mol'
-        }
-        
-        for pattern, replacement in unit_patterns.items():
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-        
-        return text
-    
     def extract_structured_data(self, image_path: str) -> Dict:
         """
         Versucht strukturierte Daten aus dem Bild zu extrahieren
@@ -286,106 +640,8 @@ class OCRService:
             Dict mit strukturierten Daten
         """
         try:
-            text = self.extract_text(image_path)
-            
-            result = {
-                'raw_text': text,
-                'measurements': self._extract_measurements(text),
-                'chemical_compounds': self._extract_chemical_compounds(text),
-                'temperatures': self._extract_temperatures(text),
-                'observations': self._extract_observations(text)
-            }
-            
-            return result
+            return self.analyze(image_path).structured_data()
             
         except Exception as e:
             logger.error(f"Strukturierte Datenextraktion fehlgeschlagen: {str(e)}")
             return {'error': str(e)}
-    
-    def _extract_measurements(self, text: str) -> List[Dict]:
-        """Extrahiert Messwerte aus dem Text"""
-        import re
-        
-        measurements = []
-        
-        # Pattern für verschiedene Messungen
-        patterns = [
-            r'(\d+(?:\.\d+)?)\s*(mg|g|kg|ml|l|mol)',
-            r'(\d+(?:\.\d+)?)\s*°C',
-            r'(\d+(?:\.\d+)?)\s*(min|h|s)',
-            r'pH\s*[=:]\s*(\d+(?:\.\d+)?)'
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if isinstance(match, tuple):
-                    value, unit = match
-                    measurements.append({
-                        'value': float(value),
-                        'unit': unit,
-                        'type': 'measurement'
-                    })
-        
-        return measurements
-    
-    def _extract_chemical_compounds(self, text: str) -> List[str]:
-        """Extrahiert chemische Verbindungen aus dem Text"""
-        import re
-        
-        # Einfache Pattern für häufige chemische Verbindungen
-        chemical_patterns = [
-            r'\b[A-Z][a-z]?(?:\d+)?(?:[A-Z][a-z]?\d*)*\b',  # Grundlegende chemische Formeln
-            r'\b(?:NaCl|H2O|HCl|NaOH|CaCl2|KOH|H2SO4|HNO3)\b'  # Häufige Verbindungen
-        ]
-        
-        compounds = []
-        for pattern in chemical_patterns:
-            matches = re.findall(pattern, text)
-            compounds.extend(matches)
-        
-        # Duplikate entfernen und filtern
-        return list(set([c for c in compounds if len(c) > 1 and not c.isdigit()]))
-    
-    def _extract_temperatures(self, text: str) -> List[Dict]:
-        """Extrahiert Temperaturen aus dem Text"""
-        import re
-        
-        temp_patterns = [
-            r'(\d+(?:\.\d+)?)\s*°C',
-            r'(\d+(?:\.\d+)?)\s*°F',
-            r'(\d+(?:\.\d+)?)\s*K'
-        ]
-        
-        temperatures = []
-        for pattern in temp_patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                unit = 'C' if '°C' in pattern else ('F' if '°F' in pattern else 'K')
-                temperatures.append({
-                    'value': float(match),
-                    'unit': unit,
-                    'type': 'temperature'
-                })
-        
-        return temperatures
-    
-    def _extract_observations(self, text: str) -> List[str]:
-        """Extrahiert Beobachtungen aus dem Text"""
-        import re
-        
-        # Keywords für Beobachtungen
-        observation_keywords = [
-            r'Farbe?\s*[:\-]?\s*([a-zA-ZäöüÄÖÜß\s]+)',
-            r'Geruch\s*[:\-]?\s*([a-zA-ZäöüÄÖÜß\s]+)',
-            r'Niederschlag\s*[:\-]?\s*([a-zA-ZäöüÄÖÜß\s]+)',
-            r'Reaktion\s*[:\-]?\s*([a-zA-ZäöüÄÖÜß\s]+)',
-            r'Beobachtung\s*[:\-]?\s*([a-zA-ZäöüÄÖÜß\s]+)'
-        ]
-        
-        observations = []
-        for pattern in observation_keywords:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            observations.extend([match.strip() for match in matches if match.strip()])
-        
-        return list(set(observations))  # Duplikate entfernen 
\ No newline at end of file
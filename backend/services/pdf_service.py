@@ -0,0 +1,242 @@
+"""
+PDF Service - Seitenparallele Textextraktion mit Seiten-Cache und OCR-Fallback
+"""
+
+import os
+import hashlib
+import logging
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tesseract-Konfiguration für gescannte Seiten (wie im OCRService)
+OCR_CONFIG = '--oem 3 --psm 6 -l deu+eng'
+
+
+def rasterize_pdf_page(file_path: str, page_index: int, dpi: int = 300):
+    """
+    Rastert eine einzelne PDF-Seite mit pdftoppm (poppler-utils)
+
+    Args:
+        file_path: Pfad zur PDF-Datei
+        page_index: Seitenindex (0-basiert)
+        dpi: Auflösung der Rastergrafik
+
+    Returns:
+        Graustufen-PIL-Image der Seite
+    """
+    from PIL import Image
+
+    page_number = str(page_index + 1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prefix = os.path.join(tmp_dir, 'page')
+        subprocess.run([
+            'pdftoppm', '-f', page_number, '-l', page_number,
+            '-r', str(dpi), '-gray', '-png', '-singlefile',
+            str(file_path), prefix
+        ], check=True, capture_output=True, timeout=60)
+
+        with Image.open(f"{prefix}.png") as image:
+            image.load()
+            return image.copy()
+
+
+def _extract_page_range(file_path: str, page_indices: List[int]) -> Dict[int, str]:
+    """Extrahiert die Textebene eines Seitenbereichs (läuft im Worker-Prozess)"""
+    import PyPDF2
+
+    texts = {}
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for index in page_indices:
+            try:
+                texts[index] = pdf_reader.pages[index].extract_text() or ''
+            except Exception as e:
+                logger.warning(f"Textextraktion Seite {index + 1} fehlgeschlagen: {str(e)}")
+                texts[index] = ''
+    return texts
+
+
+def _ocr_page(file_path: str, page_index: int, dpi: int) -> str:
+    """Rastert eine Seite ohne Textebene und führt OCR durch (läuft im Worker-Prozess)"""
+    from .ocr_engines import image_to_string_local
+
+    image = rasterize_pdf_page(file_path, page_index, dpi)
+    return image_to_string_local(image, OCR_CONFIG).strip()
+
+
+class PDFService:
+    """Service für seitenparallele PDF-Textextraktion"""
+
+    def __init__(self, cache_folder: str, max_workers: Optional[int] = None, ocr_dpi: int = 300):
+        self.cache_folder = Path(cache_folder)
+        self.cache_folder.mkdir(parents=True, exist_ok=True)
+
+        self.max_workers = max_workers or int(os.environ.get('PDF_EXTRACT_WORKERS', os.cpu_count() or 1))
+        # Kleine Dokumente seriell verarbeiten, der Prozess-Start lohnt sich erst ab einigen Seiten
+        self.parallel_min_pages = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', 16))
+        # Seiten pro Arbeitspaket beim seitenweisen Liefern
+        self.chunk_pages = int(os.environ.get('PDF_CHUNK_PAGES', 8))
+        self.ocr_dpi = ocr_dpi
+
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def extract_text(self, file_path: str) -> str:
+        """
+        Extrahiert den Text aller Seiten einer PDF-Datei
+
+        Args:
+            file_path: Pfad zur PDF-Datei
+
+        Returns:
+            Text aller Seiten, durch Zeilenumbrüche getrennt
+        """
+        return '\n'.join(text for _, text in self.iter_page_texts(file_path)).strip()
+
+    def iter_page_texts(self, file_path: str) -> Iterator[Tuple[int, str]]:
+        """
+        Liefert den Text einer PDF-Datei Seite für Seite
+
+        Bereits bekannte Seiten kommen aus dem Cache. Fehlende Seiten werden in
+        Paketen zu PDF_CHUNK_PAGES Seiten parallel extrahiert (höchstens ein
+        Paket pro Worker in Arbeit); Seiten ohne Textebene werden gerastert und
+        per OCR erkannt. Die Texte kommen in Seitenreihenfolge, sobald ihr
+        Paket fertig ist, und werden danach nicht mehr im Speicher gehalten.
+
+        Args:
+            file_path: Pfad zur PDF-Datei
+
+        Yields:
+            Tupel (Seitenindex, Text)
+        """
+        path = Path(file_path)
+        document_hash = self._hash_file(path)
+        page_count = self._count_pages(path)
+
+        pages = self._load_cached_pages(document_hash, page_count)
+        missing = [index for index in range(page_count) if index not in pages]
+        logger.info(f"PDF-Text: {page_count} Seiten, {page_count - len(missing)} aus Cache")
+
+        chunks = iter([missing[i:i + self.chunk_pages] for i in range(0, len(missing), self.chunk_pages)])
+        # Kleine Dokumente seriell, der Prozess-Start lohnt sich erst ab einigen Seiten
+        executor = self._get_executor() if len(missing) >= self.parallel_min_pages and self.max_workers > 1 else None
+        pending = deque()
+
+        def submit_next():
+            chunk = next(chunks, None)
+            if chunk is not None:
+                pending.append(executor.submit(_extract_page_range, str(path), chunk) if executor
+                               else chunk)
+
+        for _ in range(self.max_workers if executor else 1):
+            submit_next()
+
+        try:
+            for index in range(page_count):
+                if index not in pages:
+                    job = pending.popleft()
+                    extracted = job.result() if executor else _extract_page_range(str(path), job)
+                    submit_next()
+                    pages.update(self._complete_pages(path, document_hash, extracted))
+                yield index, pages.pop(index)
+        finally:
+            # Bei vorzeitigem Abbruch durch den Aufrufer keine weiteren Pakete bearbeiten
+            for job in pending:
+                if executor:
+                    job.cancel()
+
+    def _complete_pages(self, path: Path, document_hash: str, extracted: Dict[int, str]) -> Dict[int, str]:
+        """Erkennt Seiten ohne Textebene per OCR und legt die Seiten im Cache ab"""
+        empty = [index for index, text in extracted.items() if not text.strip()]
+        failed = set()
+        if empty:
+            logger.info(f"{len(empty)} Seite(n) ohne Textebene, starte OCR")
+            ocr_texts = self._ocr_pages(path, empty)
+            extracted.update(ocr_texts)
+            failed = set(empty) - set(ocr_texts)
+
+        for index, text in extracted.items():
+            if index not in failed:
+                self._store_cached_page(document_hash, index, text)
+        return extracted
+
+    def _ocr_pages(self, path: Path, page_indices: List[int]) -> Dict[int, str]:
+        """Führt OCR für Seiten ohne Textebene parallel aus"""
+        executor = self._get_executor()
+        futures = {
+            index: executor.submit(_ocr_page, str(path), index, self.ocr_dpi)
+            for index in page_indices
+        }
+
+        texts = {}
+        for index, future in futures.items():
+            try:
+                texts[index] = future.result()
+            except Exception as e:
+                logger.warning(f"OCR für Seite {index + 1} fehlgeschlagen: {str(e)}")
+        return texts
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Erstellt den Prozess-Pool beim ersten Bedarf"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _count_pages(self, path: Path) -> int:
+        """Ermittelt die Seitenanzahl"""
+        import PyPDF2
+
+        with open(path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+
+    def _hash_file(self, path: Path) -> str:
+        """Berechnet den SHA-256-Hash des Dokuments"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _page_cache_dir(self, document_hash: str) -> Path:
+        return self.cache_folder / document_hash[:2] / document_hash
+
+    def _load_cached_pages(self, document_hash: str, page_count: int) -> Dict[int, str]:
+        """Lädt alle bereits gecachten Seiten eines Dokuments"""
+        cache_dir = self._page_cache_dir(document_hash)
+        pages = {}
+        if not cache_dir.exists():
+            return pages
+
+        for index in range(page_count):
+            cache_file = cache_dir / f"{index}.txt"
+            try:
+                pages[index] = cache_file.read_text(encoding='utf-8')
+            except FileNotFoundError:
+                continue
+        return pages
+
+    def _store_cached_page(self, document_hash: str, page_index: int, text: str):
+        """Speichert den Text einer Seite atomar im Cache"""
+        cache_dir = self._page_cache_dir(document_hash)
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_dir / f".{page_index}.{os.getpid()}.tmp"
+            tmp_file.write_text(text, encoding='utf-8')
+            os.replace(tmp_file, cache_dir / f"{page_index}.txt")
+        except OSError as e:
+            logger.warning(f"Seiten-Cache konnte nicht geschrieben werden: {str(e)}")
+
+    def shutdown(self):
+        """Beendet den Prozess-Pool"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
@@ -0,0 +1,236 @@
+"""
+Pipeline - Verarbeitungsstufen mit begrenzten Warteschlangen
+
+Jede Stufe (z.B. OCR → LLM → LaTeX) hat eigene Worker-Threads und liest aus
+einer begrenzten Queue. Ist eine Queue voll, blockiert die vorherige Stufe
+(Backpressure); alle Stufen arbeiten gleichzeitig an verschiedenen Elementen,
+sodass der Durchsatz nur von der langsamsten Stufe begrenzt wird.
+
+Der BulkWriter sammelt Ergebnisse und schreibt sie gebündelt (z.B. eine
+Datenbank-Transaktion pro N Ergebnisse statt pro Element).
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_END = object()  # Markiert das Ende des Eingabestroms
+
+
+class Stage:
+    """Eine Verarbeitungsstufe: func(item) -> item für die nächste Stufe"""
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.in_progress = 0
+        self._active_workers = 0
+        self._lock = threading.Lock()
+
+    def begin(self):
+        with self._lock:
+            self.in_progress += 1
+
+    def record(self, seconds: float, failed: bool):
+        with self._lock:
+            self.in_progress -= 1
+            self.busy_seconds += seconds
+            if failed:
+                self.failed += 1
+            else:
+                self.processed += 1
+
+
+class Pipeline:
+    """Verbindet Stufen über begrenzte Queues und verarbeitet Elemente nebenläufig"""
+
+    def __init__(self, stages: List[Stage], on_result: Callable[[Any], None],
+                 on_error: Optional[Callable[[Any, str, Exception], None]] = None,
+                 queue_size: Optional[int] = None, cancel_event: Optional[threading.Event] = None,
+                 name: str = 'pipeline'):
+        """
+        Args:
+            stages: Stufen in Verarbeitungsreihenfolge
+            on_result: Wird mit jedem Element aufgerufen, das alle Stufen durchlaufen hat
+            on_error: Wird mit (Element, Stufenname, Exception) aufgerufen; das Element
+                wird danach nicht weitergereicht
+            queue_size: Kapazität jeder Queue (Standard: PIPELINE_QUEUE_SIZE bzw.
+                doppelte Worker-Zahl der lesenden Stufe)
+            cancel_event: Ist es gesetzt, werden keine neuen Elemente mehr verarbeitet
+            name: Präfix der Thread-Namen
+        """
+        self.stages = stages
+        self.on_result = on_result
+        self.on_error = on_error
+        self.cancel_event = cancel_event or threading.Event()
+        self.name = name
+
+        default_size = queue_size or int(os.environ.get('PIPELINE_QUEUE_SIZE', 0))
+        self.queues = [queue.Queue(maxsize=default_size or 2 * stage.workers) for stage in stages]
+
+        self._threads: List[threading.Thread] = []
+        self._started_at: Optional[float] = None
+        self._submit_lock = threading.Lock()
+        self.submitted = 0
+
+    def start(self):
+        """Startet die Worker-Threads aller Stufen"""
+        self._started_at = time.monotonic()
+        for index, stage in enumerate(self.stages):
+            stage._active_workers = stage.workers
+            for number in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._work, args=(index,),
+                    name=f'{self.name}-{stage.name}-{number}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def submit(self, item: Any, timeout: Optional[float] = None):
+        """
+        Reicht ein Element ein (blockiert, solange die erste Queue voll ist)
+
+        Raises:
+            queue.Full: Nach timeout Sekunden noch kein Platz in der ersten Queue
+        """
+        self.queues[0].put(item, timeout=timeout)
+        with self._submit_lock:
+            self.submitted += 1
+
+    def close(self):
+        """Beendet die Eingabe; die Stufen arbeiten ihre Queues noch ab"""
+        for _ in range(self.stages[0].workers):
+            self.queues[0].put(_END)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def run(self, items: Iterable[Any]):
+        """Verarbeitet alle Elemente und kehrt zurück, wenn die Pipeline leer ist"""
+        self.start()
+        try:
+            for item in items:
+                if self.cancel_event.is_set():
+                    break
+                self.submit(item)
+        finally:
+            self.close()
+            self.join()
+
+    def _work(self, index: int):
+        stage = self.stages[index]
+        inbox = self.queues[index]
+        outbox = self.queues[index + 1] if index + 1 < len(self.queues) else None
+
+        while True:
+            item = inbox.get()
+            if item is _END:
+                break
+            if self.cancel_event.is_set():
+                continue  # Queue leeren, damit vorherige Stufen nicht blockieren
+
+            stage.begin()
+            start = time.monotonic()
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                stage.record(time.monotonic() - start, failed=True)
+                logger.error(f"{self.name}: Stufe '{stage.name}' fehlgeschlagen: {str(e)}")
+                if self.on_error is not None:
+                    self.on_error(item, stage.name, e)
+                continue
+            stage.record(time.monotonic() - start, failed=False)
+
+            if outbox is not None:
+                outbox.put(result)
+            else:
+                self.on_result(result)
+
+        # Der letzte Worker einer Stufe beendet die nächste Stufe
+        with stage._lock:
+            stage._active_workers -= 1
+            last = stage._active_workers == 0
+        if last and outbox is not None:
+            for _ in range(self.stages[index + 1].workers):
+                outbox.put(_END)
+
+    def stats(self) -> Dict:
+        """Durchsatz, Auslastung und Queue-Tiefe pro Stufe"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        stages = []
+        for stage, inbox in zip(self.stages, self.queues):
+            with stage._lock:
+                processed, failed, busy = stage.processed, stage.failed, stage.busy_seconds
+                in_progress = stage.in_progress
+            finished = processed + failed
+            stages.append({
+                'name': stage.name,
+                'workers': stage.workers,
+                'in_progress': in_progress,
+                'queue_depth': inbox.qsize(),
+                'queue_capacity': inbox.maxsize,
+                'processed': processed,
+                'failed': failed,
+                'avg_seconds': round(busy / finished, 3) if finished else None,
+                'per_minute': round(processed * 60 / elapsed, 2) if elapsed else 0.0,
+                'utilization': round(busy / (elapsed * stage.workers), 3) if elapsed else 0.0
+            })
+        return {'submitted': self.submitted, 'elapsed_seconds': round(elapsed, 1), 'stages': stages}
+
+
+class BulkWriter:
+    """Sammelt Datensätze in einem eigenen Thread und übergibt sie gebündelt an flush()"""
+
+    def __init__(self, flush: Callable[[List[Any]], None], max_batch: int = None,
+                 max_interval: float = None, name: str = 'bulk-writer'):
+        self.flush = flush
+        self.max_batch = max_batch or int(os.environ.get('BULK_WRITE_SIZE', 50))
+        self.max_interval = max_interval or float(os.environ.get('BULK_WRITE_INTERVAL', 2.0))
+
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def add(self, record: Any):
+        self._queue.put(record)
+
+    def close(self):
+        """Schreibt die restlichen Datensätze und beendet den Thread"""
+        self._queue.put(_END)
+        self._thread.join()
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.max_interval
+        finished = False
+
+        while not finished:
+            try:
+                record = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if record is _END:
+                    finished = True
+                else:
+                    batch.append(record)
+            except queue.Empty:
+                pass
+
+            if finished or len(batch) >= self.max_batch or time.monotonic() >= deadline:
+                # Auch leere Batches: flush() dient als Lebenszeichen (z.B. Heartbeat)
+                try:
+                    self.flush(batch)
+                except Exception as e:
+                    logger.error(f"Gebündeltes Schreiben von {len(batch)} Datensätzen fehlgeschlagen: {str(e)}")
+                batch = []
+                deadline = time.monotonic() + self.max_interval
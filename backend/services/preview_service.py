@@ -0,0 +1,226 @@
+"""
+Preview Service - Schnelle, abbrechbare PDF/PNG-Vorschau von Protokoll-Entwürfen
+"""
+
+import os
+import time
+import itertools
+import shutil
+import tempfile
+import threading
+import subprocess
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from .latex_service import section_hash
+
+logger = logging.getLogger(__name__)
+
+class PreviewService:
+    """
+    Rendert Entwürfe mit einem einzigen pdflatex-Lauf in ein Scratch-Verzeichnis
+
+    Pro Entwurf ist höchstens ein Build aktiv: eine neue Anfrage für denselben
+    Entwurf bricht den laufenden pdflatex-Prozess ab. Ergebnisse werden über
+    die Hashes der Abschnitte zwischengespeichert.
+    """
+
+    FORMATS = ('pdf', 'png')
+
+    def __init__(self, latex_service, scratch_folder: str):
+        self.latex_service = latex_service
+        self.scratch_folder = Path(scratch_folder).resolve()
+        self.scratch_folder.mkdir(parents=True, exist_ok=True)
+
+        self.debounce_seconds = int(os.environ.get('PREVIEW_DEBOUNCE_MS', 300)) / 1000
+        self.timeout = int(os.environ.get('PREVIEW_TIMEOUT', 20))
+        self.cache_size = int(os.environ.get('PREVIEW_CACHE_SIZE', 50))
+        self.png_dpi = int(os.environ.get('PREVIEW_PNG_DPI', 80))
+
+        self._lock = threading.Lock()
+        # Global fortlaufend, damit ein entfernter Eintrag keine Nummer doppelt vergibt
+        self._generation_counter = itertools.count(1)
+        # Nur Entwürfe mit laufender Anfrage; abgeschlossene werden entfernt
+        self._generations: Dict[str, int] = {}
+        self._processes: Dict[str, subprocess.Popen] = {}
+        # Cache-Schlüssel laufender Anfragen (deren Dateien bleiben beim Aufräumen stehen)
+        self._in_flight: Dict[str, int] = {}
+
+    def render(self, draft_key: str, title: str, sections: Dict[str, str],
+               output_format: str = 'pdf', page: int = 1) -> Dict:
+        """
+        Rendert die Vorschau eines Entwurfs
+
+        Args:
+            draft_key: Kennung des Entwurfs (z.B. Protokoll-ID oder Titel)
+            title: Titel des Protokolls
+            sections: Abschnitts-Schlüssel -> Inhalt
+            output_format: 'pdf' oder 'png'
+            page: Seite für die PNG-Vorschau (1-basiert)
+
+        Returns:
+            Dict mit 'success', 'path' und 'cached' bzw. 'cancelled' oder 'error'
+        """
+        if output_format not in self.FORMATS:
+            return {'success': False, 'error': f"Unbekanntes Vorschau-Format: {output_format}"}
+
+        sections = self.latex_service.normalize_sections(sections)
+        preview_key = self._preview_key(title, sections)
+        pdf_path = self.scratch_folder / f"{preview_key}.pdf"
+        output_path = pdf_path if output_format == 'pdf' else self.scratch_folder / f"{preview_key}_{page}.png"
+
+        try:
+            os.utime(output_path)
+            return {'success': True, 'path': output_path, 'cached': True}
+        except FileNotFoundError:
+            pass
+
+        # Neuere Anfrage übernimmt den Entwurf, laufender Build wird abgebrochen
+        generation = self._supersede(draft_key)
+        self._acquire(preview_key)
+        try:
+            # Entprellen: beim Tippen kommt die nächste Anfrage meist sofort hinterher
+            time.sleep(self.debounce_seconds)
+            if self._is_superseded(draft_key, generation):
+                return {'success': False, 'cancelled': True}
+
+            if not pdf_path.exists():
+                result = self._compile(draft_key, generation, title, sections, pdf_path)
+                if result is not None:
+                    return result
+
+            if output_format == 'png':
+                if not self._render_png(pdf_path, page, output_path):
+                    return {'success': False, 'error': 'PNG-Vorschau fehlgeschlagen'}
+
+            self._prune_cache()
+            return {'success': True, 'path': output_path, 'cached': False}
+        finally:
+            self._finish(draft_key, generation)
+            self._release(preview_key)
+
+    def _preview_key(self, title: str, sections: Dict[str, str]) -> str:
+        """Cache-Schlüssel aus Titel und den Hashes aller Abschnitte"""
+        parts = [title] + [f"{key}:{section_hash(content)}" for key, content in sorted(sections.items())]
+        return section_hash('|'.join(parts))
+
+    def _supersede(self, draft_key: str) -> int:
+        """Registriert eine neue Anfrage und beendet den laufenden Build des Entwurfs"""
+        with self._lock:
+            generation = next(self._generation_counter)
+            self._generations[draft_key] = generation
+            process = self._processes.pop(draft_key, None)
+
+        if process is not None and process.poll() is None:
+            process.kill()
+            logger.info(f"Vorschau-Build für '{draft_key}' abgebrochen")
+        return generation
+
+    def _finish(self, draft_key: str, generation: int):
+        """Entfernt den Entwurf, sofern keine neuere Anfrage ihn übernommen hat"""
+        with self._lock:
+            if self._generations.get(draft_key) == generation:
+                del self._generations[draft_key]
+
+    def _acquire(self, preview_key: str):
+        with self._lock:
+            self._in_flight[preview_key] = self._in_flight.get(preview_key, 0) + 1
+
+    def _release(self, preview_key: str):
+        with self._lock:
+            remaining = self._in_flight.pop(preview_key) - 1
+            if remaining:
+                self._in_flight[preview_key] = remaining
+
+    def _is_superseded(self, draft_key: str, generation: int) -> bool:
+        with self._lock:
+            return self._generations.get(draft_key) != generation
+
+    def _compile(self, draft_key: str, generation: int, title: str,
+                 sections: Dict[str, str], pdf_path: Path) -> Optional[Dict]:
+        """Ein pdflatex-Lauf ohne Seitenverweise; liefert None bei Erfolg"""
+        work_dir = Path(tempfile.mkdtemp(dir=self.scratch_folder, prefix='.build_'))
+        try:
+            doc = self.latex_service._create_latex_document_from_sections(
+                sections, title, 'CTA-Azubi', page_numbers=False
+            )
+            doc.generate_tex(str(work_dir / 'preview'))
+
+            process = subprocess.Popen([
+                'pdflatex',
+                '-interaction=batchmode',
+                '-halt-on-error',
+                'preview.tex'
+            ], cwd=work_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+            with self._lock:
+                superseded = self._generations.get(draft_key) != generation
+                if not superseded:
+                    self._processes[draft_key] = process
+            if superseded:
+                process.kill()
+
+            try:
+                process.wait(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+                logger.error(f"Vorschau-Build Timeout ({self.timeout}s)")
+                return {'success': False, 'error': 'Vorschau-Build Timeout'}
+            finally:
+                with self._lock:
+                    if self._processes.get(draft_key) is process:
+                        del self._processes[draft_key]
+
+            if self._is_superseded(draft_key, generation):
+                return {'success': False, 'cancelled': True}
+
+            built_pdf = work_dir / 'preview.pdf'
+            if not built_pdf.exists():
+                return {'success': False, 'error': 'Vorschau-Build fehlgeschlagen'}
+
+            os.replace(built_pdf, pdf_path)
+            return None
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _render_png(self, pdf_path: Path, page: int, output_path: Path) -> bool:
+        """Rastert eine Seite der Vorschau mit pdftoppm"""
+        prefix = output_path.with_suffix('')
+        try:
+            subprocess.run([
+                'pdftoppm', '-f', str(page), '-l', str(page),
+                '-r', str(self.png_dpi), '-png', '-singlefile',
+                str(pdf_path), str(prefix)
+            ], check=True, capture_output=True, timeout=self.timeout)
+            return output_path.exists()
+        except (subprocess.SubprocessError, OSError) as e:
+            logger.error(f"PNG-Vorschau fehlgeschlagen: {str(e)}")
+            return False
+
+    def _prune_cache(self):
+        """Hält nur die zuletzt verwendeten Vorschauen im Scratch-Verzeichnis"""
+        with self._lock:
+            in_flight: Set[str] = set(self._in_flight)
+
+        files = []
+        for path in self.scratch_folder.iterdir():
+            # Dateien laufender Anfragen nicht löschen: '<key>.pdf' bzw. '<key>_<seite>.png'
+            if path.stem.split('_', 1)[0] in in_flight:
+                continue
+            try:
+                if path.is_file():
+                    files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                # Parallel von einer anderen Anfrage entfernt
+                continue
+
+        files.sort(reverse=True)
+        for _, path in files[self.cache_size:]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Vorschau konnte nicht gelöscht werden: {path.name} ({str(e)})")
@@ -0,0 +1,122 @@
+"""
+Section Prompts - Prompts für die abschnittsweise Protokoll-Generierung
+
+Gemeinsam genutzt von /generate-section und der spekulativen Vorab-Generierung
+beim Speichern eines Entwurfs; beide müssen für gleiche Eingaben exakt
+denselben Prompt erzeugen, damit vorab generierte Ergebnisse getroffen werden.
+"""
+
+from typing import Dict, List, Optional
+
+# Abschnitts-Schlüssel des Frontends in Protokoll-Reihenfolge
+SECTION_KEYS = [
+    'zielsetzung', 'theorie', 'material', 'durchfuehrung',
+    'ergebnisse', 'berechnungen', 'diskussion', 'schlussfolgerung'
+]
+
+# Spezifische Prompts für jeden Abschnitt
+SECTION_PROMPTS = {
+    'zielsetzung': """
+Erstelle eine präzise Zielsetzung für dieses Laborexperiment.
+Fokussiere auf: Was soll erreicht werden? Welche Fragestellung wird beantwortet?
+Verwende deutsche Sprache und wissenschaftlichen Stil.
+""",
+    'theorie': """
+Erkläre die relevanten theoretischen Grundlagen für dieses Experiment.
+Erwähne wichtige Reaktionsgleichungen, Gesetze oder Prinzipien.
+Halte es prägnant aber vollständig.
+""",
+    'material': """
+Liste alle benötigten Materialien, Chemikalien und Geräte auf.
+Verwende Aufzählungsformat mit korrekten Konzentrationen und Mengen.
+Berücksichtige Sicherheitsaspekte.
+""",
+    'durchfuehrung': """
+Beschreibe die experimentelle Durchführung in logischen Schritten.
+Verwende nummerierte Liste. Sei präzise bei Mengenangaben und Zeiten.
+Erwähne wichtige Beobachtungspunkte.
+""",
+    'ergebnisse': """
+Präsentiere die Messwerte und Beobachtungen systematisch.
+Verwende Tabellen oder Listen für Messdaten.
+Beschreibe qualitative Beobachtungen (Farbe, Temperatur, etc.).
+""",
+    'berechnungen': """
+Zeige alle relevanten Berechnungen mit Formeln und Zahlenwerten.
+Erkläre jeden Rechenschritt. Verwende korrekte Einheiten.
+Berechne Fehler oder Unsicherheiten falls möglich.
+""",
+    'diskussion': """
+Bewerte die Ergebnisse kritisch. Diskutiere Abweichungen, Fehlerquellen.
+Vergleiche mit Literaturwerten falls vorhanden.
+Erwähne Verbesserungsmöglichkeiten.
+""",
+    'schlussfolgerung': """
+Fasse die wichtigsten Erkenntnisse zusammen.
+Beantworte die ursprüngliche Fragestellung.
+Gib einen kurzen Ausblick oder praktische Relevanz.
+"""
+}
+
+
+def build_section_prompt(section: str, title: str, description: str = '',
+                         existing_sections: Optional[Dict[str, str]] = None,
+                         uploaded_files: Optional[List[Dict]] = None) -> str:
+    """
+    Erstellt den LLM-Prompt für einen Abschnitt
+
+    Args:
+        section: Abschnitts-Schlüssel (z.B. 'theorie')
+        title: Protokoll-Titel
+        description: Beschreibung des Versuchs
+        existing_sections: Bereits vorhandene Abschnitte (Schlüssel -> Inhalt)
+        uploaded_files: Hochgeladene Dateien mit 'name' und 'extracted_text'
+
+    Returns:
+        Vollständiger Prompt
+    """
+    # Kontext aus anderen Abschnitten
+    context_text = f"Titel: {title}\nBeschreibung: {description}\n\n"
+
+    if existing_sections:
+        context_text += "Bereits vorhandene Abschnitte:\n"
+        for key, content in existing_sections.items():
+            if content and key != section:
+                context_text += f"{key}: {content[:200]}...\n"
+
+    # Upload-Dateien als Kontext
+    if uploaded_files:
+        context_text += "\nVerfügbare Daten aus hochgeladenen Dateien:\n"
+        for file in uploaded_files:
+            if file.get('extracted_text'):
+                context_text += f"- {file['name']}: {file['extracted_text'][:300]}...\n"
+
+    return f"""
+{SECTION_PROMPTS.get(section, 'Erstelle Inhalt für diesen Abschnitt.')}
+
+KONTEXT:
+{context_text}
+
+AUFGABE: Erstelle den Abschnitt '{section}' für dieses Laborprotokoll.
+Verwende nur Informationen aus dem gegebenen Kontext oder allgemein bekannte wissenschaftliche Fakten.
+Erfinde KEINE spezifischen Messwerte oder Details die nicht gegeben sind.
+Antworte nur mit dem Inhalt des Abschnitts, ohne zusätzliche Erklärungen.
+"""
+
+
+def section_request(section: str, title: str, prompt: str):
+    """Dateien und Metadaten, mit denen ein Abschnitt über generate_protocol_content generiert wird"""
+    return [{'name': 'context', 'content': prompt}], {'title': title, 'section': section}
+
+
+def likely_next_sections(sections: Dict[str, str], limit: int) -> List[str]:
+    """
+    Leere Abschnitte, die der Nutzer wahrscheinlich als nächstes generiert
+
+    Zuerst die leeren Abschnitte nach dem letzten ausgefüllten, danach
+    übersprungene Lücken davor.
+    """
+    filled = [i for i, key in enumerate(SECTION_KEYS) if (sections.get(key) or '').strip()]
+    start = filled[-1] + 1 if filled else 0
+    ordered = SECTION_KEYS[start:] + SECTION_KEYS[:start]
+    return [key for key in ordered if not (sections.get(key) or '').strip()][:limit]
@@ -0,0 +1,91 @@
+"""
+Single Flight - Zusammenfassen identischer, gleichzeitig laufender Aufrufe
+
+Generiert z.B. eine ganze Klasse gleichzeitig denselben Versuch, kommen
+identische Prompts fast zeitgleich an. Der erste Aufruf startet die Arbeit,
+alle weiteren mit demselben Schlüssel hängen sich an und erhalten dasselbe
+Ergebnis (bzw. dieselbe Exception). Bricht ein Wartender ab (Timeout,
+Client getrennt), läuft die Arbeit für die übrigen weiter; erst wenn niemand
+mehr wartet, wird sie abgebrochen. Über context/on_join erfahren später
+Hinzukommende vom laufenden Aufruf (z.B. um dessen Priorität anzuheben).
+
+Nur innerhalb einer Event-Loop verwenden (nicht threadsicher).
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+def request_key(*parts: Any) -> str:
+    """Stabiler Hash über JSON-serialisierbare Teile (z.B. Modell, Prompt, Optionen)"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task, context: Any = None):
+        self.task = task
+        self.context = context
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Führt pro Schlüssel höchstens einen Aufruf gleichzeitig aus"""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]], context: Any = None,
+                 on_join: Optional[Callable[[Any], None]] = None) -> Any:
+        """
+        Führt factory() aus oder wartet auf einen laufenden Aufruf mit gleichem Schlüssel
+
+        Args:
+            key: Schlüssel identischer Aufrufe (siehe request_key)
+            factory: Erzeugt die Coroutine, falls noch kein Aufruf läuft
+            context: Wird beim Start am Aufruf gespeichert
+            on_join: Wird beim Anhängen an einen laufenden Aufruf mit dessen context aufgerufen
+
+        Returns:
+            Ergebnis des (gemeinsamen) Aufrufs
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(factory()), context)
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._forget(key, call))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            if on_join is not None:
+                on_join(call.context)
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Exception abrufen, falls alle Wartenden vorher abgebrochen haben
+        if not call.task.cancelled():
+            call.task.exception()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'in_flight': self.in_flight,
+            'started': self.started,
+            'coalesced': self.coalesced
+        }
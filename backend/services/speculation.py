@@ -0,0 +1,164 @@
+"""
+Speculation - Cache für vorab generierte LLM-Ergebnisse
+
+Nach dem Speichern eines Entwurfs generiert der AsyncLLMService die
+wahrscheinlich nächsten leeren Abschnitte im Voraus (nur bei freier
+Kapazität, niedrigste Priorität). Die Ergebnisse liegen hier unter demselben
+Schlüssel wie die spätere Anfrage (Hash aus Modell, Prompt, Optionen):
+
+- ein Treffer wird genau einmal ausgeliefert (erneutes Generieren fragt das LLM)
+- läuft die Vorab-Generierung noch, hängt sich die Anfrage an (SingleFlight)
+- ändern sich die Eingaben eines Entwurfs, werden dessen alte Ergebnisse
+  verworfen und laufende Vorab-Generierungen abgebrochen
+
+Fertige Ergebnisse liegen in einer SQLite-Datei (db_path), die sich alle
+Worker-Prozesse teilen: Entwurf speichern und späterer Klick landen bei
+gunicorn mit mehreren Workern meist in verschiedenen Prozessen. Laufende
+Vorab-Generierungen kennt nur der eigene Prozess; ohne db_path bleibt der
+Cache prozesslokal (SQLite im Speicher).
+
+Nur innerhalb der Event-Loop des Services verwenden (nicht threadsicher).
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+
+class SpeculativeCache:
+    """Vorab generierte Ergebnisse pro Entwurf mit Treffer-Statistik"""
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = None, ttl: float = None):
+        self.max_entries = max_entries or int(os.environ.get('SPECULATIVE_CACHE_SIZE', 200))
+        self.ttl = ttl or float(os.environ.get('SPECULATIVE_CACHE_TTL', 1800))
+
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        # Wird im Konstruktor-Thread erstellt, danach nur noch von der Event-Loop benutzt
+        self._connection = sqlite3.connect(str(db_path or ':memory:'), timeout=5, check_same_thread=False)
+        if db_path:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS speculation (
+                key TEXT PRIMARY KEY,
+                tag TEXT NOT NULL,
+                text TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS speculation_tag ON speculation (tag)')
+        self._connection.commit()
+
+        self._in_flight: Dict[str, tuple] = {}  # key -> (Tag, asyncio.Task)
+        self._consumed: Set[str] = set()  # Laufende Vorab-Generierungen, auf die schon eine Anfrage wartet
+
+        self.counters = {
+            'lookups': 0,
+            'hits': 0,
+            'hits_in_flight': 0,
+            'started': 0,
+            'completed': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'skipped_busy': 0,
+            'skipped_known': 0,
+            'discarded': 0
+        }
+
+    def count(self, counter: str, amount: int = 1):
+        self.counters[counter] += amount
+
+    def take(self, key: str) -> Optional[str]:
+        """
+        Liefert ein vorab generiertes Ergebnis (einmalig) oder None
+
+        Läuft die Vorab-Generierung noch, zählt das als Treffer; der Aufrufer
+        wartet dann über SingleFlight auf dasselbe Ergebnis.
+        """
+        self._prune()
+        self.counters['lookups'] += 1
+
+        row = self._connection.execute('SELECT text FROM speculation WHERE key = ?', (key,)).fetchone()
+        if row is not None:
+            # Nur der Prozess, dessen DELETE die Zeile entfernt, liefert sie aus
+            deleted = self._connection.execute('DELETE FROM speculation WHERE key = ?', (key,)).rowcount
+            self._connection.commit()
+            if deleted:
+                self.counters['hits'] += 1
+                return row[0]
+
+        if key in self._in_flight:
+            self.counters['hits_in_flight'] += 1
+            self._consumed.add(key)
+        return None
+
+    def is_known(self, key: str) -> bool:
+        if key in self._in_flight:
+            return True
+        return self._connection.execute('SELECT 1 FROM speculation WHERE key = ?', (key,)).fetchone() is not None
+
+    def track(self, tag: str, key: str, task: asyncio.Task):
+        self._in_flight[key] = (tag, task)
+        self.counters['started'] += 1
+
+    def finish(self, key: str, text: Optional[str]):
+        """Vorab-Generierung beendet: Ergebnis ablegen, sofern es nicht schon abgeholt wurde"""
+        entry = self._in_flight.pop(key, None)
+        consumed = key in self._consumed
+        self._consumed.discard(key)
+        if entry is None or text is None or consumed:
+            return
+
+        self._connection.execute(
+            'INSERT OR REPLACE INTO speculation (key, tag, text, created_at) VALUES (?, ?, ?, ?)',
+            (key, entry[0], text, time.time())
+        )
+        # Älteste Einträge über max_entries verwerfen
+        discarded = self._connection.execute('''
+            DELETE FROM speculation WHERE key IN (
+                SELECT key FROM speculation ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_entries,)).rowcount
+        self._connection.commit()
+        self.counters['discarded'] += max(discarded, 0)
+
+    def invalidate(self, tag: str, keep: Iterable[str] = ()):
+        """Verwirft Ergebnisse und laufende Vorab-Generierungen eines Entwurfs, außer 'keep'"""
+        keep = set(keep)
+        placeholders = ', '.join('?' for _ in keep)
+        condition = f' AND key NOT IN ({placeholders})' if keep else ''
+        discarded = self._connection.execute(
+            f'DELETE FROM speculation WHERE tag = ?{condition}', (tag, *keep)
+        ).rowcount
+        self._connection.commit()
+        self.counters['discarded'] += max(discarded, 0)
+        # Laufende Vorab-Generierungen anderer Prozesse laufen weiter; ihre
+        # Ergebnisse passen nicht mehr zu den Eingaben und verfallen nach der TTL
+        for key, (entry_tag, task) in list(self._in_flight.items()):
+            if entry_tag == tag and key not in keep and key not in self._consumed:
+                task.cancel()
+
+    def _prune(self):
+        discarded = self._connection.execute(
+            'DELETE FROM speculation WHERE created_at < ?', (time.time() - self.ttl,)
+        ).rowcount
+        self._connection.commit()
+        self.counters['discarded'] += max(discarded, 0)
+
+    def stats(self) -> Dict:
+        counters = dict(self.counters)
+        lookups = counters['lookups']
+        hits = counters['hits'] + counters['hits_in_flight']
+        finished = counters['completed']
+        cached = self._connection.execute('SELECT COUNT(*) FROM speculation').fetchone()[0]
+        return dict(
+            counters,
+            cached=cached,
+            in_flight=len(self._in_flight),
+            hit_rate=round(hits / lookups, 3) if lookups else None,
+            # Anteil der fertigen Vorab-Generierungen, die tatsächlich abgerufen wurden
+            used_rate=round(min(1.0, hits / finished), 3) if finished else None
+        )
@@ -0,0 +1,192 @@
+"""
+Storage - Austauschbares Speicher-Backend für Uploads und generierte Artefakte
+
+Schlüssel sind relative Pfade wie 'generated/ab/cd/protocol_1.pdf'. Das lokale
+Backend bildet sie auf das Dateisystem ab; das S3-Backend speichert sie in
+einem Bucket (AWS, MinIO oder moto über S3_ENDPOINT_URL), damit mehrere
+Backend-Replikate dieselben Dateien sehen. Downloads können per
+vorsignierter URL direkt vom Objektspeicher ausgeliefert werden.
+"""
+
+import os
+import shutil
+import logging
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.exceptions import ClientError
+except ImportError:  # optionale Abhängigkeit (nur für STORAGE_BACKEND=s3)
+    boto3 = None
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def storage_key(path: Union[str, Path]) -> str:
+    """Schlüssel einer Datei: Pfad relativ zum Arbeitsverzeichnis der App"""
+    return Path(os.path.relpath(Path(path).resolve(), Path.cwd())).as_posix()
+
+
+class LocalStorage:
+    """Speicher im lokalen Dateisystem (Standard, ein Replikat)"""
+
+    name = 'local'
+
+    def __init__(self, root: Union[str, Path] = '.'):
+        self.root = Path(root).resolve()
+
+    def local_path(self, key: str) -> Path:
+        """Pfad der Datei im Dateisystem"""
+        return self.root / key
+
+    def exists(self, key: str) -> bool:
+        return self.local_path(key).is_file()
+
+    def stat(self, key: str) -> Optional[Dict]:
+        try:
+            stat = self.local_path(key).stat()
+        except OSError:
+            return None
+        return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def open_read(self, key: str) -> BinaryIO:
+        """Öffnet die Datei zum blockweisen Lesen"""
+        return open(self.local_path(key), 'rb')
+
+    def download(self, key: str, file_path: Union[str, Path]):
+        """Kopiert die Datei an einen lokalen Pfad (z.B. für Kommandozeilen-Tools)"""
+        if Path(file_path).resolve() != self.local_path(key):
+            shutil.copyfile(self.local_path(key), file_path)
+
+    def write_stream(self, key: str, stream: BinaryIO, content_type: Optional[str] = None):
+        """Schreibt einen Datenstrom blockweise und atomar"""
+        path = self.local_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as file:
+            shutil.copyfileobj(stream, file, COPY_CHUNK_SIZE)
+        os.replace(tmp_path, path)
+
+    def save_file(self, key: str, file_path: Union[str, Path], content_type: Optional[str] = None):
+        """Übernimmt eine lokale Datei (kein Kopieren, wenn sie bereits am Ziel liegt)"""
+        if Path(file_path).resolve() == self.local_path(key):
+            return
+        with open(file_path, 'rb') as stream:
+            self.write_stream(key, stream, content_type)
+
+    def delete(self, key: str):
+        try:
+            self.local_path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def presigned_url(self, key: str, download_name: Optional[str] = None) -> Optional[str]:
+        """Lokale Dateien werden von Flask ausgeliefert"""
+        return None
+
+
+class S3Storage:
+    """Speicher in einem S3-kompatiblen Bucket (AWS S3, MinIO, moto)"""
+
+    name = 's3'
+
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: Optional[str] = None,
+                 region_name: Optional[str] = None, presign_expires: int = 300,
+                 multipart_threshold: int = 8 * 1024 * 1024, multipart_chunksize: int = 8 * 1024 * 1024):
+        if boto3 is None:
+            raise RuntimeError("boto3 ist nicht installiert")
+
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.presign_expires = presign_expires
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region_name)
+
+        # Große Dateien werden automatisch als Multipart-Upload in Teilen übertragen
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize
+        )
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return None
+
+    def exists(self, key: str) -> bool:
+        return self.stat(key) is not None
+
+    def stat(self, key: str) -> Optional[Dict]:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return {'size': head['ContentLength'], 'mtime': head['LastModified'].timestamp(), 'etag': head.get('ETag')}
+
+    def open_read(self, key: str) -> BinaryIO:
+        """Liefert den Objekt-Body als Datenstrom (wird nicht vollständig geladen)"""
+        return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))['Body']
+
+    def download(self, key: str, file_path: Union[str, Path]):
+        """Lädt das Objekt in eine lokale Datei (große Objekte in Teilen)"""
+        self.client.download_file(
+            self.bucket, self._object_key(key), str(file_path), Config=self.transfer_config
+        )
+
+    def write_stream(self, key: str, stream: BinaryIO, content_type: Optional[str] = None):
+        extra_args = {'ContentType': content_type} if content_type else None
+        self.client.upload_fileobj(
+            stream, self.bucket, self._object_key(key),
+            ExtraArgs=extra_args, Config=self.transfer_config
+        )
+
+    def save_file(self, key: str, file_path: Union[str, Path], content_type: Optional[str] = None):
+        extra_args = {'ContentType': content_type} if content_type else None
+        self.client.upload_file(
+            str(file_path), self.bucket, self._object_key(key),
+            ExtraArgs=extra_args, Config=self.transfer_config
+        )
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def presigned_url(self, key: str, download_name: Optional[str] = None) -> Optional[str]:
+        """Vorsignierte GET-URL, der Download läuft am Flask-Worker vorbei"""
+        params = {'Bucket': self.bucket, 'Key': self._object_key(key)}
+        if download_name:
+            params['ResponseContentDisposition'] = f'attachment; filename="{download_name}"'
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=self.presign_expires)
+
+
+def create_storage(backend: Optional[str] = None, root: Union[str, Path] = '.'):
+    """
+    Erstellt das konfigurierte Speicher-Backend
+
+    Args:
+        backend: 'local' oder 's3' (Standard: STORAGE_BACKEND)
+        root: Basisordner für lokale Schlüssel
+
+    Returns:
+        LocalStorage oder S3Storage
+    """
+    backend = (backend or os.environ.get('STORAGE_BACKEND', 'local')).lower()
+
+    if backend == 's3':
+        storage = S3Storage(
+            bucket=os.environ['S3_BUCKET'],
+            prefix=os.environ.get('S3_PREFIX', ''),
+            endpoint_url=os.environ.get('S3_ENDPOINT_URL') or None,
+            region_name=os.environ.get('S3_REGION') or None,
+            presign_expires=int(os.environ.get('S3_PRESIGN_EXPIRES', 300))
+        )
+        logger.info(f"Speicher-Backend: S3 (Bucket {storage.bucket})")
+        return storage
+
+    logger.info("Speicher-Backend: lokales Dateisystem")
+    return LocalStorage(root)
@@ -0,0 +1,167 @@
+"""
+Storage Layout - Hash-Präfix-Sharding und Alters-Index für große Dateibestände
+
+Dateien werden nicht flach in einem Ordner abgelegt, sondern unter
+<root>/<h[0:2]>/<h[2:4]>/<name> mit h = SHA-256 des Schlüssels. So bleiben
+Verzeichnisse auch bei Hunderttausenden Dateien klein. Der Alters-Index
+ersetzt rekursive Verzeichnis-Scans beim Aufräumen.
+"""
+
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+
+def shard_dir(root: Union[str, Path], key: str) -> Path:
+    """
+    Shard-Verzeichnis für einen Schlüssel (z.B. Dateiname oder 'protocol_42')
+
+    Args:
+        root: Basisordner
+        key: Stabiler Schlüssel der Datei
+
+    Returns:
+        Pfad <root>/<h[0:2]>/<h[2:4]>
+    """
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    parts = [digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_LEVELS)]
+    return Path(root).joinpath(*parts)
+
+
+def shard_path(root: Union[str, Path], name: str) -> Path:
+    """Pfad einer Datei im Shard ihres eigenen Namens"""
+    return shard_dir(root, name) / name
+
+
+def _unlink_local(path: Path):
+    path.unlink(missing_ok=True)
+
+
+class AgeIndex:
+    """
+    Index der Erstellungszeitpunkte von Dateien in einer SQLite-Datei
+
+    Pfade werden relativ zu root gespeichert (Standard: der Ordner, der das
+    .index-Verzeichnis enthält), egal ob sie absolut oder relativ zum
+    Arbeitsverzeichnis übergeben werden. So ergeben Laufzeit und
+    Migrations-Tool dieselben Schlüssel. Abgelaufene Dateien löscht 'delete'
+    (Standard: nur lokal), z.B. auch aus dem Speicher-Backend.
+    """
+
+    SCHEMA_VERSION = 1
+
+    def __init__(self, db_path: Union[str, Path], root: Optional[Union[str, Path]] = None,
+                 delete: Optional[Callable[[Path], None]] = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.root = Path(root).resolve() if root else self.db_path.parent.parent.resolve()
+        self._delete = delete or _unlink_local
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                created_at REAL NOT NULL
+            )
+        ''')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS files_created_at ON files (created_at)')
+        self._connection.commit()
+        self._normalize_legacy_rows()
+
+    def _key(self, path: Union[str, Path]) -> str:
+        """Schlüssel einer Datei: Pfad relativ zu root (außerhalb von root absolut)"""
+        path = Path(path).resolve()
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:
+            return str(path)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def _normalize_legacy_rows(self):
+        """Einmalig: absolute bzw. auf das Arbeitsverzeichnis bezogene Pfade umschreiben"""
+        with self._lock:
+            if self._connection.execute('PRAGMA user_version').fetchone()[0] >= self.SCHEMA_VERSION:
+                return
+            rows = self._connection.execute('SELECT path, created_at FROM files').fetchall()
+            normalized = {}
+            for path, created_at in rows:
+                key = self._key(path)
+                # Doppelte Einträge (Laufzeit und Migration): der jüngste Zeitpunkt gilt
+                normalized[key] = max(created_at, normalized.get(key, created_at))
+            self._connection.execute('DELETE FROM files')
+            self._connection.executemany('INSERT INTO files (path, created_at) VALUES (?, ?)', normalized.items())
+            self._connection.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+            self._connection.commit()
+        if rows:
+            logger.info(f"Alters-Index {self.db_path.name}: {len(rows)} Einträge normalisiert "
+                        f"({len(rows) - len(normalized)} Duplikate entfernt)")
+
+    def add(self, path: Union[str, Path], created_at: Optional[float] = None):
+        """Erfasst eine Datei (bzw. aktualisiert ihren Zeitpunkt)"""
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO files (path, created_at) VALUES (?, ?)',
+                (self._key(path), created_at or time.time())
+            )
+            self._connection.commit()
+
+    def remove(self, path: Union[str, Path]):
+        with self._lock:
+            self._connection.execute('DELETE FROM files WHERE path = ?', (self._key(path),))
+            self._connection.commit()
+
+    def rename(self, old_path: Union[str, Path], new_path: Union[str, Path]):
+        with self._lock:
+            self._connection.execute('UPDATE files SET path = ? WHERE path = ?',
+                                     (self._key(new_path), self._key(old_path)))
+            self._connection.commit()
+
+    def expire(self, max_age_seconds: float, batch_size: int = 1000) -> int:
+        """
+        Löscht alle Dateien, die älter als max_age_seconds sind
+
+        Es werden nur Einträge mit passendem Zeitstempel gelesen (Index auf
+        created_at), kein Verzeichnis wird durchlaufen. Eintrag und Datei
+        werden unter derselben Sperre entfernt, und nur, wenn der Eintrag noch
+        abgelaufen ist: eine zwischenzeitlich neu erfasste Datei bleibt erhalten.
+
+        Returns:
+            Anzahl der entfernten Einträge
+        """
+        cutoff = time.time() - max_age_seconds
+        deleted_count = 0
+
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    'SELECT path FROM files WHERE created_at < ? ORDER BY created_at LIMIT ?',
+                    (cutoff, batch_size)
+                ).fetchall()
+                if not rows:
+                    return deleted_count
+
+                for (key,) in rows:
+                    deleted = self._connection.execute(
+                        'DELETE FROM files WHERE path = ? AND created_at < ?', (key, cutoff)
+                    ).rowcount
+                    if not deleted:
+                        continue
+                    deleted_count += 1
+                    try:
+                        self._delete(self._path(key))
+                    except Exception as e:
+                        logger.warning(f"Datei konnte nicht gelöscht werden ({key}): {str(e)}")
+                self._connection.commit()
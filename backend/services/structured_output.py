@@ -0,0 +1,146 @@
+"""
+Structured Output - Protokoll-Abschnitte als JSON statt Freitext
+
+Statt den Freitext des LLM nachträglich anhand von Schlüsselwörtern in
+Abschnitte zu zerlegen (LaTeXService._parse_content_sections), fordert der
+LLM-Service mit Ollamas format='json' ein JSON-Objekt mit einem Schlüssel pro
+Abschnitt an. Das Schema steht im Prompt; die Antwort wird hier geprüft:
+
+- nur bekannte Abschnitte mit nicht-leerem Text zählen
+- bei abgeschnittenem oder fehlerhaftem JSON werden vollständige
+  Schlüssel-Wert-Paare trotzdem übernommen
+- fehlende Abschnitte fragt der LLM-Service gezielt einzeln nach
+"""
+
+import re
+import json
+from typing import Dict, List, Optional
+
+from .latex_service import section_hash
+from .section_prompts import SECTION_KEYS, SECTION_PROMPTS
+
+# Abschnitte eines vollständigen Protokolls (Schlüssel wie im Frontend)
+PROTOCOL_SECTIONS = SECTION_KEYS
+
+SECTION_TITLES = {
+    'zielsetzung': 'Zielsetzung',
+    'theorie': 'Theoretischer Hintergrund',
+    'material': 'Materialien und Geräte',
+    'durchfuehrung': 'Durchführung',
+    'ergebnisse': 'Ergebnisse und Beobachtungen',
+    'berechnungen': 'Berechnungen und Auswertung',
+    'diskussion': 'Diskussion',
+    'schlussfolgerung': 'Schlussfolgerung'
+}
+
+# Inhalt für Abschnitte, die auch nach allen Wiederholungen fehlen
+MISSING_SECTION = '[ZU ERGÄNZEN]'
+
+# Abweichende Schreibweisen, die Modelle für Schlüssel verwenden
+KEY_ALIASES = {'durchführung': 'durchfuehrung'}
+
+# Vollständige "schlüssel": "wert"-Paare in abgeschnittenem JSON
+_PAIR_PATTERN = re.compile(r'"([^"\\]+)"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+def section_schema(sections: List[str]) -> Dict:
+    """JSON-Schema eines Objekts mit einem Text pro Abschnitt"""
+    return {
+        'type': 'object',
+        'properties': {
+            key: {
+                'type': 'string',
+                'title': SECTION_TITLES[key],
+                'description': SECTION_PROMPTS[key].strip().split('\n')[0]
+            }
+            for key in sections
+        },
+        'required': list(sections)
+    }
+
+
+def structured_instructions(sections: List[str]) -> str:
+    """Arbeitsauftrag mit Schema für die JSON-Ausgabe der angegebenen Abschnitte"""
+    titles = ', '.join(SECTION_TITLES[key] for key in sections)
+    schema = json.dumps(section_schema(sections), ensure_ascii=False, indent=2)
+    return f"""
+Erstelle die folgenden Abschnitte des Laborprotokolls: {titles}
+
+Antworte ausschließlich mit einem JSON-Objekt nach diesem JSON-Schema.
+Jeder Schlüssel ist ein Abschnitt, der Wert ist der vollständige Text des
+Abschnitts als String (Aufzählungen und Absätze mit \\n trennen):
+{schema}
+"""
+
+
+def parse_sections(text: str, sections: List[str]) -> Dict[str, str]:
+    """
+    Liest die Abschnitte aus einer JSON-Antwort
+
+    Args:
+        text: Antwort des LLM
+        sections: Erwartete Abschnitts-Schlüssel
+
+    Returns:
+        Gefundene Abschnitte mit nicht-leerem Text (fehlende fehlen im Dict)
+    """
+    data = _load_object(text)
+    if data is None:
+        # Abgeschnittene Antwort (z.B. num_predict erreicht): vollständige Paare retten
+        data = {}
+        for key, literal in _PAIR_PATTERN.findall(text or ''):
+            try:
+                data[key] = json.loads(literal)
+            except ValueError:
+                continue
+
+    found = {}
+    for key, value in data.items():
+        key = key.strip().lower()
+        key = KEY_ALIASES.get(key, key)
+        if key not in sections:
+            continue
+        if isinstance(value, list):
+            value = '\n'.join(str(entry) for entry in value)
+        if isinstance(value, str) and value.strip():
+            found[key] = value.strip()
+    return found
+
+
+def _load_object(text: str) -> Optional[Dict]:
+    """JSON-Objekt aus der Antwort, auch mit Text oder Code-Block drumherum"""
+    if not text:
+        return None
+    candidates = [text.strip()]
+    start, end = text.find('{'), text.rfind('}')
+    if 0 <= start < end:
+        candidates.append(text[start:end + 1])
+
+    for candidate in candidates:
+        try:
+            data = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
+
+
+def sections_to_text(title: str, sections: Dict[str, str], description: str = '') -> str:
+    """Textfassung der Abschnitte für Protocol.generated_content"""
+    text = f"# {title}\n\n"
+    if description:
+        text += f"{description}\n\n"
+    for key in PROTOCOL_SECTIONS:
+        if sections.get(key):
+            text += f"## {SECTION_TITLES[key]}\n\n{sections[key]}\n\n"
+    return text
+
+
+def build_sections_content(sections: Dict[str, str]) -> Dict[str, Dict]:
+    """Abschnitte mit Inhalts-Hash für Protocol.sections_content"""
+    return {
+        key: {'content': content, 'hash': section_hash(content)}
+        for key, content in sections.items()
+        if content and content.strip()
+    }
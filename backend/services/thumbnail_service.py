@@ -0,0 +1,164 @@
+"""
+Thumbnail Service - Vorschaubilder der ersten PDF-Seite für die Protokoll-Liste
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import subprocess
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .storage import LocalStorage, storage_key
+from .storage_layout import shard_dir
+
+logger = logging.getLogger(__name__)
+
+class ThumbnailService:
+    """
+    Rastert Seite 1 generierter PDFs mit pdftoppm in einen Datei-Cache
+
+    Pro Protokoll wird der SHA-256-Hash des PDFs in einer Index-Datei
+    gespeichert. Ein Thumbnail wird nur neu gerastert, wenn sich der Hash
+    ändert; der Hash dient gleichzeitig als ETag. Das PDF wird über das
+    Speicher-Backend gelesen, damit jedes Replikat Thumbnails erzeugen kann.
+    """
+
+    def __init__(self, cache_folder: str, storage=None, width: Optional[int] = None):
+        self.cache_folder = Path(cache_folder).resolve()
+        self.storage = storage if storage is not None else LocalStorage()
+        self.cache_folder.mkdir(parents=True, exist_ok=True)
+        self.width = width or int(os.environ.get('THUMBNAIL_WIDTH', 300))
+
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='thumbnails')
+
+    def on_pdf_created(self, protocol_id: int, pdf_path: Path):
+        """Listener für LaTeXService: Thumbnail im Hintergrund erzeugen (PDF muss bereits veröffentlicht sein)"""
+        self._executor.submit(self._render_safely, protocol_id, storage_key(pdf_path))
+
+    def get_thumbnail(self, protocol_id: int, pdf_path: Path) -> Optional[Tuple[Path, str]]:
+        """
+        Liefert das aktuelle Thumbnail eines Protokolls
+
+        Args:
+            protocol_id: ID des Protokolls
+            pdf_path: Pfad zum generierten PDF
+
+        Returns:
+            Tupel (Pfad zum PNG, PDF-Hash) oder None, wenn kein PDF existiert
+        """
+        key = storage_key(pdf_path)
+        if self.storage.stat(key) is None:
+            return None
+        return self._render(protocol_id, key)
+
+    def current_version(self, protocol_id: int, pdf_path: Path) -> Optional[str]:
+        """Hash des zuletzt gerasterten PDFs, sofern das PDF seitdem unverändert ist"""
+        stat = self.storage.stat(storage_key(pdf_path))
+        if stat is None:
+            return None
+
+        entry = self._read_index(protocol_id)
+        if entry and entry['mtime'] == stat['mtime'] and entry['size'] == stat['size']:
+            return entry['hash']
+        return None
+
+    def _render_safely(self, protocol_id: int, key: str):
+        try:
+            self._render(protocol_id, key)
+        except Exception as e:
+            logger.error(f"Thumbnail für Protokoll {protocol_id} fehlgeschlagen: {str(e)}")
+
+    def _render(self, protocol_id: int, key: str) -> Tuple[Path, str]:
+        """Rastert Seite 1, falls sich das PDF seit dem letzten Thumbnail geändert hat"""
+        with self._lock:
+            stat = self.storage.stat(key)
+            if stat is None:
+                raise FileNotFoundError(key)
+            entry = self._read_index(protocol_id)
+
+            if entry and entry['mtime'] == stat['mtime'] and entry['size'] == stat['size']:
+                pdf_hash = entry['hash']
+            else:
+                pdf_hash = self._hash_stored(key)
+
+            thumbnail_path = self._thumbnail_path(protocol_id, pdf_hash)
+            if not thumbnail_path.exists():
+                self._rasterize(key, thumbnail_path)
+                self._remove_stale(protocol_id, thumbnail_path)
+                logger.info(f"Thumbnail erstellt: {thumbnail_path.name}")
+
+            self._write_index(protocol_id, {'hash': pdf_hash, 'mtime': stat['mtime'], 'size': stat['size']})
+            return thumbnail_path, pdf_hash
+
+    def _rasterize(self, key: str, thumbnail_path: Path):
+        """Seite 1 mit pdftoppm (poppler-utils) auf Thumbnail-Breite rastern"""
+        thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_prefix = thumbnail_path.with_name(f".{thumbnail_path.stem}.{os.getpid()}")
+
+        # pdftoppm braucht eine lokale Datei: aus dem Objektspeicher temporär herunterladen
+        pdf_path = self.storage.local_path(key)
+        tmp_pdf = None
+        if pdf_path is None:
+            fd, name = tempfile.mkstemp(dir=thumbnail_path.parent, prefix='.', suffix='.pdf')
+            os.close(fd)
+            tmp_pdf = pdf_path = Path(name)
+        try:
+            if tmp_pdf is not None:
+                self.storage.download(key, tmp_pdf)
+            subprocess.run([
+                'pdftoppm', '-f', '1', '-l', '1',
+                '-scale-to-x', str(self.width), '-scale-to-y', '-1',
+                '-png', '-singlefile',
+                str(pdf_path), str(tmp_prefix)
+            ], check=True, capture_output=True, timeout=30)
+        finally:
+            if tmp_pdf is not None:
+                tmp_pdf.unlink(missing_ok=True)
+        os.replace(f"{tmp_prefix}.png", thumbnail_path)
+
+    def _shard(self, protocol_id: int) -> Path:
+        return shard_dir(self.cache_folder, f"protocol_{protocol_id}")
+
+    def _thumbnail_path(self, protocol_id: int, pdf_hash: str) -> Path:
+        return self._shard(protocol_id) / f"protocol_{protocol_id}_{pdf_hash[:16]}.png"
+
+    def _remove_stale(self, protocol_id: int, current: Path):
+        """Löscht Thumbnails älterer PDF-Versionen (nur im Shard des Protokolls)"""
+        for path in self._shard(protocol_id).glob(f"protocol_{protocol_id}_*.png"):
+            if path != current:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _index_path(self, protocol_id: int) -> Path:
+        return self._shard(protocol_id) / f"protocol_{protocol_id}.json"
+
+    def _read_index(self, protocol_id: int) -> Optional[Dict]:
+        try:
+            with open(self._index_path(protocol_id), 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_index(self, protocol_id: int, entry: Dict):
+        index_path = self._index_path(protocol_id)
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = index_path.with_name(f".{index_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, index_path)
+
+    def _hash_stored(self, key: str) -> str:
+        """SHA-256 des PDFs, blockweise aus dem Speicher-Backend gelesen"""
+        digest = hashlib.sha256()
+        with self.storage.open_read(key) as stream:
+            for block in iter(lambda: stream.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
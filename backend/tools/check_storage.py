@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Prüft das konfigurierte Speicher-Backend mit einem Schreib-/Lese-Durchlauf
+
+Schreibt eine Testdatei (standardmäßig größer als die Multipart-Schwelle),
+liest sie als Datenstrom zurück, vergleicht den Inhalt, erzeugt eine
+vorsignierte URL und löscht die Datei wieder. Für MinIO z.B.:
+
+    STORAGE_BACKEND=s3 S3_BUCKET=protokolle S3_ENDPOINT_URL=http://localhost:9000 \\
+    AWS_ACCESS_KEY_ID=minioadmin AWS_SECRET_ACCESS_KEY=minioadmin \\
+    python tools/check_storage.py [--size-mb 20]
+"""
+
+import os
+import sys
+import time
+import hashlib
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.storage import create_storage
+
+
+class RandomStream:
+    """Datenstrom mit Zufallsdaten, ohne die Datei im Speicher zu halten"""
+
+    def __init__(self, size: int):
+        self.remaining = size
+        self.digest = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = os.urandom(size)
+        self.remaining -= size
+        self.digest.update(data)
+        return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=20)
+    parser.add_argument('--key', default='healthcheck/storage_check.bin')
+    args = parser.parse_args()
+
+    storage = create_storage()
+    stream = RandomStream(args.size_mb * 1024 * 1024)
+
+    start = time.perf_counter()
+    storage.write_stream(args.key, stream, 'application/octet-stream')
+    print(f"Schreiben: {time.perf_counter() - start:.2f}s ({storage.name})")
+
+    start = time.perf_counter()
+    digest = hashlib.sha256()
+    reader = storage.open_read(args.key)
+    try:
+        for block in iter(lambda: reader.read(1024 * 1024), b''):
+            digest.update(block)
+    finally:
+        reader.close()
+    print(f"Lesen:     {time.perf_counter() - start:.2f}s")
+
+    if digest.hexdigest() != stream.digest.hexdigest():
+        print("FEHLER: Inhalt stimmt nicht überein")
+        sys.exit(1)
+
+    print(f"Stat:      {storage.stat(args.key)}")
+    print(f"URL:       {storage.presigned_url(args.key, 'check.bin') or '(lokal, keine vorsignierte URL)'}")
+
+    storage.delete(args.key)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Minimaler Ollama-Ersatz zum Testen von Router und Lastverteilung ohne GPU
+
+Beantwortet /api/tags, /api/pull und /api/generate (mit und ohne Streaming)
+mit Platzhaltertext. Geschwindigkeit, Latenz und Fehlerrate sind einstellbar,
+damit sich Lastverteilung und Circuit Breaker beobachten lassen, z.B.:
+
+    python tools/fake_ollama.py --port 11501 --tokens-per-second 40 &
+    python tools/fake_ollama.py --port 11502 --tokens-per-second 10 --fail-rate 0.2 &
+    OLLAMA_BASE_URLS=http://localhost:11501,http://localhost:11502 OLLAMA_MODEL=fake \\
+        python benchmarks/load_test.py ...
+
+Mit --ports 11501,11502,11503 startet ein Prozess mehrere Instanzen.
+Bei format='json' antwortet er mit einem Objekt für die Schlüssel des
+Schemas im Prompt; --json-drop-rate lässt Schlüssel zufällig weg.
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SAMPLE_TEXT = (
+    "ZIELSETZUNG Ziel des Versuchs ist die Bestimmung der Konzentration. "
+    "DURCHFÜHRUNG Die Lösung wurde titriert. ERGEBNISSE Der Verbrauch wurde notiert. "
+)
+
+
+def make_handler(options):
+    class FakeOllamaHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            if options.verbose:
+                super().log_message(format, *args)
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def do_GET(self):
+            if self.path == '/api/tags':
+                self._send_json(200, {'models': [{'name': options.model}]})
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            request = self._read_json()
+            if self.path == '/api/pull':
+                self._send_json(200, {'status': 'success'})
+            elif self.path == '/api/generate':
+                self._generate(request)
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def _generate(self, request):
+            if random.random() < options.fail_rate:
+                self._send_json(500, {'error': 'simulierter Serverfehler'})
+                return
+
+            num_predict = (request.get('options') or {}).get('num_predict') or options.tokens
+            tokens = min(num_predict, options.tokens)
+            if request.get('format') == 'json':
+                words = self._json_response(request.get('prompt', ''), tokens).split(' ')
+            else:
+                words = (SAMPLE_TEXT * (tokens // 20 + 1)).split()[:tokens]
+
+            time.sleep(options.latency)
+            start = time.perf_counter()
+
+            if request.get('stream', True):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for word in words:
+                    time.sleep(1 / options.tokens_per_second)
+                    self._write_chunk({'model': options.model, 'response': word + ' ', 'done': False})
+                self._write_chunk(self._final(len(words), start, ''))
+                self.wfile.write(b'0\r\n\r\n')
+            else:
+                time.sleep(len(words) / options.tokens_per_second)
+                self._send_json(200, self._final(len(words), start, ' '.join(words)))
+
+        def _json_response(self, prompt, tokens):
+            """JSON-Objekt mit Platzhaltertext für die String-Felder des Schemas im Prompt"""
+            keys = re.findall(r'"(\w+)": \{\s*"type": "string"', prompt)
+            per_key = max(1, tokens // max(1, len(keys)))
+            text = ' '.join((SAMPLE_TEXT * (per_key // 20 + 1)).split()[:per_key])
+            return json.dumps({key: text for key in keys if random.random() >= options.json_drop_rate},
+                              ensure_ascii=False)
+
+        def _final(self, count, start, response):
+            return {
+                'model': options.model,
+                'response': response,
+                'done': True,
+                'eval_count': count,
+                'eval_duration': int((time.perf_counter() - start) * 1e9),
+                'backend': options.name
+            }
+
+        def _write_chunk(self, payload):
+            data = json.dumps(payload).encode('utf-8') + b'\n'
+            self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+            self.wfile.flush()
+
+    return FakeOllamaHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--ports', help='Kommagetrennte Ports für mehrere Instanzen')
+    parser.add_argument('--model', default='fake')
+    parser.add_argument('--tokens', type=int, default=200, help='Tokens pro Antwort')
+    parser.add_argument('--tokens-per-second', type=float, default=50)
+    parser.add_argument('--latency', type=float, default=0.05, help='Wartezeit vor dem ersten Token (s)')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Anteil der Anfragen mit HTTP 500')
+    parser.add_argument('--json-drop-rate', type=float, default=0.0,
+                        help='Anteil der Schema-Schlüssel, die in JSON-Antworten fehlen')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    ports = [int(port) for port in args.ports.split(',')] if args.ports else [args.port]
+    servers = []
+    for port in ports:
+        options = argparse.Namespace(**vars(args), name=f'{args.host}:{port}')
+        server = ThreadingHTTPServer((args.host, port), make_handler(options))
+        servers.append(server)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Fake-Ollama auf http://{args.host}:{port} ({args.tokens_per_second:g} Tokens/s)", flush=True)
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
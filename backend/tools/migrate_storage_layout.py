@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Migration: flache Upload- und Artefakt-Ordner in das Hash-Präfix-Layout überführen
+
+Verschiebt
+  - uploads/<bereich>/<datei>             -> uploads/<bereich>/<shard>/<datei>
+  - generated/protocol_<id>.*             -> generated/<shard>/protocol_<id>.*
+  - generated/versions/protocol_<id>/     -> generated/versions/<shard>/protocol_<id>/
+  - thumbnails/protocol_<id>*             -> thumbnails/<shard>/protocol_<id>*
+
+und aktualisiert dabei die Dateipfade in den Tabellen global_file und
+project_file, den Artefakt-Index (artifacts.db) und die Alters-Indizes.
+Die Migration ist idempotent und kann bei laufender App ausgeführt werden.
+
+Aufruf (aus dem backend-Ordner):
+    python tools/migrate_storage_layout.py [--dry-run] [--database-url URL]
+"""
+
+import os
+import re
+import sys
+import sqlite3
+import argparse
+import logging
+from pathlib import Path
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.storage_layout import AgeIndex, shard_dir, shard_path
+
+logger = logging.getLogger('migrate_storage_layout')
+
+UPLOAD_AREAS = ('images', 'documents', 'data', 'other', 'global', 'projects')
+
+_PROTOCOL_FILE_PATTERN = re.compile(r'^(protocol_\d+)(?:_[0-9a-f]{16})?\.\w+$')
+
+
+class Migration:
+    """Verschiebt Dateien und protokolliert alle Pfadänderungen"""
+
+    def __init__(self, base_dir: Path, database_url: str, dry_run: bool):
+        self.base_dir = base_dir
+        self.database_url = database_url
+        self.dry_run = dry_run
+        self.moved = 0
+
+    def run(self):
+        upload_folder = self.base_dir / 'uploads'
+        generated_folder = self.base_dir / 'generated'
+        thumbnail_folder = self.base_dir / 'thumbnails'
+
+        upload_moves = self._migrate_uploads(upload_folder)
+        generated_moves = self._migrate_generated(generated_folder)
+        self._migrate_thumbnails(thumbnail_folder)
+
+        if not self.dry_run:
+            self._update_database(upload_moves)
+            self._update_artifact_index(generated_folder, generated_moves)
+
+        logger.info(f"{self.moved} Einträge {'würden verschoben' if self.dry_run else 'verschoben'}")
+
+    def _move(self, source: Path, target: Path):
+        if target.exists():
+            logger.warning(f"Ziel existiert bereits, übersprungen: {target}")
+            return False
+        logger.info(f"{source} -> {target}")
+        self.moved += 1
+        if not self.dry_run:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(source, target)
+        return True
+
+    def _migrate_uploads(self, upload_folder: Path):
+        """Flache Uploads verschieben und im Alters-Index der Uploads erfassen"""
+        moves = []
+        age_index = None if self.dry_run else AgeIndex(upload_folder / '.index' / 'age.db')
+
+        for area in UPLOAD_AREAS:
+            area_folder = upload_folder / area
+            if not area_folder.is_dir():
+                continue
+            for entry in os.scandir(area_folder):
+                if not entry.is_file():
+                    continue
+                source = Path(entry.path)
+                target = shard_path(area_folder, entry.name)
+                created_at = entry.stat().st_mtime
+                if self._move(source, target):
+                    moves.append((source, target))
+                    if age_index:
+                        age_index.add(target, created_at)
+        return moves
+
+    def _migrate_generated(self, generated_folder: Path):
+        """Protokoll-Artefakte und Versionsordner in ihre Shards verschieben"""
+        moves = []
+        if not generated_folder.is_dir():
+            return moves
+        age_index = None if self.dry_run else AgeIndex(generated_folder / '.index' / 'age.db')
+
+        for entry in os.scandir(generated_folder):
+            match = _PROTOCOL_FILE_PATTERN.match(entry.name)
+            if not entry.is_file() or not match:
+                continue
+            source = Path(entry.path)
+            target = shard_dir(generated_folder, match.group(1)) / entry.name
+            created_at = entry.stat().st_mtime
+            if self._move(source, target):
+                moves.append((source, target))
+                if age_index and target.suffix in ('.tex', '.pdf'):
+                    age_index.add(target, created_at)
+
+        versions_folder = generated_folder / 'versions'
+        if versions_folder.is_dir():
+            for entry in os.scandir(versions_folder):
+                if entry.is_dir() and entry.name.startswith('protocol_'):
+                    source = Path(entry.path)
+                    target = shard_dir(versions_folder, entry.name) / entry.name
+                    if self._move(source, target):
+                        moves.append((source, target))
+        return moves
+
+    def _migrate_thumbnails(self, thumbnail_folder: Path):
+        if not thumbnail_folder.is_dir():
+            return
+        for entry in os.scandir(thumbnail_folder):
+            match = _PROTOCOL_FILE_PATTERN.match(entry.name)
+            if entry.is_file() and match:
+                self._move(Path(entry.path), shard_dir(thumbnail_folder, match.group(1)) / entry.name)
+
+    def _update_database(self, moves):
+        """Gespeicherte Dateipfade der globalen und Projekt-Dateien anpassen"""
+        if not moves:
+            return
+        from sqlalchemy import create_engine, text
+
+        engine = create_engine(self.database_url)
+        with engine.begin() as connection:
+            for source, target in moves:
+                old_path = str(source.relative_to(self.base_dir))
+                new_path = str(target.relative_to(self.base_dir))
+                for table in ('global_file', 'project_file'):
+                    connection.execute(
+                        text(f"UPDATE {table} SET file_path = :new WHERE file_path = :old"),
+                        {'new': new_path, 'old': old_path}
+                    )
+        logger.info(f"Datenbank-Pfade aktualisiert ({len(moves)} Dateien)")
+
+    def _update_artifact_index(self, generated_folder: Path, moves):
+        """Schlüssel im Artefakt-Index (relativ zu generated/) umbenennen"""
+        db_path = generated_folder / 'artifacts.db'
+        if not moves or not db_path.exists():
+            return
+
+        connection = sqlite3.connect(str(db_path))
+        with connection:
+            for source, target in moves:
+                old_name = str(source.relative_to(generated_folder))
+                new_name = str(target.relative_to(generated_folder))
+                if source.suffix:
+                    connection.execute('UPDATE artifacts SET name = ? WHERE name = ?', (new_name, old_name))
+                else:
+                    # Versionsordner: alle enthaltenen Versionen umschreiben
+                    connection.execute(
+                        'UPDATE versions SET name = ? || substr(name, ?) WHERE name LIKE ?',
+                        (new_name, len(old_name) + 1, f"{old_name}/%")
+                    )
+        connection.close()
+
+
+def default_database_url(base_dir: Path) -> str:
+    """DATABASE_URL wie in der App; relative SQLite-Pfade liegen im instance-Ordner"""
+    url = os.environ.get('DATABASE_URL', 'sqlite:///protokoll.db')
+    prefix = 'sqlite:///'
+    if url.startswith(prefix) and not url.startswith(prefix + '/'):
+        return prefix + str(base_dir / 'instance' / url[len(prefix):])
+    return url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-dir', default=BACKEND_DIR, help='backend-Ordner mit uploads/ und generated/')
+    parser.add_argument('--database-url', help='Standard: DATABASE_URL bzw. SQLite im instance-Ordner')
+    parser.add_argument('--dry-run', action='store_true', help='Nur anzeigen, nichts verschieben')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    base_dir = Path(args.base_dir).resolve()
+    database_url = args.database_url or default_database_url(base_dir)
+    Migration(base_dir, database_url, args.dry_run).run()
+
+
+if __name__ == '__main__':
+    main()
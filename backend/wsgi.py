@@ -0,0 +1,9 @@
+"""
+WSGI-Einstiegspunkt für den Produktivbetrieb
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+"""
+
+from app import prepare_app
+
+application = prepare_app()
@@ -319,6 +319,15 @@ const Protocols = () => {
             {filteredProtocols.map((protocol) => (
               <div key={protocol.id} className="p-6 hover:bg-gray-50 transition-colors">
                 <div className="flex items-start justify-between">
+                  {protocol.status === 'completed' && (
+                    <img
+                      src={`http://localhost:5000/thumbnail/${protocol.id}${protocol.thumbnail_version ? `?v=${protocol.thumbnail_version}` : ''}`}
+                      alt={`Vorschau: ${protocol.title}`}
+                      loading="lazy"
+                      onError={(e) => { e.target.style.display = 'none'; }}
+                      className="w-24 mr-6 border border-gray-200 rounded shadow-sm bg-white"
+                    />
+                  )}
                   <div className="flex-1">
                     <div className="flex items-center mb-2">
                       <h3 className="text-xl font-semibold text-gray-900 mr-3">